@@ -4,22 +4,26 @@ import threading
 import logging
 from dataclasses import dataclass, asdict
 from datetime import datetime, timezone
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, jsonify, request, send_file, g, has_request_context
 from flask_cors import CORS
+import numpy as np
 import pandas as pd
 import subprocess # We'll use this to run our data generation script
 import zipfile
-import io
+from werkzeug.local import LocalProxy
 from werkzeug.utils import secure_filename
 
 # Import all our custom services and utilities
 from utils.data_loader import DataLoader
+from utils.upload_ingest import UploadIngestor, UploadValidationError
 from utils.auth import token_required
 from services.risk_scoring import HybridRiskScorer
+from services.alert_index import AlertIndex
 from services.ai_summarizer import AI_Summarizer
 from services.graph_analysis import GraphAnalyzer
 from services.report_generator import ReportGenerator
 from services.case_manager import CaseManager
+from services.snapshot import ServiceSnapshot, SharedSnapshotStore, SnapshotHolder
 
 # --- APPLICATION SETUP & SERVICE INITIALIZATION ---
 app = Flask(__name__)
@@ -62,20 +66,65 @@ DATA_PATH = os.path.join(os.path.dirname(__file__), 'generated-data')
 DATA_GENERATION_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), 'data-generation', 'generate_data.py')
 
 data_loader = DataLoader(data_path=DATA_PATH)
-all_datasets = data_loader.load_all_data()
+# Only what the services read at startup is parsed now; other datasets load on first use
+data_loader.require(HybridRiskScorer.REQUIRED_DATASETS, ReportGenerator.REQUIRED_DATASETS)
 
-risk_scorer = HybridRiskScorer(all_datasets)
+# Worker processes share one analysed snapshot per dataset version through a memory-mapped export
+shared_snapshots = SharedSnapshotStore(data_loader)
+
+def _load_snapshot(analyze=True, previous=None):
+    """
+    A service snapshot of the datasets on disk: attached from the shared export
+    when a worker already built it, else loaded, built and (by default)
+    analysed, then exported for the other workers. With a `previous` snapshot
+    only the datasets whose files changed are parsed and indexed again.
+    """
+    def build():
+        if previous is None:
+            datasets = data_loader.load_all_data()
+            scorer = HybridRiskScorer(datasets, dataset_version=datasets.version)
+        else:
+            datasets = data_loader.load_all_data(previous=previous.datasets)
+            changed = datasets.changed_since(previous.datasets)
+            logger.info(f"[RELOAD] Changed datasets: {', '.join(sorted(changed)) or 'none'}")
+            scorer = previous.risk_scorer.with_datasets(datasets, changed, dataset_version=datasets.version)
+        metadata = None
+        try:
+            metadata = data_loader.get_metadata(datasets)
+        except Exception as _e:
+            logger.warning(f"Failed to attach metadata: {_e}")
+        if analyze and scorer.risk_scores_df is None:
+            scorer.run_full_analysis()
+        return ServiceSnapshot.create(datasets, scorer, metadata=metadata)
+
+    return shared_snapshots.load(data_loader.refresh_version(), build)
+
+def _load_analysed_snapshot(context, previous=None):
+    """_load_snapshot(), or an unanalysed snapshot (logged as `context`) when the analysis fails."""
+    try:
+        return _load_snapshot(previous=previous)
+    except Exception as e:
+        logger.warning(f"{context} failed: {e}")
+        return _load_snapshot(analyze=False, previous=previous)
+
+# Datasets and the services built on them are published together as one snapshot;
+# reloads build a new snapshot off to the side and swap it in with a single assignment.
+logger.info("[Startup] Loading datasets and running the initial full risk analysis (or attaching to a shared snapshot)...")
+snapshots = SnapshotHolder(_load_analysed_snapshot("Initial analysis run"))
+
+def _snapshot():
+    """The snapshot serving this request: pinned on first use so a reload mid-request can't mix versions."""
+    if not has_request_context():
+        return snapshots.current
+    if 'snapshot' not in g:
+        g.snapshot = snapshots.current
+    return g.snapshot
+
+all_datasets = LocalProxy(lambda: _snapshot().datasets)
+risk_scorer = LocalProxy(lambda: _snapshot().risk_scorer)
+report_generator = LocalProxy(lambda: _snapshot().report_generator)
 ai_summarizer = AI_Summarizer()
 graph_analyzer = GraphAnalyzer()
-# Attach metadata to datasets dict for downstream consumers (e.g., reports)
-try:
-    md = data_loader.get_metadata()
-    if isinstance(all_datasets, dict):
-        all_datasets['metadata'] = md
-except Exception as _e:
-    logger.warning(f"Failed to attach metadata: {_e}")
-
-report_generator = ReportGenerator(all_datasets)
 case_manager = CaseManager()
 
 logger.info("All services initialized successfully. Backend is ready.")
@@ -107,20 +156,18 @@ def _save_settings(data):
 
     # Notifications feature removed
 
-# Auto-run analysis once on startup if no existing alert scores cached
-try:
-    if (risk_scorer.risk_scores_df is None) or risk_scorer.risk_scores_df.empty:
-        logger.info("[Startup] Running initial full risk analysis to populate alert scores...")
-        risk_scorer.run_full_analysis()
-except Exception as e:
-    logger.warning(f"Initial analysis run failed: {e}")
+def _analysed(snapshot):
+    """A snapshot whose scorer is a fork of `snapshot`'s with a fresh full analysis; the old one keeps serving meanwhile."""
+    scorer = snapshot.risk_scorer.fork()
+    results = scorer.run_full_analysis()
+    return snapshot.with_scorer(scorer), results
 
 # --- Response helpers and error handlers ---
 def api_ok(data=None, status=200):
     return jsonify({"success": True, "data": data, "error": None}), status
 
-def api_err(message, status=400):
-    return jsonify({"success": False, "data": None, "error": message}), status
+def api_err(message, status=400, data=None):
+    return jsonify({"success": False, "data": data, "error": message}), status
 
 @app.errorhandler(400)
 def _bad_request(e):
@@ -152,7 +199,7 @@ def health_check():
 @token_required
 def dataset_metadata():
     try:
-        meta = data_loader.get_metadata()
+        meta = data_loader.get_metadata(_snapshot().datasets)
         return api_ok(meta)
     except Exception as e:
         logger.error(f"ERROR in /api/datasets/metadata: {e}")
@@ -169,14 +216,29 @@ ALLOWED_DATASETS = {
     'cases': 'PoliceCases.csv'
 }
 
-def _validate_csv_schema(dataset_key: str, df: pd.DataFrame):
-    required = data_loader.schemas.get(dataset_key)
-    if not required:
-        return True
-    missing = [c for c in required if c not in df.columns]
-    if missing:
-        raise ValueError(f"{dataset_key} missing columns: {', '.join(missing)}")
-    return True
+# Uploads are spooled to disk and validated in chunks, never parsed whole into memory
+upload_ingestor = UploadIngestor(data_loader, ALLOWED_DATASETS)
+
+def _new_transactions_delta(scorer, path):
+    """Rows of an uploaded Transactions.csv (at `path`) that extend `scorer`'s loaded history.
+
+    The file is read in chunks and only rows with new transaction ids are kept.
+    Returns None when the upload is not a pure append (existing ids missing) or
+    no analysis has run yet, in which case callers fall back to a full rebuild.
+    """
+    if scorer.risk_scores_df is None:
+        return None
+    current_ids = pd.Index(scorer.transactions_df['transaction_id'].astype(str)).unique()
+    seen = np.zeros(len(current_ids), dtype=bool)
+    new_rows = []
+    with pd.read_csv(path, dtype={'transaction_id': str}, chunksize=upload_ingestor.chunk_rows) as reader:
+        for chunk in reader:
+            positions = current_ids.get_indexer(chunk['transaction_id'])
+            seen[positions[positions >= 0]] = True
+            new_rows.append(chunk[positions < 0])
+    if not new_rows or not seen.all():
+        return None
+    return pd.concat(new_rows, ignore_index=True)
 
 @app.route('/api/datasets/upload', methods=['POST'])
 @token_required
@@ -185,6 +247,8 @@ def upload_dataset():
 
     - CSV: requires form field 'dataset' in {persons,accounts,transactions,companies,directorships,properties,cases}
     - ZIP: files named as in ALLOWED_DATASETS will overwrite existing datasets
+    Files are validated row by row first; a file with invalid rows is rejected
+    (400) with the offending rows listed and nothing is replaced.
     After upload, reload datasets and run analysis to refresh alerts.
     """
     if 'file' not in request.files:
@@ -194,48 +258,60 @@ def upload_dataset():
         return api_err("Empty filename.", 400)
 
     filename = secure_filename(file.filename)
-    updated = []
+    dataset_key = None
+    if not filename.lower().endswith('.zip'):
+        # Single CSV: need dataset param
+        dataset_key = request.form.get('dataset', '').strip().lower()
+        if dataset_key not in ALLOWED_DATASETS:
+            return api_err("For CSV uploads, provide form field 'dataset' with a valid dataset name.", 400)
+    batch = None
     try:
-        if filename.lower().endswith('.zip'):
-            # Process ZIP: extract to memory and write matching CSVs
-            with zipfile.ZipFile(io.BytesIO(file.read())) as zf:
-                names = zf.namelist()
-                for key, target in ALLOWED_DATASETS.items():
-                    # Find case-insensitive match
-                    match = next((n for n in names if n.lower().endswith(target.lower())), None)
-                    if not match:
-                        continue
-                    with zf.open(match) as member:
-                        df = pd.read_csv(member)
-                        _validate_csv_schema(key, df)
-                        out_path = os.path.join(DATA_PATH, target)
-                        df.to_csv(out_path, index=False)
-                        updated.append(target)
-        else:
-            # Single CSV: need dataset param
-            dataset_key = request.form.get('dataset', '').strip().lower()
-            if dataset_key not in ALLOWED_DATASETS:
-                return api_err("For CSV uploads, provide form field 'dataset' with a valid dataset name.", 400)
-            df = pd.read_csv(file)
-            _validate_csv_schema(dataset_key, df)
-            out_path = os.path.join(DATA_PATH, ALLOWED_DATASETS[dataset_key])
-            df.to_csv(out_path, index=False)
-            updated.append(ALLOWED_DATASETS[dataset_key])
-
-        if not updated:
+        batch = upload_ingestor.ingest(file, filename, dataset_key)
+        if not batch.staged:
             return api_err("No recognized CSVs found in upload.", 400)
+        updated = [staged.file_name for staged in batch.staged.values()]
+        ingested = [staged.summary() for staged in batch.staged.values()]
+
+        def reload(current):
+            # Files are replaced under the build lock; the serving snapshot first
+            # parses any it deferred, so it never reads the new data lazily
+            current.datasets.load_pending(batch.staged)
+            with data_loader.delta_lock():
+                upload_ingestor.commit(batch)
+                if 'transactions' in batch.staged:
+                    # A replacement Transactions.csv supersedes the batches appended to the previous one
+                    data_loader.discard_segments('transactions')
+
+            # Transactions-only upload that extends the current history: rescore just the touched persons
+            if list(batch.staged) == ['transactions']:
+                delta = _new_transactions_delta(current.risk_scorer, os.path.join(DATA_PATH, ALLOWED_DATASETS['transactions']))
+                if delta is not None:
+                    scorer, stats = current.risk_scorer.with_new_transactions(delta, dataset_version=data_loader.refresh_version())
+                    datasets = current.datasets.replace(version=scorer.dataset_version, transactions=scorer.transactions_df)
+                    logger.info(f"[UPLOAD] Incremental rescore: {stats}")
+                    snapshot = current.with_scorer(scorer, datasets)
+                    shared_snapshots.export(snapshot)
+                    return snapshot, {
+                        "updated_files": updated,
+                        "ingested": ingested,
+                        "alerts_generated": len(scorer.risk_scores_df),
+                        "mode": "incremental",
+                        "incremental": stats,
+                    }
 
-        # Reload datasets and rerun analysis
-        global all_datasets, risk_scorer, report_generator
-        all_datasets = data_loader.load_all_data()
-        risk_scorer = HybridRiskScorer(all_datasets)
-        alerts = risk_scorer.run_full_analysis() or []
-        report_generator = ReportGenerator(all_datasets)
-
-        return api_ok({
-            "updated_files": updated,
-            "alerts_generated": len(alerts)
-        }, 200)
+            # Reload the changed datasets and rerun analysis
+            snapshot = _load_snapshot(previous=current)
+            return snapshot, {
+                "updated_files": updated,
+                "ingested": ingested,
+                "alerts_generated": len(snapshot.risk_scorer.risk_scores_df),
+                "mode": "full",
+            }
+
+        return api_ok(snapshots.rebuild(reload), 200)
+    except UploadValidationError as ve:
+        logger.error(f"[UPLOAD] Validation failed: {ve}")
+        return api_err(str(ve), 400, data=ve.to_dict())
     except ValueError as ve:
         logger.error(f"[UPLOAD] Schema validation failed: {ve}")
         return api_err(str(ve), 400)
@@ -244,6 +320,117 @@ def upload_dataset():
     except Exception as e:
         logger.error(f"[UPLOAD] Failed: {e}")
         return api_err("Failed to process uploaded data.", 500)
+    finally:
+        if batch is not None:
+            batch.cleanup()
+
+# --- Transaction delta ingestion ---
+# Appended batches are folded into Transactions.csv in the background once this many segments pile up
+DELTA_COMPACT_SEGMENTS = max(1, int(os.getenv('DELTA_COMPACT_SEGMENTS', '24')))
+_compaction_lock = threading.Lock()
+
+def _compacted(snapshot):
+    """Folds the transaction delta segments into Transactions.csv; the data is unchanged, so `snapshot` is only re-versioned."""
+    with data_loader.delta_lock():
+        in_sync = data_loader.refresh_version() == snapshot.dataset_version
+        merged = data_loader.compact_segments('transactions')
+        version = data_loader.refresh_version()
+    if not merged or not in_sync:
+        # Another worker changed the files since this snapshot was built; the next append reloads
+        return None, merged
+    scorer = snapshot.risk_scorer.with_version(version)
+    datasets = snapshot.datasets.replace(version=version, transactions=scorer.transactions_df)
+    compacted = snapshot.with_scorer(scorer, datasets)
+    shared_snapshots.export(compacted)
+    return compacted, merged
+
+def _background_compaction():
+    try:
+        merged = snapshots.rebuild(_compacted)
+        logger.info(f"[DELTA] Background compaction merged {merged} segments.")
+    except Exception as e:
+        logger.error(f"ERROR in delta compaction: {e}")
+    finally:
+        _compaction_lock.release()
+
+def _start_compaction():
+    # At most one compaction at a time; a later append retries if segments remain
+    if _compaction_lock.acquire(blocking=False):
+        threading.Thread(target=_background_compaction, daemon=True).start()
+
+@app.route('/api/transactions/append', methods=['POST'])
+@token_required
+def append_transactions():
+    """Append a batch of new transactions without replacing Transactions.csv.
+
+    Body: JSON {"transactions": [{...}, ...]}, or a CSV in form field 'file'.
+    Rows are validated as for uploads and every transaction_id must be new; a
+    rejected batch (400) lists the offending rows (JSON: by list index) and
+    nothing is written. Accepted rows are stored as an immutable delta segment
+    and only the persons they touch are rescored. Segments are compacted into
+    Transactions.csv in the background.
+    """
+    batch = None
+    try:
+        if 'file' in request.files:
+            file = request.files['file']
+            batch = upload_ingestor.ingest(file, secure_filename(file.filename) or 'Transactions.csv', 'transactions')
+            first_row = 2
+        else:
+            payload = request.get_json(silent=True) or {}
+            records = payload.get('transactions')
+            if not isinstance(records, list) or not records or not all(isinstance(r, dict) for r in records):
+                return api_err("Provide JSON {\"transactions\": [...]} with at least one row, or a CSV in form field 'file'.", 400)
+            batch = upload_ingestor.ingest_records('transactions', records)
+            first_row = 0
+        if 'transactions' not in batch.staged:
+            return api_err("No Transactions.csv found in upload.", 400)
+        staged = batch.staged['transactions']
+
+        def append(current):
+            with data_loader.delta_lock():
+                if data_loader.refresh_version() != current.dataset_version:
+                    # The files moved on since this snapshot was built (another worker appended or uploaded)
+                    current = _load_snapshot(previous=current)
+                scorer = current.risk_scorer
+                rows = pd.read_csv(staged.path, dtype={'transaction_id': str})
+                data_loader.append_transactions(
+                    rows, scorer.transaction_id_index(), scorer.transactions_df['transaction_id'], first_row=first_row,
+                )
+                version = data_loader.refresh_version()
+                result = {"rows_appended": len(rows), "pending_segments": len(data_loader.delta_segments('transactions'))}
+
+            if scorer.risk_scores_df is None:
+                # No analysis to update incrementally: reload the transactions and run one
+                snapshot = _load_snapshot(previous=current)
+                result.update(mode="full", alerts_generated=len(snapshot.risk_scorer.risk_scores_df))
+                return snapshot, result
+            scorer, stats = scorer.with_new_transactions(rows, dataset_version=version)
+            datasets = current.datasets.replace(version=version, transactions=scorer.transactions_df)
+            logger.info(f"[DELTA] Incremental rescore: {stats}")
+            snapshot = current.with_scorer(scorer, datasets)
+            shared_snapshots.export(snapshot)
+            result.update(mode="incremental", alerts_generated=len(scorer.risk_scores_df), incremental=stats)
+            return snapshot, result
+
+        result = snapshots.rebuild(append)
+        if result["pending_segments"] >= DELTA_COMPACT_SEGMENTS:
+            _start_compaction()
+        return api_ok(result, 200)
+    except UploadValidationError as ve:
+        logger.error(f"[DELTA] Batch rejected: {ve}")
+        return api_err(str(ve), 400, data=ve.to_dict())
+    except ValueError as ve:
+        logger.error(f"[DELTA] Schema validation failed: {ve}")
+        return api_err(str(ve), 400)
+    except zipfile.BadZipFile:
+        return api_err("Invalid ZIP file.", 400)
+    except Exception as e:
+        logger.error(f"[DELTA] Append failed: {e}")
+        return api_err("Failed to append transactions.", 500)
+    finally:
+        if batch is not None:
+            batch.cleanup()
 
 # ... (all your other endpoints like /api/alerts, /api/investigate, etc., go here) ...
 @app.route('/api/persons', methods=['GET'])
@@ -277,20 +464,20 @@ def _background_full_analysis():
     try:
         # Traceability: include dataset seed/snapshot in logs if available
         try:
-            _md = data_loader.get_metadata() or {}
+            _md = data_loader.get_metadata(snapshots.current.datasets) or {}
             _seed = _md.get('seed')
             _snap = _md.get('snapshot')
             logger.info(f"[ANALYSIS] Background full analysis started... (seed={_seed}, snapshot={_snap})")
         except Exception:
             logger.info("[ANALYSIS] Background full analysis started...")
-        results = risk_scorer.run_full_analysis()
+        results = snapshots.rebuild(_analysed)
         with _analysis_lock:
             analysis_state.running = False
             analysis_state.completed_at = datetime.now(timezone.utc).isoformat()
             analysis_state.alerts_generated = len(results)
             analysis_state.error = None
         try:
-            _md = data_loader.get_metadata() or {}
+            _md = data_loader.get_metadata(snapshots.current.datasets) or {}
             _seed = _md.get('seed')
             _snap = _md.get('snapshot')
             logger.info(f"[ANALYSIS] Completed. {len(results)} alerts generated. (seed={_seed}, snapshot={_snap})")
@@ -303,6 +490,15 @@ def _background_full_analysis():
             analysis_state.error = str(e)
         logger.error(f"ERROR in background analysis: {e}")
 
+@app.route('/api/cache/stats', methods=['GET'])
+@token_required
+def cache_stats():
+    """Hit/miss counters for the per-person risk-detail cache."""
+    return api_ok({
+        "dataset_version": risk_scorer.dataset_version,
+        "risk_details": risk_scorer.details_cache.stats(),
+    })
+
 @app.route('/api/run-analysis/status', methods=['GET'])
 @token_required
 def run_analysis_status():
@@ -310,8 +506,24 @@ def run_analysis_status():
     with _analysis_lock:
         state_dict = asdict(analysis_state)
         state_copy = {k: v for k, v in state_dict.items() if v is not None}
+    # Per-phase timings of the latest completed full analysis (see /api/metrics for history)
+    profile = risk_scorer.metrics.last_run('full_analysis')
+    if profile is not None:
+        state_copy['profile'] = profile
     return api_ok(state_copy)
 
+@app.route('/api/metrics', methods=['GET'])
+@token_required
+def analysis_metrics():
+    """Recent analysis run profiles, counters and scoring/search latency histograms."""
+    try:
+        snapshot = risk_scorer.metrics.snapshot()
+        snapshot["risk_details_cache"] = risk_scorer.details_cache.stats()
+        return api_ok(snapshot)
+    except Exception as e:
+        logger.error(f"ERROR in /api/metrics: {e}")
+        return api_err("Failed to collect metrics", 500)
+
 @app.route('/api/run-analysis', methods=['POST'])
 @token_required
 def run_analysis():
@@ -324,13 +536,13 @@ def run_analysis():
     try:
         if sync_mode:
             try:
-                _md = data_loader.get_metadata() or {}
+                _md = data_loader.get_metadata(snapshots.current.datasets) or {}
                 _seed = _md.get('seed')
                 _snap = _md.get('snapshot')
                 logger.info(f"[ANALYSIS] Synchronous run requested... (seed={_seed}, snapshot={_snap})")
             except Exception:
                 logger.info("[ANALYSIS] Synchronous run requested...")
-            results = risk_scorer.run_full_analysis()
+            results = snapshots.rebuild(_analysed)
             with _analysis_lock:
                 analysis_state.running = False
                 analysis_state.started_at = analysis_state.started_at or datetime.now(timezone.utc).isoformat()
@@ -367,47 +579,48 @@ def run_analysis():
         logger.error(f"ERROR in /api/run-analysis: {e}")
         return api_err(str(e), 500)
 
-# Cached Alerts CSV loader
-_alerts_cache = {"mtime": None, "data": None}
+# Cached alert index: the scorer publishes one whenever it writes the alert store;
+# a store written by another process is loaded once per mtime.
+_alerts_cache = {"mtime": None, "index": None}
 
 def _load_alerts_cached():
-    alerts_path = os.path.join(DATA_PATH, 'AlertScores.csv')
-    if not os.path.exists(alerts_path):
-        return alerts_path, None
+    """Returns (alerts_path, AlertIndex) for the current alert store, or (alerts_path, None)."""
+    store = risk_scorer.alert_store
+    alerts_path = store.path
+    if not store.exists():
+        # Trees analysed before the binary store existed only have the CSV export
+        alerts_path = os.path.join(DATA_PATH, 'AlertScores.csv')
+        if not os.path.exists(alerts_path):
+            return alerts_path, None
     mtime = os.path.getmtime(alerts_path)
-    if _alerts_cache["mtime"] == mtime and _alerts_cache["data"] is not None:
-        return alerts_path, _alerts_cache["data"]
-    df = pd.read_csv(alerts_path)
+    published = getattr(risk_scorer, 'alert_index', None)
+    if published is not None and published.source_mtime == mtime:
+        return alerts_path, published
+    if _alerts_cache["mtime"] == mtime and _alerts_cache["index"] is not None:
+        return alerts_path, _alerts_cache["index"]
+    alerts_df = store.view().to_frame() if alerts_path == store.path else pd.read_csv(alerts_path)
+    index = AlertIndex(alerts_df, source_mtime=mtime)
     _alerts_cache["mtime"] = mtime
-    _alerts_cache["data"] = df
-    return alerts_path, df
+    _alerts_cache["index"] = index
+    return alerts_path, index
+
+def _optional_int_arg(name):
+    value = request.args.get(name)
+    return int(value) if value not in (None, '') else None
 
 @app.route('/api/alerts', methods=['GET'])
 @token_required
 def get_alerts():
     try:
-        alerts_path, alerts_df = _load_alerts_cached()
+        alerts_path, alert_index = _load_alerts_cached()
         logger.debug(f"[ALERTS] Looking for alerts at: {alerts_path}")
-        if alerts_df is None:
-            logger.info("[ALERTS] AlertScores.csv not found")
+        if alert_index is None:
+            logger.info("[ALERTS] Alert store not found")
             return jsonify([]), 200
 
-        # If final_risk_score missing but risk_score present, align columns
-        if 'final_risk_score' not in alerts_df.columns and 'risk_score' in alerts_df.columns:
-            alerts_df['final_risk_score'] = alerts_df['risk_score']
-        if 'risk_score' not in alerts_df.columns and 'final_risk_score' in alerts_df.columns:
-            alerts_df['risk_score'] = alerts_df['final_risk_score']
-        # Force integer types for consistency
-        for col in ['final_risk_score','risk_score']:
-            if col in alerts_df.columns:
-                try:
-                    alerts_df[col] = alerts_df[col].fillna(0).astype(int)
-                except Exception:
-                    pass
-
-        # Check if there's actual data (rows) after normalization
-        if len(alerts_df) == 0:
-            logger.info("[ALERTS] AlertScores.csv is empty (no data rows)")
+        # Score columns are aligned and int-coerced once when the index is built
+        if len(alert_index) == 0:
+            logger.info("[ALERTS] Alert store is empty (no data rows)")
             # Check if demo mode is requested
             demo_mode = request.args.get('demo', 'false').lower() == 'true'
 
@@ -472,14 +685,19 @@ def get_alerts():
                 return jsonify([]), 200
 
         # We have data, proceed normally
-        logger.info(f"[ALERTS] Found {len(alerts_df)} alerts in CSV file")
+        logger.info(f"[ALERTS] Found {len(alert_index)} alerts in alert store")
 
-        # Get limit parameter
+        # Get limit/offset and optional score bounds
         limit = int(request.args.get('limit', 50))
+        offset = int(request.args.get('offset', 0))
+        min_score = _optional_int_arg('min_score')
+        max_score = _optional_int_arg('max_score')
 
-        # Sort by risk_score and get top alerts
-        top_alerts_df = alerts_df.nlargest(limit, 'risk_score')
-        alerts = top_alerts_df.to_dict(orient='records')
+        # Pre-sorted by risk_score: a slice, no per-request sort
+        if min_score is None and max_score is None:
+            alerts = alert_index.top(limit, offset)
+        else:
+            alerts = alert_index.score_range(min_score, max_score, limit=limit, offset=offset)
         logger.info(f"[ALERTS] Returning {len(alerts)} alerts (limited to {limit})")
         return jsonify(alerts), 200
 
@@ -493,24 +711,23 @@ def get_alerts():
 def get_alerts_debug():
     try:
         logger.debug(f"[ALERTS-DEBUG] Request received")
-        alerts_path, alerts_df = _load_alerts_cached()
+        alerts_path, alert_index = _load_alerts_cached()
         logger.debug(f"[ALERTS-DEBUG] Looking for alerts at: {alerts_path}")
-        if alerts_df is None:
-            logger.info("[ALERTS-DEBUG] AlertScores.csv not found")
+        if alert_index is None:
+            logger.info("[ALERTS-DEBUG] Alert store not found")
             return jsonify([]), 200
-        logger.debug(f"[ALERTS-DEBUG] Loaded alerts DataFrame with shape: {alerts_df.shape}")
+        logger.debug(f"[ALERTS-DEBUG] Loaded alert index with {len(alert_index)} alerts")
 
-        if len(alerts_df) == 0:
+        if len(alert_index) == 0:
             logger.info("[ALERTS-DEBUG] No alerts found")
             return jsonify([]), 200
 
         # Get limit parameter
         limit = int(request.args.get('limit', 10))
 
-        # Sort by risk_score and get top alerts
-        top_alerts_df = alerts_df.nlargest(limit, 'risk_score')
-        alerts = top_alerts_df.to_dict(orient='records')
+        alerts = alert_index.top(limit)
         logger.debug(f"[ALERTS-DEBUG] Returning {len(alerts)} alerts")
+        return jsonify(alerts), 200
     except Exception as e:
         logger.error(f"[ALERTS-DEBUG] ERROR: {e}")
         return api_err("Failed to retrieve alerts.", 500)
@@ -519,16 +736,15 @@ def get_alerts_debug():
 def test_alerts():
     """Test endpoint to verify alert generation without authentication"""
     try:
-        alerts_path = os.path.join(DATA_PATH, 'AlertScores.csv')
+        alerts_path, alert_index = _load_alerts_cached()
         logger.debug(f"[TEST-ALERTS] Looking for alerts at: {alerts_path}")
         
-        if os.path.exists(alerts_path):
-            alerts_df = pd.read_csv(alerts_path)
-            logger.debug(f"[TEST-ALERTS] Found {len(alerts_df)} alerts")
-            logger.debug(f"[TEST-ALERTS] Columns: {list(alerts_df.columns)}")
+        if alert_index is not None:
+            logger.debug(f"[TEST-ALERTS] Found {len(alert_index)} alerts")
+            logger.debug(f"[TEST-ALERTS] Columns: {alert_index.columns}")
             
             # Test the same logic as the main alerts endpoint
-            if len(alerts_df) == 0:
+            if len(alert_index) == 0:
                 return jsonify({
                     "alerts_file_exists": True,
                     "alerts_count": 0,
@@ -536,18 +752,17 @@ def test_alerts():
                 })
             
             # Get top 5 alerts by risk score
-            top_alerts_df = alerts_df.nlargest(5, 'risk_score')
-            alerts = top_alerts_df.to_dict(orient='records')
+            alerts = alert_index.top(5)
             
             return jsonify({
                 "alerts_file_exists": True,
-                "alerts_count": len(alerts_df),
-                "columns": list(alerts_df.columns),
+                "alerts_count": len(alert_index),
+                "columns": alert_index.columns,
                 "top_5_alerts": alerts,
-                "sample_alert": alerts_df.iloc[0].to_dict() if len(alerts_df) > 0 else None
+                "sample_alert": alert_index.sample
             })
         else:
-            logger.debug(f"[TEST-ALERTS] AlertScores.csv not found at {alerts_path}")
+            logger.debug(f"[TEST-ALERTS] Alert store not found at {alerts_path}")
             return jsonify({"alerts_file_exists": False, "path_checked": alerts_path})
     except Exception as e:
         logger.error(f"[TEST-ALERTS] Error: {e}")
@@ -720,58 +935,38 @@ def _synthesize_csv_graph(person_id: str):
     Returns a dict with nodes/edges or None if not possible.
     """
     persons_df = all_datasets.get('persons')
-    accounts_df = all_datasets.get('accounts')
-    tx_df = all_datasets.get('transactions')
-    if persons_df is None or accounts_df is None or tx_df is None:
+    if persons_df is None:
         return None
-    # Find accounts belonging to this person
-    person_accounts = accounts_df[accounts_df['owner_id'] == person_id]['account_number'].tolist()
-    if not person_accounts:
+    # The feature store already knows whether this person has any transactions
+    features = risk_scorer.person_features().get(person_id)
+    if not features or not (features['inflow_count'] or features['outflow_count']):
         return None
+    person_accounts = set(risk_scorer.person_accounts(person_id).tolist())
     # Get up to N related transactions where person is source or target
-    related_tx = tx_df[(tx_df['from_account'].isin(person_accounts)) | (tx_df['to_account'].isin(person_accounts))].head(25)
+    related_tx = risk_scorer.person_transactions(person_id, limit=25)
     if related_tx.empty:
         return None
-    # Map counterpart accounts -> owners
-    counterpart_accounts = set()
-    for _, row in related_tx.iterrows():
-        if row['from_account'] in person_accounts:
-            counterpart_accounts.add(row['to_account'])
-        if row['to_account'] in person_accounts:
-            counterpart_accounts.add(row['from_account'])
-    counterpart_owners = accounts_df[accounts_df['account_number'].isin(list(counterpart_accounts))]
+    src_is_person = related_tx['from_account'].isin(person_accounts).to_numpy()
+    counterpart_accounts = np.where(src_is_person, related_tx['to_account'], related_tx['from_account'])
+    counterpart_owners = risk_scorer.account_owners(counterpart_accounts)
+    owner_ids = {o for o in counterpart_owners if o is not None} | {person_id}
+    names = (
+        persons_df[persons_df['person_id'].isin(list(owner_ids))]
+        .drop_duplicates('person_id').set_index('person_id')['full_name'].to_dict()
+    )
     # Build nodes
-    nodes = []
-    person_row = persons_df[persons_df['person_id'] == person_id]
-    label = person_row.iloc[0]['full_name'] if not person_row.empty else person_id
-    nodes.append({"id": person_id, "label": label, "type": "Person", "isCenter": True})
-    for _, acct in counterpart_owners.iterrows():
-        owner_id = acct['owner_id']
-        if owner_id == person_id:
-            continue
-        owner_row = persons_df[persons_df['person_id'] == owner_id]
-        owner_label = owner_row.iloc[0]['full_name'] if not owner_row.empty else owner_id
-        # Avoid duplicates
-        if not any(n['id'] == owner_id for n in nodes):
-            nodes.append({"id": owner_id, "label": owner_label, "type": "Person", "isCenter": False})
+    nodes = [{"id": person_id, "label": names.get(person_id, person_id), "type": "Person", "isCenter": True}]
+    for owner_id in dict.fromkeys(o for o in counterpart_owners if o is not None and o != person_id):
+        nodes.append({"id": owner_id, "label": names.get(owner_id, owner_id), "type": "Person", "isCenter": False})
     # Build edges (aggregate amounts per counterpart for brevity)
     edges_map = {}
-    for _, tx in related_tx.iterrows():
-        src_is_person = tx['from_account'] in person_accounts
-        dst_is_person = tx['to_account'] in person_accounts
-        if src_is_person or dst_is_person:
-            counterpart_acct = tx['to_account'] if src_is_person else tx['from_account']
-            counterpart_owner_row = accounts_df[accounts_df['account_number'] == counterpart_acct]
-            if counterpart_owner_row.empty:
-                continue
-            counterpart_owner = counterpart_owner_row.iloc[0]['owner_id']
-            if counterpart_owner == person_id:
-                continue
-            key = counterpart_owner
-            amt = int(tx['amount_inr']) if not pd.isna(tx['amount_inr']) else 0
-            if key not in edges_map:
-                edges_map[key] = {"amount": 0, "isOutgoing": src_is_person}
-            edges_map[key]["amount"] += amt
+    for outgoing, owner, amount in zip(src_is_person, counterpart_owners, related_tx['amount_inr']):
+        if owner is None or owner == person_id:
+            continue
+        amt = int(amount) if not pd.isna(amount) else 0
+        if owner not in edges_map:
+            edges_map[owner] = {"amount": 0, "isOutgoing": bool(outgoing)}
+        edges_map[owner]["amount"] += amt
     edges = []
     for target_id, meta in edges_map.items():
         edges.append({
@@ -807,14 +1002,13 @@ def generate_report(person_or_case_id):
                 logger.warning(f"[REPORT] Could not resolve case/person: {_res_err}")
         if not risk_details:
             return api_err("Cannot generate report. Person ID not found.", 404)
-        # Harmonize: ensure we use the canonical alert score (from AlertScores.csv) so PDF matches dashboard
+        # Harmonize: ensure we use the canonical alert score (from the alert store) so PDF matches dashboard
         try:
-            alerts_path = os.path.join(DATA_PATH, 'AlertScores.csv')
-            if os.path.exists(alerts_path):
-                alerts_df = pd.read_csv(alerts_path)
-                row = alerts_df[alerts_df['person_id'] == resolved_person_id]
-                if not row.empty:
-                    canonical_score = int(row.iloc[0].get('final_risk_score', row.iloc[0].get('risk_score', 0)))
+            alerts_view = risk_scorer.alert_store.view()
+            if alerts_view is not None:
+                row = alerts_view.get(resolved_person_id)
+                if row is not None:
+                    canonical_score = int(row.get('final_risk_score', row.get('risk_score', 0)))
                     # Only override if canonical differs; keep recalculated score accessible for debugging
                     risk_details['final_risk_score'] = canonical_score
                     risk_details['canonical_alert_score'] = canonical_score
@@ -854,23 +1048,24 @@ def regenerate_data():
         # for too long. For a hackathon, this is a very effective demonstration.
         # Use the same Python interpreter to avoid PATH issues
         import sys
-        process = subprocess.Popen([sys.executable, DATA_GENERATION_SCRIPT_PATH], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = process.communicate()
 
-        if process.returncode == 0:
+        def regenerate(current):
+            # The generator rewrites every dataset file; the serving snapshot parses what it deferred first
+            current.datasets.load_pending()
+            process = subprocess.Popen([sys.executable, DATA_GENERATION_SCRIPT_PATH], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            stdout, stderr = process.communicate()
+            if process.returncode != 0:
+                return None, (process, stdout, stderr, None)
             # Important: After generating new data, we must reload it into our services
             logger.info("[SETTINGS] Data regeneration successful. Reloading services...")
-            global all_datasets, risk_scorer, report_generator
-            all_datasets = data_loader.load_all_data()
-            risk_scorer = HybridRiskScorer(all_datasets)
             # Run analysis so alerts are refreshed immediately
-            try:
-                alerts = risk_scorer.run_full_analysis() or []
-                alerts_count = len(alerts)
-            except Exception as _ra_err:
-                logger.warning(f"[SETTINGS] Analysis after regeneration failed: {_ra_err}")
-                alerts_count = None
-            report_generator = ReportGenerator(all_datasets)
+            snapshot = _load_analysed_snapshot("[SETTINGS] Analysis after regeneration", previous=current)
+            alerts = snapshot.risk_scorer.risk_scores_df
+            alerts_count = len(alerts) if alerts is not None else None
+            return snapshot, (process, stdout, stderr, alerts_count)
+
+        process, stdout, stderr, alerts_count = snapshots.rebuild(regenerate)
+        if process.returncode == 0:
             logger.info("[SETTINGS] Services reloaded with new data.")
             payload = {"message": "New synthetic dataset generated and loaded successfully."}
             if alerts_count is not None:
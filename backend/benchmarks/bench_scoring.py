@@ -0,0 +1,360 @@
+"""
+Scale benchmark for HybridRiskScorer.
+
+Builds synthetic datasets with the data-generation generators at several
+population sizes and times the scoring path phase by phase:
+
+  load                     DataLoader.load_all_data on the generated CSVs
+  preprocess_data          HybridRiskScorer construction (_preprocess_data + rule compilation)
+  run_full_analysis        one in-memory, single-process full analysis
+  get_person_risk_details  uncached detail lookups for sampled persons
+  search_persons           id/name/token prefix and substring queries drawn from the data
+
+Each size runs in a fresh process, so the recorded peak RSS belongs to that size
+alone. Results are written as JSON; pass --baseline with an earlier result file
+to exit non-zero when a phase got slower than --tolerance allows.
+
+Usage (from backend/):
+    python benchmarks/bench_scoring.py --sizes 1000,10000 --output bench.json
+    python benchmarks/bench_scoring.py --sizes 1000,10000 --baseline bench.json
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+GENERATOR_DIR = os.path.join(BACKEND_DIR, 'data-generation')
+for _path in (BACKEND_DIR, GENERATOR_DIR):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(__file__), '.data')
+# Same ratio as generate_data.py (20,000 transactions for 1,000 persons)
+DEFAULT_TX_PER_PERSON = 20
+MAX_COMPANIES = 2000
+# Phases faster than this are too noisy to call a regression
+NOISE_FLOOR_SECONDS = 0.05
+
+logger = logging.getLogger(__name__)
+
+
+# --- dataset generation ---
+
+def _normal_transactions(accounts_df, num_transactions):
+    """
+    Vectorized equivalent of generate_data.generate_normal_transactions.
+
+    Same distributions (distinct from/to accounts, the three amount bands,
+    uniform timestamps over two years, NEFT/IMPS/UPI/RTGS), but built as
+    columns: the row-at-a-time generator is quadratic in the number of accounts.
+    """
+    accounts = accounts_df['account_number'].to_numpy(dtype=object)
+    n = len(accounts)
+    from_idx = np.random.randint(0, n, num_transactions)
+    # Offset in [1, n) keeps the counterparty distinct from the sender
+    to_idx = (from_idx + np.random.randint(1, n, num_transactions)) % n
+    band = np.random.choice(3, num_transactions, p=[0.4, 0.4, 0.2])
+    low = np.array([100, 1000, 10000])[band]
+    high = np.array([1000, 10000, 45000])[band]
+    amounts = low + (np.random.random(num_transactions) * (high - low)).astype(np.int64)
+    offsets = np.random.randint(0, int(timedelta(days=730).total_seconds()), num_transactions)
+    timestamps = pd.Timestamp(datetime.now()) - pd.to_timedelta(offsets, unit='s')
+    return pd.DataFrame({
+        'transaction_id': [f"TXN{i + 1:07d}" for i in range(num_transactions)],
+        'from_account': accounts[from_idx],
+        'to_account': accounts[to_idx],
+        'amount_inr': amounts,
+        'timestamp': timestamps,
+        'payment_mode': np.random.choice(['NEFT', 'IMPS', 'UPI', 'RTGS'], num_transactions),
+        'remarks': 'Transaction',
+    })
+
+
+def build_dataset(num_persons, seed, tx_per_person, out_dir):
+    """Writes a full synthetic dataset for `num_persons` into `out_dir` (reused if already complete)."""
+    marker = os.path.join(out_dir, '.complete')
+    if os.path.exists(marker):
+        logger.info(f"[BENCH] Reusing dataset in {out_dir}")
+        return
+    import generate_data as gen
+    from patterns import create_structuring_pattern, create_shell_company_layering_pattern, create_mule_account_pattern
+
+    os.makedirs(out_dir, exist_ok=True)
+    os.environ['DATA_SEED'] = str(seed)
+    gen._init_seed()
+    started = time.perf_counter()
+
+    persons_df = gen.generate_persons_data(num_persons)
+    companies_df = gen.generate_companies_data(min(max(num_persons // 5, 1), MAX_COMPANIES))
+    accounts_df = gen.generate_bank_accounts_data(persons_df, companies_df)
+    directorships_df = gen.generate_directorships_data(persons_df, companies_df)
+    properties_df = gen.generate_properties_data(persons_df)
+    cases_df = gen.generate_police_cases_data(persons_df)
+
+    normal_df = _normal_transactions(accounts_df, num_persons * tx_per_person)
+    # Pattern counts from generate_all_data (5/3/4), scaled per 10k persons
+    scale = max(1, num_persons // 10_000)
+    pattern_rows = []
+    for _ in range(5 * scale):
+        pattern_rows = create_structuring_pattern(pattern_rows, accounts_df)
+    for _ in range(3 * scale):
+        pattern_rows = create_shell_company_layering_pattern(pattern_rows, accounts_df, companies_df)
+    mule_candidates = persons_df[persons_df['monthly_salary_inr'] <= 35000]
+    for _ in range(4 * scale):
+        pattern_rows = create_mule_account_pattern(pattern_rows, accounts_df, mule_candidates)
+    transactions_df = pd.concat([normal_df, pd.DataFrame(pattern_rows)], ignore_index=True)
+
+    outputs = {
+        'Persons.csv': persons_df,
+        'Companies.csv': companies_df,
+        'BankAccounts.csv': accounts_df,
+        'Directorships.csv': directorships_df,
+        'Properties.csv': properties_df,
+        'PoliceCases.csv': cases_df,
+        'Transactions.csv': transactions_df,
+        'AlertScores.csv': pd.DataFrame(columns=['alert_id', 'person_id', 'risk_score', 'timestamp', 'summary', 'status']),
+    }
+    for file_name, df in outputs.items():
+        df.to_csv(os.path.join(out_dir, file_name), index=False)
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump({'persons': num_persons, 'seed': seed, 'transactions': len(transactions_df),
+                   'generation_seconds': round(time.perf_counter() - started, 3)}, f)
+    logger.info(f"[BENCH] Generated {num_persons} persons / {len(transactions_df)} transactions in {out_dir}")
+
+
+# --- measurement ---
+
+def _peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def _latency_stats(samples):
+    ms = np.asarray(samples, dtype=float) * 1000
+    if len(ms) == 0:
+        return {'calls': 0}
+    return {
+        'calls': int(len(ms)),
+        'seconds': round(float(ms.sum()) / 1000, 4),
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'max_ms': round(float(ms.max()), 3),
+    }
+
+
+def _search_queries(persons_df, rng, count):
+    """(kind, query) pairs: id prefix, name prefix, name-token prefix and inner substring."""
+    sample = persons_df.iloc[rng.choice(len(persons_df), min(count, len(persons_df)), replace=False)]
+    queries = []
+    for i, (pid, name) in enumerate(zip(sample['person_id'].astype(str), sample['full_name'].astype(str))):
+        kind = ('id_prefix', 'name_prefix', 'token_prefix', 'substring')[i % 4]
+        tokens = name.split()
+        if kind == 'id_prefix':
+            queries.append((kind, pid[:6]))
+        elif kind == 'name_prefix':
+            queries.append((kind, name[:3]))
+        elif kind == 'token_prefix':
+            queries.append((kind, tokens[-1][:4]))
+        else:
+            queries.append((kind, name[1:4]))
+    return queries
+
+
+def run_size(num_persons, options):
+    """Benchmarks one population size in the current process; returns its result dict."""
+    from utils.data_loader import DataLoader
+    from services.alert_store import AlertStore
+    from services.feature_store import FeatureStore
+    from services.risk_scoring import HybridRiskScorer
+
+    data_dir = os.path.join(options['data_dir'], f"persons-{num_persons}-seed-{options['seed']}")
+    build_dataset(num_persons, options['seed'], options['tx_per_person'], data_dir)
+    timings = {}
+    rss = {}
+
+    started = time.perf_counter()
+    loader = DataLoader(data_path=data_dir)
+    datasets = loader.load_all_data()
+    timings['load'] = {'seconds': round(time.perf_counter() - started, 4)}
+    rss['load'] = _peak_rss_mb()
+
+    started = time.perf_counter()
+    scorer = HybridRiskScorer(datasets, dataset_version=loader.dataset_version)
+    timings['preprocess_data'] = {'seconds': round(time.perf_counter() - started, 4)}
+    rss['preprocess_data'] = _peak_rss_mb()
+
+    with tempfile.TemporaryDirectory(prefix='netra-bench-') as out_dir:
+        # Keep alert and feature output away from the app's generated-data
+        scorer.alert_store = AlertStore(os.path.join(out_dir, 'AlertScores.npy'))
+        scorer.alerts_csv_path = os.path.join(out_dir, 'AlertScores.csv')
+        scorer.feature_store = FeatureStore(out_dir)
+
+        started = time.perf_counter()
+        alerts = scorer.run_full_analysis(workers=1, chunksize=0)
+        timings['run_full_analysis'] = {'seconds': round(time.perf_counter() - started, 4)}
+        rss['run_full_analysis'] = _peak_rss_mb()
+
+        rng = np.random.default_rng(options['seed'])
+        person_ids = scorer.persons_df['person_id'].astype(str).to_numpy()
+        sampled = rng.choice(person_ids, min(options['detail_samples'], len(person_ids)), replace=False)
+        samples = []
+        for person_id in sampled:
+            started = time.perf_counter()
+            scorer.get_person_risk_details(person_id)
+            samples.append(time.perf_counter() - started)
+        timings['get_person_risk_details'] = _latency_stats(samples)
+        rss['get_person_risk_details'] = _peak_rss_mb()
+
+    by_kind = {}
+    for kind, query in _search_queries(scorer.persons_df, rng, options['search_queries']):
+        started = time.perf_counter()
+        scorer.search_persons(query, limit=20)
+        by_kind.setdefault(kind, []).append(time.perf_counter() - started)
+    timings['search_persons'] = _latency_stats([s for values in by_kind.values() for s in values])
+    timings['search_persons']['by_kind_p50_ms'] = {k: _latency_stats(v)['p50_ms'] for k, v in by_kind.items()}
+    rss['search_persons'] = _peak_rss_mb()
+
+    return {
+        'persons': num_persons,
+        'transactions': int(len(scorer.transactions_df)),
+        'accounts': int(len(scorer.accounts_df)),
+        'alerts': len(alerts),
+        'timings': timings,
+        'peak_rss_mb': _peak_rss_mb(),
+        'peak_rss_mb_after': rss,
+    }
+
+
+def _run_size_child(num_persons, options, queue):
+    logging.basicConfig(level=options['log_level'], format='[%(levelname)s] %(message)s')
+    try:
+        queue.put(('ok', run_size(num_persons, options)))
+    except Exception as e:
+        queue.put(('error', f"{type(e).__name__}: {e}"))
+
+
+def run_isolated(num_persons, options):
+    """Runs `run_size` in a fresh spawned process so ru_maxrss is per size."""
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_size_child, args=(num_persons, options, queue))
+    proc.start()
+    status, payload = queue.get()
+    proc.join()
+    if status != 'ok':
+        raise RuntimeError(f"benchmark for {num_persons} persons failed: {payload}")
+    return payload
+
+
+# --- reporting ---
+
+def _environment():
+    from services.risk_scoring import SCORING_VERSION
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'scoring_version': SCORING_VERSION,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Phases whose total seconds exceed baseline * tolerance (ignoring sub-noise-floor phases)."""
+    previous = {r['persons']: r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result['persons'])
+        if before is None:
+            continue
+        for phase, timing in result['timings'].items():
+            old = before.get('timings', {}).get(phase, {}).get('seconds')
+            new = timing.get('seconds')
+            if old is None or new is None:
+                continue
+            if new > old * tolerance and new - old > NOISE_FLOOR_SECONDS:
+                regressions.append({'persons': result['persons'], 'phase': phase, 'baseline_seconds': old,
+                                    'seconds': new, 'ratio': round(new / old, 2) if old else None})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark HybridRiskScorer at several population sizes.")
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help="comma-separated person counts (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--tx-per-person', type=int, default=DEFAULT_TX_PER_PERSON)
+    parser.add_argument('--detail-samples', type=int, default=200, help="persons timed through get_person_risk_details")
+    parser.add_argument('--search-queries', type=int, default=200)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="where generated datasets are kept between runs")
+    parser.add_argument('--output', help="write JSON results here (default: stdout)")
+    parser.add_argument('--baseline', help="earlier JSON result to compare against")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="allowed slowdown ratio vs. baseline")
+    args = parser.parse_args(argv)
+
+    log_level = os.getenv('LOG_LEVEL', 'WARNING').upper()
+    logging.basicConfig(level=log_level, format='[%(levelname)s] %(message)s')
+    options = {
+        'seed': args.seed,
+        'tx_per_person': args.tx_per_person,
+        'detail_samples': args.detail_samples,
+        'search_queries': args.search_queries,
+        'data_dir': os.path.abspath(args.data_dir),
+        'log_level': log_level,
+    }
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+
+    results = []
+    for size in sizes:
+        print(f"[BENCH] {size} persons...", file=sys.stderr)
+        result = run_isolated(size, options)
+        print(f"[BENCH] {size} persons: " + ", ".join(
+            f"{phase}={timing['seconds']:.3f}s" for phase, timing in result['timings'].items()
+        ) + f", peak RSS {result['peak_rss_mb']}MB", file=sys.stderr)
+        results.append(result)
+
+    report = {'environment': _environment(), 'options': {k: v for k, v in options.items() if k != 'data_dir'},
+              'results': results}
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report['regressions'] = compare(results, json.load(f), args.tolerance)
+        for r in report['regressions']:
+            print(f"[BENCH] REGRESSION {r['persons']} persons {r['phase']}: "
+                  f"{r['baseline_seconds']}s -> {r['seconds']}s", file=sys.stderr)
+        exit_code = 1 if report['regressions'] else 0
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
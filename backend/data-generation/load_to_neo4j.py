@@ -181,8 +181,15 @@ def main():
     # 5. Load Transactions
     logger.info("\n[STEP 5/6] Loading Transactions (idempotent MERGE + hardened timestamps)...")
     tx_path = os.path.join(DATA_DIR, 'Transactions.csv')
+    # Batches appended through /api/transactions/append wait in Transactions.delta/ until compacted
+    delta_dir = os.path.join(DATA_DIR, 'Transactions.delta')
+    delta_paths = sorted(
+        os.path.join(delta_dir, n) for n in (os.listdir(delta_dir) if os.path.isdir(delta_dir) else [])
+        if n.endswith('.csv') and not n.startswith('.')
+    )
     if os.path.exists(tx_path):
-        for chunk in pd.read_csv(tx_path, chunksize=CSV_CHUNK_SIZE):
+        chunks = (chunk for path in [tx_path] + delta_paths for chunk in pd.read_csv(path, chunksize=CSV_CHUNK_SIZE))
+        for chunk in chunks:
             # Harden timestamps
             ts = pd.to_datetime(chunk['timestamp'], errors='coerce', utc=True)
             # Where valid, format iso; else fallback replacing space with 'T'
@@ -0,0 +1,65 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+SCORE_COLUMNS = ['final_risk_score', 'risk_score']
+
+
+def normalize_alerts(alerts_df):
+    """Aligns final_risk_score/risk_score and forces both to ints (on a copy)."""
+    df = alerts_df.copy()
+    if 'final_risk_score' not in df.columns and 'risk_score' in df.columns:
+        df['final_risk_score'] = df['risk_score']
+    if 'risk_score' not in df.columns and 'final_risk_score' in df.columns:
+        df['risk_score'] = df['final_risk_score']
+    for col in SCORE_COLUMNS:
+        if col in df.columns:
+            try:
+                df[col] = df[col].fillna(0).astype(int)
+            except Exception:
+                pass
+    return df
+
+
+class AlertIndex:
+    """
+    Alerts held as records pre-sorted by risk_score (descending, file order on ties).
+
+    Top-N, offset and score-range reads are list slices located by bisect on the
+    sorted scores, so a poll costs O(log n + K) and never re-sorts. Instances are
+    treated as immutable: writers build a new index and swap the reference, so
+    readers never see a half-updated list.
+    `source_mtime` is the mtime of the alert file the index reflects.
+    """
+    def __init__(self, alerts_df, source_mtime=None):
+        df = normalize_alerts(alerts_df)
+        self.source_mtime = source_mtime
+        self.columns = list(df.columns)
+        scores = df['risk_score'].to_numpy() if 'risk_score' in df.columns else np.zeros(len(df), dtype=int)
+        order = np.argsort(-scores, kind='stable')
+        self.records = df.iloc[order].to_dict(orient='records') if len(df) else []
+        # Ascending negated scores so bisect works on the descending order
+        self._neg_scores = [-int(s) for s in scores[order]]
+        self.sample = df.iloc[:1].to_dict(orient='records')[0] if len(df) else None
+
+    def __len__(self):
+        return len(self.records)
+
+    def top(self, limit, offset=0):
+        """The `limit` highest-scoring alerts after skipping `offset`."""
+        offset = max(0, int(offset))
+        return self.records[offset:offset + max(0, int(limit))]
+
+    def score_range(self, min_score=None, max_score=None, limit=None, offset=0):
+        """Alerts with min_score <= risk_score <= max_score, highest first."""
+        lo = 0 if max_score is None else bisect_left(self._neg_scores, -max_score)
+        hi = len(self._neg_scores) if min_score is None else bisect_right(self._neg_scores, -min_score)
+        lo = min(hi, lo + max(0, int(offset)))
+        if limit is not None:
+            hi = min(hi, lo + max(0, int(limit)))
+        return self.records[lo:hi]
+
+    def count_range(self, min_score=None, max_score=None):
+        lo = 0 if max_score is None else bisect_left(self._neg_scores, -max_score)
+        hi = len(self._neg_scores) if min_score is None else bisect_right(self._neg_scores, -min_score)
+        return max(0, hi - lo)
@@ -0,0 +1,137 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+def _open_records(path):
+    """
+    Maps the structured array in `path` through one open file, so header, data
+    and the returned stat all belong to the same inode even if the path is
+    replaced concurrently (np.load reopens the file by name for the mapping).
+    """
+    with open(path, 'rb') as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        st = os.fstat(f.fileno())
+        if not shape[0]:
+            return np.empty(shape, dtype=dtype), st
+        return np.memmap(f, dtype=dtype, mode='r', offset=f.tell(), shape=shape), st
+
+
+class AlertStoreView:
+    """
+    Read-only, mmap-backed view of one alert store file.
+
+    Records are sorted by person_id, so `get` is a binary search over the mapped
+    key column and never parses the whole file. A view keeps the inode it opened:
+    a rewrite (rename) leaves it reading the previous, complete file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.records, st = _open_records(path)
+        self.identity = (st.st_ino, st.st_mtime_ns, st.st_size)
+        self._keys = self.records['person_id']
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def columns(self):
+        return list(self.records.dtype.names)
+
+    def position(self, person_id):
+        """Row of `person_id` in the file, or None."""
+        key = str(person_id)
+        # Longer needles than the field width would make numpy recast the mapped column
+        if len(key) > self._keys.dtype.itemsize // 4 or len(self._keys) == 0:
+            return None
+        pos = int(np.searchsorted(self._keys, key))
+        if pos < len(self._keys) and self._keys[pos] == key:
+            return pos
+        return None
+
+    def get(self, person_id):
+        """The alert for `person_id` as a dict of plain Python values, or None."""
+        pos = self.position(person_id)
+        if pos is None:
+            return None
+        return {name: self.records[name][pos].item() for name in self.records.dtype.names}
+
+    def to_frame(self):
+        return pd.DataFrame({name: np.asarray(self.records[name]) for name in self.records.dtype.names})
+
+    def is_current(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (st.st_ino, st.st_mtime_ns, st.st_size) == self.identity
+
+
+class AlertStore:
+    """
+    Alert scores as a fixed-width binary table (.npy structured array).
+
+    Full writes go to a temp file in the same directory and are renamed into
+    place, so readers only ever see a complete file; the file is never modified
+    in place. String fields are sized to the longest value at write time.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._view = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def mtime(self):
+        return os.path.getmtime(self.path)
+
+    @staticmethod
+    def _to_records(alerts_df):
+        df = alerts_df.sort_values('person_id', kind='stable') if 'person_id' in alerts_df.columns else alerts_df
+        fields = []
+        columns = {}
+        for col in df.columns:
+            values = df[col]
+            if pd.api.types.is_integer_dtype(values.dtype):
+                columns[col] = values.to_numpy(dtype=np.int64)
+            elif pd.api.types.is_float_dtype(values.dtype):
+                columns[col] = values.to_numpy(dtype=np.float64)
+            else:
+                text = values.astype(object).where(values.notna(), '').astype(str).to_numpy(dtype=str)
+                # A zero-length unicode field is not allowed, so keep at least one character
+                columns[col] = text.astype(f'U{max(1, text.dtype.itemsize // 4)}')
+            fields.append((col, columns[col].dtype))
+        records = np.empty(len(df), dtype=fields)
+        for col, values in columns.items():
+            records[col] = values
+        return records
+
+    def write(self, alerts_df):
+        """Replaces the store with `alerts_df` atomically."""
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        records = self._to_records(alerts_df)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.alerts-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, records)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._view = None
+
+    def view(self):
+        """An AlertStoreView of the current file (reopened after writes), or None if absent."""
+        if self._view is None or not self._view.is_current():
+            self._view = AlertStoreView(self.path) if self.exists() else None
+        return self._view
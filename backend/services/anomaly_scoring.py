@@ -0,0 +1,233 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from services.risk_rules import NO_TIME, epoch_seconds
+
+# --- Optional ML dependencies (graceful fallback: no transaction is flagged) ---
+SKLEARN_AVAILABLE = True
+try:
+    import joblib  # type: ignore
+    import sklearn  # type: ignore  # noqa: F401
+except Exception as imp_err:
+    SKLEARN_AVAILABLE = False
+    print(f"WARN: scikit-learn/joblib not available ({imp_err}). Anomaly scoring disabled.")
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'isolation_forest.pkl')
+
+# Features of models saved before they carried feature names (see train_model.py)
+LEGACY_FEATURES = ['amount_inr', 'timestamp_epoch']
+# What train_model.py fits today
+DEFAULT_FEATURES = ['amount_inr', 'hour_of_day', 'sender_velocity', 'counterparty_degree']
+
+_MODEL_CACHE = {}
+_MODEL_LOCK = threading.Lock()
+
+SECONDS_PER_DAY = 86400
+
+
+def _account_keys(accounts):
+    # Account numbers arrive as ints (raw CSV), strings or categoricals; key them all as text
+    return np.asarray(accounts).astype(str)
+
+
+class AccountActivity:
+    """
+    Per-account history behind the velocity and counterparty features: outgoing
+    transaction count, first/last timestamp and distinct counterparties.
+
+    Built with `update` one frame or chunk at a time, so training and streaming
+    analysis can summarize a history that never fits in memory. Memory grows
+    with accounts and distinct (sender, receiver) pairs, not with rows.
+    """
+    def __init__(self):
+        self._index = pd.Index([], dtype=object)
+        self._count = np.zeros(0, dtype=np.int64)
+        self._first = np.zeros(0, dtype=np.int64)
+        self._last = np.zeros(0, dtype=np.int64)
+        self._pair_parts = []
+        self._pending_pairs = 0
+        self._unique_pairs = 0
+        self._degree = None
+
+    @classmethod
+    def from_frame(cls, transactions, times=None):
+        activity = cls()
+        activity.update(transactions, times)
+        return activity
+
+    def __len__(self):
+        return len(self._index)
+
+    def _codes(self, keys, grow=False):
+        if grow:
+            uniques = pd.unique(keys)
+            missing = uniques[self._index.get_indexer(uniques) < 0]
+            if len(missing):
+                self._index = self._index.append(pd.Index(missing, dtype=object))
+                extra = len(missing)
+                self._count = np.concatenate([self._count, np.zeros(extra, dtype=np.int64)])
+                self._first = np.concatenate([self._first, np.full(extra, np.iinfo(np.int64).max)])
+                self._last = np.concatenate([self._last, np.full(extra, NO_TIME, dtype=np.int64)])
+        return self._index.get_indexer(keys)
+
+    def update(self, transactions, times=None):
+        """Folds a frame with from_account, to_account and timestamp into the summary."""
+        if len(transactions) == 0:
+            return
+        if times is None:
+            times = epoch_seconds(transactions['timestamp'])
+        senders = self._codes(_account_keys(transactions['from_account']), grow=True)
+        receivers = self._codes(_account_keys(transactions['to_account']), grow=True)
+        self._count += np.bincount(senders, minlength=len(self._index))
+        timed = times != NO_TIME
+        np.minimum.at(self._first, senders[timed], times[timed])
+        np.maximum.at(self._last, senders[timed], times[timed])
+        pairs = np.unique((senders.astype(np.int64) << 32) | receivers.astype(np.int64))
+        self._pair_parts.append(pairs)
+        self._pending_pairs += len(pairs)
+        # Merge the per-chunk pair sets once they outgrow the merged set, bounding memory
+        if self._pending_pairs > max(4 * self._unique_pairs, 1_000_000):
+            self._merge_pairs()
+        self._degree = None
+
+    def _merge_pairs(self):
+        merged = np.unique(np.concatenate(self._pair_parts)) if self._pair_parts else np.zeros(0, dtype=np.int64)
+        self._pair_parts = [merged]
+        self._pending_pairs = self._unique_pairs = len(merged)
+        return merged
+
+    def _sender_stats(self, accounts):
+        codes = self._codes(_account_keys(accounts))
+        known = codes >= 0
+        return codes, known
+
+    def velocity(self, accounts):
+        """Sender's outgoing transactions per active day (whole count if active under a day)."""
+        codes, known = self._sender_stats(accounts)
+        out = np.zeros(len(codes))
+        c = codes[known]
+        span_days = np.where(self._last[c] >= self._first[c], (self._last[c] - self._first[c]) / SECONDS_PER_DAY, 0.0)
+        out[known] = self._count[c] / np.maximum(span_days, 1.0)
+        return out
+
+    def degree(self, accounts):
+        """Distinct accounts the sender has paid."""
+        if self._degree is None or len(self._degree) != len(self._index):
+            pairs = self._merge_pairs()
+            self._degree = np.bincount(pairs >> 32, minlength=len(self._index)).astype(np.int64)
+        codes, known = self._sender_stats(accounts)
+        out = np.zeros(len(codes))
+        out[known] = self._degree[codes[known]]
+        return out
+
+
+def _hour_of_day(times):
+    return np.where(times != NO_TIME, (times % SECONDS_PER_DAY) // 3600, np.nan)
+
+
+# Per-transaction feature builders by the column name the model was fitted on:
+# fn(transactions, times, activity) -> float array, NaN where the row can't be featurized
+FEATURE_BUILDERS = {
+    'amount_inr': lambda tx, times, activity: pd.to_numeric(tx['amount_inr'], errors='coerce').to_numpy(dtype=float),
+    'timestamp_epoch': lambda tx, times, activity: np.where(times != NO_TIME, times, np.nan),
+    'hour_of_day': lambda tx, times, activity: _hour_of_day(times),
+    'sender_velocity': lambda tx, times, activity: activity.velocity(tx['from_account']),
+    'counterparty_degree': lambda tx, times, activity: activity.degree(tx['from_account']),
+}
+# Features that read account history
+ACTIVITY_FEATURES = {'sender_velocity', 'counterparty_degree'}
+
+
+def build_features(transactions, features=DEFAULT_FEATURES, times=None, activity=None):
+    """
+    Feature frame (columns in `features` order) for a transactions frame.
+    `activity` should summarize the whole history; without one it is built
+    from `transactions` alone.
+    """
+    if times is None:
+        times = epoch_seconds(transactions['timestamp'])
+    if activity is None and ACTIVITY_FEATURES.intersection(features):
+        activity = AccountActivity.from_frame(transactions, times)
+    columns = {name: FEATURE_BUILDERS[name](transactions, times, activity) for name in features}
+    return pd.DataFrame(columns, columns=list(features))
+
+
+class AnomalyModel:
+    """
+    A fitted IsolationForest plus the feature columns it expects.
+
+    `flag` builds the features for a frame (or streamed chunk) and predicts in
+    fixed-size batches spread over a thread pool; tree traversal runs in
+    sklearn's compiled code, so batches score in parallel across cores.
+    """
+    def __init__(self, model, path=None):
+        self.model = model
+        self.path = path
+        names = getattr(model, 'feature_names_in_', None)
+        self.features = [str(n) for n in names] if names is not None else list(LEGACY_FEATURES)
+        unknown = [n for n in self.features if n not in FEATURE_BUILDERS]
+        if unknown:
+            raise ValueError(f"model expects unsupported features: {', '.join(unknown)}")
+        self.batch_size = max(1, int(os.environ.get('RISK_ANOMALY_BATCH_SIZE', '200000')))
+        self.n_jobs = max(1, int(os.environ.get('RISK_ANOMALY_JOBS', '0')) or (os.cpu_count() or 1))
+
+    @property
+    def needs_activity(self):
+        return bool(ACTIVITY_FEATURES.intersection(self.features))
+
+    def flag(self, transactions, times=None, activity=None):
+        """
+        Boolean per row: True where the model predicts an outlier. `times` are
+        the rows' epoch seconds if already parsed; `activity` the account
+        history summary when the model uses account features.
+        """
+        n = len(transactions)
+        flags = np.zeros(n, dtype=bool)
+        if n == 0:
+            return flags
+        features = build_features(transactions, self.features, times=times, activity=activity)
+        # Rows missing a timestamp or amount can't be placed by the model; leave them unflagged
+        rows = np.flatnonzero(features.notna().all(axis=1).to_numpy())
+        if getattr(self.model, 'feature_names_in_', None) is None:
+            # Legacy models were fitted on a bare array and warn on named columns
+            features = features.to_numpy()
+        batches = [rows[i:i + self.batch_size] for i in range(0, len(rows), self.batch_size)]
+
+        def predict(batch):
+            return batch, self.model.predict(features[batch] if isinstance(features, np.ndarray) else features.iloc[batch]) == -1
+
+        if len(batches) <= 1 or self.n_jobs == 1:
+            results = map(predict, batches)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.n_jobs, len(batches))) as pool:
+                results = list(pool.map(predict, batches))
+        for batch, outliers in results:
+            flags[batch] = outliers
+        return flags
+
+
+def load_anomaly_model(path=MODEL_PATH):
+    """
+    The model at `path`, loaded once per process and reloaded only when the file
+    changes; None if scikit-learn is missing, no model was trained or it fails
+    to load.
+    """
+    if not SKLEARN_AVAILABLE or not os.path.exists(path):
+        return None
+    key = os.path.abspath(path)
+    mtime = os.path.getmtime(path)
+    with _MODEL_LOCK:
+        cached = _MODEL_CACHE.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            model = AnomalyModel(joblib.load(path), path=path)
+        except Exception as e:
+            print(f"WARN: Could not load anomaly model from {path}: {e}")
+            model = None
+        _MODEL_CACHE[key] = (mtime, model)
+        return model
@@ -0,0 +1,211 @@
+import os
+import json
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from services.risk_rules import ScoringContext
+from utils.data_loader import PARQUET_AVAILABLE
+from utils.metrics import profile_phase
+
+# Bump when columns or their definitions change to invalidate stored tables
+FEATURE_STORE_FORMAT = 1
+
+# Default location; FEATURE_STORE_DIR (env) moves it, e.g. to keep benchmarks and tests off the app's copy
+FEATURE_STORE_DIR = os.path.join(os.path.dirname(__file__), '..', 'generated-data', '.cache')
+
+# Rule aggregates reused as features, so the table and the scores agree by construction
+SHARED_AGGREGATES = ['high_value_credit_count', 'shell_tx_count', 'property_total', 'property_count']
+
+FEATURE_COLUMNS = [
+    'inflow_total', 'inflow_count', 'outflow_total', 'outflow_count', 'max_credit',
+    'counterparty_count', *SHARED_AGGREGATES,
+]
+
+
+def _distinct_counterparties(owners, counterparties, n):
+    """Distinct counterparty accounts per owner index (rows with owner -1 or no account are skipped)."""
+    codes, uniques = pd.factorize(counterparties)
+    keep = (owners >= 0) & (codes >= 0)
+    stride = len(uniques)
+    pairs = np.unique(owners[keep].astype(np.int64) * stride + codes[keep])
+    return np.bincount(pairs // max(stride, 1), minlength=n).astype(np.int64)
+
+
+def build_person_features(scorer, profile=None, positions=None):
+    """
+    One row per distinct person_id (first row wins, as in scoring) with the
+    per-person aggregates reports and lookups need, computed in one vectorized
+    pass over the scorer's transaction and property arrays. With `positions`
+    (rows of persons_df) only those persons' rows are built, from the
+    transactions on their accounts.
+    """
+    if positions is not None:
+        canonical = np.unique(scorer._canonical_rows[np.asarray(positions, dtype=np.int64)])
+        ctx = scorer._subset_context(canonical)
+    else:
+        canonical = np.unique(scorer._canonical_rows)
+        if len(canonical) == len(scorer.persons_df):
+            ctx = ScoringContext(scorer, canonical)
+        else:
+            ctx = ScoringContext(scorer, canonical, tx_rows=np.arange(len(scorer.transactions_df)))
+    n = ctx.n
+    with profile_phase(profile, 'feature_flows', rows=len(ctx.amounts)):
+        amounts = np.nan_to_num(ctx.amounts.astype(float))
+        to_person, from_person = ctx.to_person, ctx.from_person
+        into, out = to_person >= 0, from_person >= 0
+        max_credit = np.zeros(n)
+        np.maximum.at(max_credit, to_person[into], amounts[into])
+        columns = {
+            'inflow_total': np.bincount(to_person[into], weights=amounts[into], minlength=n),
+            'inflow_count': ctx.count(to_person),
+            'outflow_total': np.bincount(from_person[out], weights=amounts[out], minlength=n),
+            'outflow_count': ctx.count(from_person),
+            'max_credit': max_credit,
+        }
+    with profile_phase(profile, 'feature_counterparties', rows=len(ctx.amounts)):
+        # Accounts on the other side of each row, by number so accounts outside BankAccounts count too
+        owners = np.concatenate([to_person, from_person])
+        tx = scorer.transactions_df if ctx.tx_rows is None else scorer.transactions_df.iloc[ctx.tx_rows]
+        others = np.concatenate([tx['from_account'].to_numpy(), tx['to_account'].to_numpy()])
+        columns['counterparty_count'] = _distinct_counterparties(owners, others, n)
+    columns.update(scorer.rules.compute_aggregates(ctx, names=SHARED_AGGREGATES, profile=profile))
+    person_ids = scorer.persons_df['person_id'].to_numpy()[canonical].astype(str)
+    frame = pd.DataFrame({name: columns[name] for name in FEATURE_COLUMNS}, index=pd.Index(person_ids, name='person_id'))
+    for name in FEATURE_COLUMNS:
+        if name.endswith('_count'):
+            frame[name] = frame[name].astype(np.int64)
+    return frame
+
+
+class PersonFeatures:
+    """
+    A materialized feature table plus the stamp it was built under:
+    dataset version, transaction rows and the day shell companies were judged on.
+    """
+    def __init__(self, frame, stamp):
+        self.frame = frame
+        self.stamp = stamp
+
+    def __len__(self):
+        return len(self.frame)
+
+    def get(self, person_id):
+        """Features of `person_id` as plain Python values, or None if unknown."""
+        pos = self.frame.index.get_indexer([str(person_id)])[0]
+        if pos < 0:
+            return None
+        return {name: self.frame[name].iat[pos].item() for name in self.frame.columns}
+
+
+class FeatureStore:
+    """
+    Per-person feature table stored as Parquet next to the dataset cache, or
+    in `directory` (default: FEATURE_STORE_DIR env, else generated-data/.cache).
+
+    `materialize` reads the stored table when its stamp matches the scorer's
+    data, and otherwise builds it once and replaces the file (temp file +
+    rename); `update` rebuilds only the persons an appended batch touched.
+    Without pyarrow, or without a dataset version to key on, tables
+    are built in memory only.
+    """
+    def __init__(self, directory=None):
+        self.directory = directory or os.environ.get('FEATURE_STORE_DIR') or FEATURE_STORE_DIR
+        self.path = os.path.join(self.directory, 'PersonFeatures.parquet')
+        self.meta_path = os.path.join(self.directory, 'PersonFeatures.json')
+
+    @staticmethod
+    def stamp_for(scorer):
+        return {
+            'format': FEATURE_STORE_FORMAT,
+            'dataset_version': scorer.dataset_version,
+            'transactions': int(len(scorer.transactions_df)),
+            'as_of': datetime.now().date().isoformat(),
+        }
+
+    def load(self, stamp):
+        """The stored table if it was built under `stamp`, else None."""
+        if not PARQUET_AVAILABLE or not stamp.get('dataset_version'):
+            return None
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta != stamp:
+                return None
+            return PersonFeatures(pd.read_parquet(self.path).set_index('person_id'), stamp)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"WARN: Ignoring unreadable feature store: {e}")
+            return None
+
+    def write(self, features):
+        """Persists `features`; failures only cost the next process a rebuild."""
+        if not PARQUET_AVAILABLE or not features.stamp.get('dataset_version'):
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Drop the stamp first so a crash mid-write never labels the new table with the old stamp
+            if os.path.exists(self.meta_path):
+                os.remove(self.meta_path)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.features-', suffix='.tmp')
+            os.close(fd)
+            try:
+                features.frame.reset_index().to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, self.path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            # Unique temp name: request threads on a freshly published snapshot may write concurrently
+            fd, meta_tmp = tempfile.mkstemp(dir=self.directory, prefix='.features-', suffix='.json.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(features.stamp, f)
+            os.replace(meta_tmp, self.meta_path)
+        except Exception as e:
+            print(f"WARN: Could not write feature store: {e}")
+
+    def materialize(self, scorer, profile=None):
+        """PersonFeatures for the scorer's current data, from disk when still valid."""
+        stamp = self.stamp_for(scorer)
+        with profile_phase(profile, 'load_features'):
+            features = self.load(stamp)
+        if features is not None:
+            if profile is not None:
+                profile.counters['source'] = 'store'
+            return features
+        features = PersonFeatures(build_person_features(scorer, profile=profile), stamp)
+        with profile_phase(profile, 'write_features', rows=len(features)):
+            self.write(features)
+        if profile is not None:
+            profile.counters['source'] = 'built'
+        return features
+
+    def update(self, scorer, features, positions, profile=None):
+        """
+        PersonFeatures for the scorer's current data, made from `features` (a
+        table of the same persons before the last change) by rebuilding only
+        the rows of the persons at `positions`. Without a table to start from
+        the whole table is materialized.
+        """
+        if features is None:
+            return self.materialize(scorer, profile=profile)
+        if len(positions) == 0:
+            features = PersonFeatures(features.frame, self.stamp_for(scorer))
+            self.write(features)
+            return features
+        patch = build_person_features(scorer, profile=profile, positions=positions)
+        # A new frame: the old table may still be served by the previous snapshot
+        rows = features.frame.index.get_indexer(patch.index)
+        columns = {}
+        for name in features.frame.columns:
+            values = features.frame[name].to_numpy(copy=True)
+            values[rows] = patch[name].to_numpy()
+            columns[name] = values
+        features = PersonFeatures(pd.DataFrame(columns, index=features.frame.index), self.stamp_for(scorer))
+        with profile_phase(profile, 'write_features', rows=len(features)):
+            self.write(features)
+        if profile is not None:
+            profile.counters['features_patched'] = len(patch)
+        return features
@@ -8,6 +8,9 @@ class ReportGenerator:
     """
     Generates a comprehensive PDF intelligence report for a specific individual.
     """
+    # Datasets read by reports; DataLoader loads these up front
+    REQUIRED_DATASETS = ('persons', 'properties')
+
     def __init__(self, all_datasets):
         """
         Initializes the report generator with pre-loaded pandas DataFrames.
@@ -51,6 +54,9 @@ class ReportGenerator:
                 print(f"Error: Person with ID {person_id} not found for report generation.")
                 return None
             person_info = person_info.iloc[0]
+            person_properties = self.properties_df[self.properties_df['person_id'] == person_id]
+            # Per-person aggregates from the scorer's feature store (services/feature_store.py)
+            features = (risk_details or {}).get('features') or {}
             
             # Create PDF with explicit settings to avoid layout issues
             pdf = FPDF(orientation='P', unit='mm', format='A4')
@@ -97,7 +103,7 @@ class ReportGenerator:
             gen_ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             # Metadata: basic counts to aid traceability
             factors_count = len((risk_details or {}).get('breakdown', {}) or {})
-            props_count = int(self.properties_df[self.properties_df['person_id'] == person_id].shape[0])
+            props_count = int(features.get('property_count', len(person_properties)))
             safe_mc(f"Generated on: {gen_ts}", h=6)
             safe_mc(f"Rows: risk_factors={factors_count}, properties={props_count}", h=6)
             # Include dataset seed/snapshot if available
@@ -187,6 +193,14 @@ class ReportGenerator:
                 ("Declared Salary", salary_text),
                 ("Address", person_info.get('address', 'N/A')),
             ]
+            if features:
+                details_pairs += [
+                    ("Total Inflow", f"INR {int(features['inflow_total']):,} ({features['inflow_count']} credits)"),
+                    ("Total Outflow", f"INR {int(features['outflow_total']):,} ({features['outflow_count']} debits)"),
+                    ("Largest Credit", f"INR {int(features['max_credit']):,}"),
+                    ("Counterparty Accounts", features['counterparty_count']),
+                    ("Property Holdings", f"INR {int(features['property_total']):,}"),
+                ]
             key_w = int(content_width * 0.35)
             val_w = content_width - key_w
             for k,v in details_pairs:
@@ -213,7 +227,6 @@ class ReportGenerator:
 
             # --- Associated Properties (tabular) ---
             self._add_section_title(pdf, "Associated Properties")
-            person_properties = self.properties_df[self.properties_df['person_id'] == person_id]
             if not person_properties.empty:
                 pdf.set_font("Helvetica", 'B', 10)
                 addr_w = int(content_width * 0.70)
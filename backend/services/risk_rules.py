@@ -0,0 +1,448 @@
+import os
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.metrics import profile_phase
+
+# Epoch-seconds value for missing/unparseable timestamps
+NO_TIME = np.iinfo(np.int64).min
+
+
+def epoch_seconds(values):
+    """Timestamps (datetimes or strings) as int64 epoch seconds; NO_TIME where missing."""
+    parsed = pd.to_datetime(pd.Series(values), format='mixed', errors='coerce')
+    seconds = parsed.to_numpy(dtype='datetime64[s]').astype(np.int64)
+    seconds[parsed.isna().to_numpy()] = NO_TIME
+    return seconds
+
+
+def structuring_window_seconds():
+    return int(float(os.environ.get('RISK_STRUCTURING_WINDOW_HOURS', '168')) * 3600)
+
+
+class ScoringContext:
+    """
+    Arrays for one scoring pass over a set of persons.
+
+    Person-level arrays have one entry per selected person. Transaction arrays
+    cover every transaction (full pass), only the rows on the selected persons'
+    accounts (`tx_rows`), or an explicit chunk read from disk (`transactions`,
+    shaped like `HybridRiskScorer._transaction_arrays`); `to_person` /
+    `from_person` give the selected-person index owning each side of a row, or -1.
+    """
+    def __init__(self, scorer, positions, tx_rows=None, transactions=None):
+        self.scorer = scorer
+        self.positions = positions
+        self.n = len(positions)
+        self.tx_rows = tx_rows
+        self.transactions = transactions
+
+    def _tx(self, name):
+        if self.transactions is not None:
+            return self.transactions[name]
+        values = getattr(self.scorer, f'_tx_{name}')
+        return values if self.tx_rows is None else values[self.tx_rows]
+
+    def _local(self, person_positions):
+        """Maps person row positions to indexes into the selected persons (-1 if absent)."""
+        if self.n == len(self.scorer._canonical_rows):
+            # Positions are unique rows, so selecting as many as there are persons means all of them
+            return person_positions
+        idx = np.searchsorted(self.positions, person_positions)
+        idx = np.minimum(idx, max(self.n - 1, 0))
+        hit = (person_positions >= 0) & (self.positions[idx] == person_positions) if self.n else np.zeros(len(idx), dtype=bool)
+        return np.where(hit, idx, -1)
+
+    def _owners(self, codes):
+        owners = np.full(len(codes), -1, dtype=np.int64)
+        known = codes >= 0
+        owners[known] = self.scorer._account_owner_positions[codes[known]]
+        return self._local(owners)
+
+    def count(self, person_index, mask=None):
+        """Counts rows per selected person, optionally only where `mask` holds."""
+        keep = person_index >= 0
+        if mask is not None:
+            keep &= mask
+        return np.bincount(person_index[keep], minlength=self.n)
+
+    @cached_property
+    def salary(self):
+        return self.scorer._salaries[self.positions].astype(float)
+
+    @cached_property
+    def tax_status(self):
+        return self.scorer._tax_statuses[self.positions]
+
+    @cached_property
+    def amounts(self):
+        return self._tx('amounts')
+
+    @cached_property
+    def modes(self):
+        return self._tx('modes')
+
+    @cached_property
+    def from_codes(self):
+        return self._tx('from_codes')
+
+    @cached_property
+    def to_codes(self):
+        return self._tx('to_codes')
+
+    @cached_property
+    def times(self):
+        return self._tx('times')
+
+    @cached_property
+    def anomalous(self):
+        """Per row: flagged as an outlier by the anomaly model (all False without one)."""
+        return self._tx('anomalous')
+
+    @cached_property
+    def from_person(self):
+        return self._owners(self.from_codes)
+
+    @cached_property
+    def to_person(self):
+        return self._owners(self.to_codes)
+
+    @cached_property
+    def shell_accounts(self):
+        return self.scorer._shell_account_mask()
+
+    @cached_property
+    def structuring_windows(self):
+        """Per selected person: busiest near-threshold cash-deposit window on any one account."""
+        rows = np.flatnonzero(structuring_candidates(self) & (self.to_person >= 0) & (self.times != NO_TIME))
+        return peak_windows(
+            self.to_codes[rows], self.times[rows], self.to_person[rows], self.n, structuring_window_seconds()
+        )
+
+    @cached_property
+    def property_person(self):
+        return self._local(self.scorer._property_owner_positions[self._property_rows])
+
+    @cached_property
+    def property_values(self):
+        return self.scorer._property_values[self._property_rows]
+
+    @cached_property
+    def _property_rows(self):
+        if self.tx_rows is None:
+            return np.arange(len(self.scorer._property_values))
+        return self.scorer._property_rows_for(self.positions)
+
+
+@dataclass(frozen=True)
+class Aggregate:
+    """
+    A per-person input computed once per pass and shared by every rule reading it.
+
+    `source='transactions'` aggregates are counts over transaction rows, so
+    partial results over disjoint row sets can simply be summed. Aggregates
+    that can't be summed (e.g. windows over time) declare `rows`, a mask of the
+    only transaction rows they depend on; streaming keeps those rows across
+    chunks and computes the aggregate once at the end.
+    """
+    name: str
+    compute: Callable[[ScoringContext], np.ndarray]
+    source: str = 'persons'
+    rows: Optional[Callable[[ScoringContext], np.ndarray]] = None
+
+
+@dataclass(frozen=True)
+class RiskRule:
+    """
+    A risk factor: which aggregates it reads, how they map to a 0-100 score and
+    how much that score weighs in the final risk score.
+
+    Count-style rules declare `buckets` as (min_count, score) pairs sorted from
+    high to low and are scored on their first input; other rules supply `score`.
+    A rule that `requires` an optional service (e.g. 'anomaly_model') carries
+    no weight when it is unavailable; see `compile_rules`.
+    """
+    name: str
+    breakdown_key: str
+    label: str
+    summary: str
+    weight: float
+    inputs: Tuple[str, ...]
+    buckets: Tuple[Tuple[int, int], ...] = ()
+    score: Callable[..., np.ndarray] = None
+    requires: Optional[str] = None
+
+    def evaluate(self, values: Dict[str, np.ndarray]) -> np.ndarray:
+        if self.score is not None:
+            return np.asarray(self.score(*(values[name] for name in self.inputs))).astype(np.int64)
+        return bucket_counts(values[self.inputs[0]], self.buckets)
+
+
+AGGREGATES: Dict[str, Aggregate] = {}
+RULES: Dict[str, RiskRule] = {}
+
+
+def register_aggregate(name, source='persons', rows=None):
+    """Decorator registering `fn(ctx) -> array` as a named per-person aggregate."""
+    def decorator(fn):
+        AGGREGATES[name] = Aggregate(name=name, compute=fn, source=source, rows=rows)
+        return fn
+    return decorator
+
+
+def register_rule(rule: RiskRule):
+    for name in rule.inputs:
+        if name not in AGGREGATES:
+            raise ValueError(f"rule '{rule.name}' reads unknown aggregate '{name}'")
+    RULES[rule.name] = rule
+    return rule
+
+
+def bucket_counts(counts, buckets):
+    """Maps event counts to scores given (min_count, score) pairs sorted high to low."""
+    conditions = [counts >= min_count for min_count, _ in buckets]
+    return np.select(conditions, [score for _, score in buckets], default=0).astype(np.int64)
+
+
+def peak_windows(group_codes, times, owners, n, window):
+    """
+    Busiest time window per owner over events grouped by `group_codes` (e.g. accounts).
+
+    Events are sorted by (group, time); for each event, a searchsorted pass on a
+    (group rank, time) key finds the last event in the same group at most
+    `window` seconds later, giving every window's count in O(k log k). Each of
+    the `n` owners gets its highest count (earliest window on ties) with the
+    window's first and last event times; owners without events get 0 / NO_TIME.
+    """
+    peak = np.zeros(n, dtype=np.int64)
+    start = np.full(n, NO_TIME, dtype=np.int64)
+    end = np.full(n, NO_TIME, dtype=np.int64)
+    if len(times) == 0:
+        return {'peak_count': peak, 'window_start': start, 'window_end': end}
+    order = np.lexsort((times, group_codes))
+    codes, times, owners = group_codes[order], times[order], owners[order]
+    rank = np.concatenate([[0], np.cumsum(codes[1:] != codes[:-1])])
+    offset = times - times.min()
+    key = rank * (int(offset.max()) + window + 1) + offset
+    last = np.searchsorted(key, key + window, side='right') - 1
+    counts = last - np.arange(len(key)) + 1
+    # Best window per owner: highest count, then earliest start
+    best = np.lexsort((times, -counts, owners))
+    first = best[np.concatenate([[True], owners[best][1:] != owners[best][:-1]])]
+    peak[owners[first]] = counts[first]
+    start[owners[first]] = times[first]
+    end[owners[first]] = times[last[first]]
+    return {'peak_count': peak, 'window_start': start, 'window_end': end}
+
+
+class CompiledRules:
+    """
+    The registered rules flattened into one evaluation plan: each aggregate any
+    rule reads is computed exactly once, then every rule adds one score column.
+
+    Weights are renormalized over the active rules (those whose requirement is
+    in `available`) so they sum to 1; inactive rules are still scored but weigh 0.
+    """
+    def __init__(self, rules: List[RiskRule], available=()):
+        self.rules = list(rules)
+        self.names = [rule.name for rule in self.rules]
+        active = {rule.name for rule in self.rules if rule.requires is None or rule.requires in available}
+        total = sum(rule.weight for rule in self.rules if rule.name in active)
+        self.weights = {rule.name: rule.weight / total if rule.name in active else 0.0 for rule in self.rules}
+        self.summaries = {rule.name: rule.summary for rule in self.rules}
+        self.aggregates = []
+        for rule in self.rules:
+            for name in rule.inputs:
+                if name not in self.aggregates:
+                    self.aggregates.append(name)
+        # How each aggregate combines across transaction chunks
+        self.person_level = [n for n in self.aggregates if AGGREGATES[n].source == 'persons']
+        self.row_scoped = [n for n in self.aggregates if AGGREGATES[n].rows is not None]
+        self.additive = [n for n in self.aggregates if n not in self.person_level and n not in self.row_scoped]
+
+    def compute_aggregates(self, ctx: ScoringContext, names=None, profile=None) -> Dict[str, np.ndarray]:
+        """
+        Computes every aggregate the rules read, or only `names`. With a
+        `profile` (utils.metrics.RunProfile) each one is timed as
+        'aggregate:<name>' with the persons or transaction rows it scanned.
+        """
+        values = {}
+        for name in (self.aggregates if names is None else names):
+            rows = ctx.n if AGGREGATES[name].source == 'persons' else len(ctx.amounts)
+            with profile_phase(profile, f'aggregate:{name}', rows=rows):
+                values[name] = AGGREGATES[name].compute(ctx)
+        return values
+
+    def scoped_rows(self, ctx: ScoringContext) -> np.ndarray:
+        """Mask of the transaction rows any row-scoped aggregate depends on."""
+        keep = np.zeros(len(ctx.amounts), dtype=bool)
+        for name in self.row_scoped:
+            keep |= AGGREGATES[name].rows(ctx)
+        return keep
+
+    def score(self, values: Dict[str, np.ndarray], profile=None) -> Dict[str, np.ndarray]:
+        scores = {}
+        for rule in self.rules:
+            rows = len(values[rule.inputs[0]]) if rule.inputs else None
+            with profile_phase(profile, f'rule:{rule.name}', rows=rows):
+                scores[rule.name] = rule.evaluate(values)
+        return scores
+
+    def evaluate(self, ctx: ScoringContext, profile=None) -> Dict[str, np.ndarray]:
+        return self.score(self.compute_aggregates(ctx, profile=profile), profile=profile)
+
+    def weighted_total(self, scores):
+        # Accumulate in registry order so floats match a per-person sum() exactly
+        total = np.zeros(len(scores[self.names[0]]) if self.names else 0)
+        for name in self.names:
+            total = total + np.asarray(scores[name]) * self.weights[name]
+        return total
+
+
+def compile_rules(available=()) -> CompiledRules:
+    """The registered rules, weighted over those whose requirement is in `available`."""
+    return CompiledRules(list(RULES.values()), available=available)
+
+
+# --- Aggregates ---
+
+STRUCTURING_BAND = (40000, 49999)
+# The generator's structuring pattern emits 'Cash Deposit'; older data uses 'Cash'
+CASH_MODES = ('Cash', 'Cash Deposit')
+
+
+@register_aggregate('salary')
+def _salary(ctx):
+    return ctx.salary
+
+
+@register_aggregate('tax_not_filed')
+def _tax_not_filed(ctx):
+    return ctx.tax_status == 'Not Filed'
+
+
+@register_aggregate('high_value_credit_count', source='transactions')
+def _high_value_credit_count(ctx):
+    # Credits exceeding 2x the recipient's salary
+    recipients = ctx.to_person
+    salary = np.full(len(recipients), np.nan)
+    known = recipients >= 0
+    salary[known] = ctx.salary[recipients[known]]
+    return ctx.count(recipients, ctx.amounts > salary * 2)
+
+
+def structuring_candidates(ctx):
+    """Cash deposits just under the reporting threshold into a known account (no timestamps needed)."""
+    low, high = STRUCTURING_BAND
+    amounts = ctx.amounts
+    return np.isin(ctx.modes, CASH_MODES) & (amounts >= low) & (amounts <= high) & (ctx.to_codes >= 0)
+
+
+@register_aggregate('structuring_peak_count', source='transactions', rows=structuring_candidates)
+def _structuring_peak_count(ctx):
+    # Most near-threshold cash deposits into one account within a sliding window
+    return ctx.structuring_windows['peak_count']
+
+
+@register_aggregate('shell_tx_count', source='transactions')
+def _shell_tx_count(ctx):
+    shell = ctx.shell_accounts
+    if not shell.any():
+        return np.zeros(ctx.n, dtype=np.int64)
+    from_shell = (ctx.from_codes >= 0) & shell[np.maximum(ctx.from_codes, 0)]
+    to_shell = (ctx.to_codes >= 0) & shell[np.maximum(ctx.to_codes, 0)]
+    # Shell accounts belong to companies, so a row counts for at most one person per side
+    return ctx.count(ctx.to_person, from_shell) + ctx.count(ctx.from_person, to_shell)
+
+
+@register_aggregate('tx_count', source='transactions')
+def _tx_count(ctx):
+    # Rows on either side of a person's accounts (a self-transfer counts for both sides)
+    return ctx.count(ctx.from_person) + ctx.count(ctx.to_person)
+
+
+@register_aggregate('anomalous_tx_count', source='transactions')
+def _anomalous_tx_count(ctx):
+    flagged = ctx.anomalous
+    return ctx.count(ctx.from_person, flagged) + ctx.count(ctx.to_person, flagged)
+
+
+@register_aggregate('property_total')
+def _property_total(ctx):
+    keep = ctx.property_person >= 0
+    values = np.nan_to_num(ctx.property_values[keep].astype(float))
+    return np.bincount(ctx.property_person[keep], weights=values, minlength=ctx.n)
+
+
+@register_aggregate('property_count')
+def _property_count(ctx):
+    return ctx.count(ctx.property_person)
+
+
+# --- Rules ---
+
+def _income_score(high_value_credits, salary):
+    # Each anomalous credit adds 20 points up to 100
+    return np.where(salary > 0, np.minimum(100, high_value_credits * 20), 0)
+
+
+def _property_score(total_value, property_count, salary):
+    # Ratio of total property value to annual salary, scaled linearly between 5x and 50x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(salary > 0, total_value / (salary * 12), 0.0)
+        scaled = np.clip(np.maximum(10, np.trunc(((ratio - 5) / (50 - 5)) * 100)), None, 100)
+    score = np.select([ratio <= 5, ratio >= 50], [0, 100], default=scaled)
+    return np.where((property_count > 0) & (salary > 0), score, 0)
+
+
+# Persons with fewer transactions than this get no anomaly score; one odd row isn't a rate
+ANOMALY_MIN_TRANSACTIONS = 5
+# Anomaly rate scored linearly from 0 at the floor to 100 at the ceiling (the model expects ~1%)
+ANOMALY_RATE_FLOOR = 0.02
+ANOMALY_RATE_CEILING = 0.20
+
+
+def _anomaly_score(anomalous, total):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(total > 0, anomalous / np.maximum(total, 1), 0.0)
+    scaled = np.trunc((rate - ANOMALY_RATE_FLOOR) / (ANOMALY_RATE_CEILING - ANOMALY_RATE_FLOOR) * 100)
+    return np.where(total >= ANOMALY_MIN_TRANSACTIONS, np.clip(scaled, 0, 100), 0)
+
+
+# The five data rules weigh 1.0 together, so without a trained model scores are unchanged.
+# With one, the anomaly rule's 0.10 joins them and all six are divided by their sum (1.10),
+# keeping the final score on the factors' 0-100 scale.
+register_rule(RiskRule(
+    name='income_discrepancy', breakdown_key='income', label='Income vs. Transactions',
+    summary="high-value credits inconsistent with salary", weight=0.30,
+    inputs=('high_value_credit_count', 'salary'), score=_income_score,
+))
+register_rule(RiskRule(
+    name='structuring', breakdown_key='structuring', label='Transaction Structuring',
+    summary="structuring patterns (clustered near-threshold cash deposits)", weight=0.25,
+    inputs=('structuring_peak_count',), buckets=((8, 100), (5, 70), (3, 40), (1, 15)),
+))
+register_rule(RiskRule(
+    name='shell_company_interaction', breakdown_key='shell', label='Shell Company Links',
+    summary="transactions with suspected shell companies", weight=0.25,
+    inputs=('shell_tx_count',), buckets=((10, 100), (5, 70), (2, 40), (1, 20)),
+))
+register_rule(RiskRule(
+    name='property_discrepancy', breakdown_key='property', label='High-Value Property',
+    summary="high-value property ownership", weight=0.15,
+    inputs=('property_total', 'property_count', 'salary'), score=_property_score,
+))
+register_rule(RiskRule(
+    name='tax_status', breakdown_key='tax', label='Tax Status Irregularities',
+    summary="tax filing irregularities", weight=0.05,
+    inputs=('tax_not_filed',), score=lambda not_filed: np.where(not_filed, 80, 0),
+))
+register_rule(RiskRule(
+    name='transaction_anomaly', breakdown_key='anomaly', label='Anomalous Transactions',
+    summary="a high rate of model-flagged anomalous transactions", weight=0.10,
+    inputs=('anomalous_tx_count', 'tx_count'), score=_anomaly_score, requires='anomaly_model',
+))
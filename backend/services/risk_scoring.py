@@ -1,183 +1,734 @@
 import os
+import copy
+import time
+import threading
+import multiprocessing
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+from services.risk_rules import NO_TIME, ScoringContext, compile_rules, epoch_seconds, structuring_window_seconds
+from services.alert_index import AlertIndex
+from services.alert_store import AlertStore
+from services.anomaly_scoring import AccountActivity, load_anomaly_model
+from services.feature_store import FeatureStore, PersonFeatures
+from services.search_index import PersonSearchIndex
+from utils.cache import LRUCache
+from utils.data_loader import TransactionIdIndex, delta_segment_paths
+from utils.metrics import analysis_metrics, profile_phase
+
 # Increment this whenever scoring logic changes materially
-SCORING_VERSION = 2
+SCORING_VERSION = 6
+
+TRANSACTION_COLUMNS = ['transaction_id','from_account','to_account','amount_inr','timestamp','payment_mode']
+
+# Columns read per chunk by streaming analysis
+STREAM_COLUMNS = ['from_account','to_account','amount_inr','timestamp','payment_mode']
+
+DEFAULT_TRANSACTIONS_PATH = os.path.join(os.path.dirname(__file__), '..', 'generated-data', 'Transactions.csv')
+
+# Alerts live in a binary store; the CSV is an export written on full/incremental runs
+ALERT_STORE_PATH = os.path.join(os.path.dirname(__file__), '..', 'generated-data', 'AlertScores.npy')
+ALERTS_CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'generated-data', 'AlertScores.csv')
+
+ALERT_COLUMNS = [
+    'alert_id','person_id','full_name','final_risk_score','risk_score','timestamp','summary','status','scoring_version'
+]
+
+# Scorer visible to forked shard workers; only set while a pool is running so the
+# children read the parent's arrays copy-on-write instead of unpickling them.
+_SHARD_SCORER = None
+
+def _score_shard(positions):
+    return _SHARD_SCORER._score_population(positions)
 
 class HybridRiskScorer:
     """
     A service to analyze financial data, calculate risk scores for individuals
     based on money laundering patterns, and provide detailed investigation data.
     """
-    def __init__(self, all_datasets):
+    # Datasets read while building the scorer; DataLoader loads these up front
+    REQUIRED_DATASETS = ('persons', 'accounts', 'transactions', 'companies', 'properties')
+    # Set per process by _init_services; every other attribute is derived from the data
+    SERVICE_ATTRIBUTES = (
+        '_datasets', 'alert_store', 'alerts_csv_path', 'alert_index', 'feature_store', '_person_features',
+        '_features_lock', 'rules', 'anomaly_model', 'dataset_version', 'details_cache', 'metrics', '_shell_mask_cache',
+    )
+    # Dicts of one small array per person: cheap to regroup, costly to share as separate memory maps
+    GROUP_ATTRIBUTES = ('_person_account_rows', '_person_property_rows')
+
+    def __init__(self, all_datasets, dataset_version=None, metrics=None):
         """
         Initializes the service with all pre-loaded dataframes.
+
+        `dataset_version` identifies the loaded data (see DataLoader.dataset_version)
+        and is part of every risk-detail cache key. `metrics` (default: the
+        process-wide utils.metrics.analysis_metrics) receives per-phase run
+        profiles and per-person scoring latencies.
         """
+        self._assign_frames(all_datasets)
+        # Initialize the risk_scores_df attribute to None.
+        # It will be populated when run_full_analysis is called.
+        self.risk_scores_df = None
+        self._init_services(all_datasets, dataset_version, metrics)
+
+        # Preprocess the data to prepare it for analysis
+        with self.metrics.run('preprocess') as profile:
+            self._preprocess_data(profile)
+            profile.counters.update(persons=len(self.persons_df), transactions=len(self.transactions_df))
+
+    def _assign_frames(self, all_datasets):
         # Assign dataframes from the input dictionary
         self.persons_df = all_datasets['persons']
         self.accounts_df = all_datasets['accounts']
-        self.transactions_df = all_datasets['transactions']
+        # Streaming-only callers may omit transactions; run_full_analysis then reads them from disk
+        self.transactions_df = all_datasets.get('transactions')
+        if self.transactions_df is None:
+            self.transactions_df = pd.DataFrame(columns=TRANSACTION_COLUMNS)
         self.companies_df = all_datasets['companies']
         self.properties_df = all_datasets['properties']
-        self.directorships_df = all_datasets['directorships']
-        
-        # Initialize the risk_scores_df attribute to None.
-        # It will be populated when run_full_analysis is called.
-        self.risk_scores_df = None
-        
-        # Preprocess the data to prepare it for analysis
-        self._preprocess_data()
 
-    def _preprocess_data(self):
+    def _init_services(self, all_datasets, dataset_version, metrics):
+        """Per-process state around the data: stores, caches, rules, model and metrics."""
+        # Not read by any rule; kept reachable without forcing a lazy load (see DataLoader.require)
+        self._datasets = all_datasets
+        # Persisted alerts, and a sorted view of them for /api/alerts replaced on every write
+        self.alert_store = AlertStore(ALERT_STORE_PATH)
+        self.alerts_csv_path = ALERTS_CSV_PATH
+        self.alert_index = None
+        # Per-person aggregates for reports and lookups, materialized once per data version
+        self.feature_store = FeatureStore()
+        self._person_features = None
+        self._features_lock = threading.Lock()
+
+        # Trained IsolationForest (train_model.py), shared across scorers; None disables the anomaly factor
+        self.anomaly_model = load_anomaly_model()
+        # Registered risk rules compiled into a single aggregate/score plan, weighted over those that can run
+        self.rules = compile_rules(available=('anomaly_model',) if self.anomaly_model is not None else ())
+
+        # Per-person risk details served to investigate/report; cleared whenever scores change
+        self.dataset_version = dataset_version
+        self.details_cache = LRUCache(maxsize=int(os.environ.get('RISK_DETAILS_CACHE_SIZE', '1024')))
+        self.metrics = metrics if metrics is not None else analysis_metrics
+        self._shell_mask_cache = (None, None)
+
+    def shared_state(self):
+        """
+        The loaded frames, lookup indexes and alerts, i.e. everything but the
+        per-process services: what services.snapshot exports for other worker
+        processes to attach to with `from_shared_state`.
+        """
+        excluded = set(self.SERVICE_ATTRIBUTES + self.GROUP_ATTRIBUTES)
+        return {name: value for name, value in vars(self).items() if name not in excluded}
+
+    @classmethod
+    def from_shared_state(cls, state, all_datasets, dataset_version=None, metrics=None):
+        """A scorer over `state` (see `shared_state`) without preprocessing; arrays may be read-only memory maps."""
+        scorer = cls.__new__(cls)
+        scorer._init_services(all_datasets, dataset_version, metrics)
+        vars(scorer).update(state)
+        scorer._build_person_groups()
+        return scorer
+
+    @property
+    def directorships_df(self):
+        return self._datasets.get('directorships')
+
+    def _preprocess_data(self, profile=None, changed=None):
         """
-        Prepares and merges dataframes for efficient analysis.
+        Prepares dataframes and lookup indexes for efficient analysis.
         """
-        self.transactions_df['timestamp'] = pd.to_datetime(self.transactions_df['timestamp'], format='mixed')
-        self.companies_df['incorporation_date'] = pd.to_datetime(self.companies_df['incorporation_date'])
+        with profile_phase(profile, 'parse_dates', rows=len(self.transactions_df) + len(self.companies_df)):
+            # Shallow copies: the parsed columns replace ours only, never the loader's frames
+            self.transactions_df = self.transactions_df.copy(deep=False)
+            self.companies_df = self.companies_df.copy(deep=False)
+            self.transactions_df['timestamp'] = pd.to_datetime(self.transactions_df['timestamp'], format='mixed')
+            self.companies_df['incorporation_date'] = pd.to_datetime(self.companies_df['incorporation_date'])
         
         # Standardize person identifier columns across all relevant dataframes
-        temp_accounts_df = self.accounts_df.rename(columns={'owner_id': 'person_id'})
-        self.properties_df = self.properties_df.rename(columns={'owner_person_id': 'person_id'})
+        with profile_phase(profile, 'split_accounts', rows=len(self.accounts_df) + len(self.properties_df)):
+            temp_accounts_df = self.accounts_df.rename(columns={'owner_id': 'person_id'})
+            self.properties_df = self.properties_df.rename(columns={'owner_person_id': 'person_id'})
 
-        self.person_accounts_df = temp_accounts_df[~temp_accounts_df['person_id'].str.startswith('C')]
-        self.company_accounts_df = temp_accounts_df[temp_accounts_df['person_id'].str.startswith('C')]
-        
-        # Merge transactions with person details for scoring
-        self.tx_details_df = self.transactions_df.merge(
-            self.person_accounts_df[['account_number', 'person_id']],
-            left_on='from_account', right_on='account_number', how='left'
-        ).rename(columns={'person_id': 'from_person_id'})
+            self.person_accounts_df = temp_accounts_df[~temp_accounts_df['person_id'].str.startswith('C')]
+            self.company_accounts_df = temp_accounts_df[temp_accounts_df['person_id'].str.startswith('C')]
         
-        self.tx_details_df = self.tx_details_df.merge(
-            self.person_accounts_df[['account_number', 'person_id']],
-            left_on='to_account', right_on='account_number', how='left'
-        ).rename(columns={'person_id': 'to_person_id'})
-
-        self.tx_details_df = self.tx_details_df.merge(
-            self.persons_df[['person_id', 'monthly_salary_inr']],
-            left_on='from_person_id', right_on='person_id', how='left'
-        ).rename(columns={'monthly_salary_inr': 'from_person_salary'})
-        
-        self.tx_details_df = self.tx_details_df.merge(
-            self.persons_df[['person_id', 'monthly_salary_inr']],
-            left_on='to_person_id', right_on='person_id', how='left'
-        ).rename(columns={'monthly_salary_inr': 'to_person_salary'})
-
-    def run_full_analysis(self):
-        """Execute all risk scoring rules for all persons and persist alert list."""
-        all_scores: list[dict] = []
-
-        threshold = int(os.environ.get('RISK_ALERT_THRESHOLD', '10'))
-
-        for _, person in self.persons_df.iterrows():
-            person_id = person['person_id']
-
-            scores = {
-                'income_discrepancy': self._calculate_income_discrepancy_score(person_id),
-                'structuring': self._calculate_structuring_score(person_id),
-                'shell_company_interaction': self._calculate_shell_company_score(person_id),
-                'property_discrepancy': self._calculate_property_discrepancy_score(person_id),
-                'tax_status': self._calculate_tax_status_score(person_id),
-            }
-
-            weights = {
-                'income_discrepancy': 0.30,
-                'structuring': 0.25,
-                'shell_company_interaction': 0.25,
-                'property_discrepancy': 0.15,
-                'tax_status': 0.05,
-            }
-
-            final_score = sum(scores[k] * weights[k] for k in scores)
-
-            if final_score > threshold:
-                all_scores.append({
-                    'alert_id': f"ALT-{len(all_scores)+1:03d}",
-                    'person_id': person_id,
-                    'full_name': person['full_name'],
-                    'final_risk_score': int(final_score),
-                    'risk_score': int(final_score),  # compatibility
-                    'timestamp': pd.Timestamp.now().isoformat(),
-                    'summary': self._generate_summary(scores),
-                    'status': 'active',
-                    'scoring_version': SCORING_VERSION,
-                })
+        self._build_indexes(profile, changed)
+
+    def _build_indexes(self, profile=None, changed=None):
+        """
+        Builds per-load lookup structures so single-person queries only touch that
+        person's rows: person/account position maps, account->owner arrays and
+        CSR-style account->transaction row offsets for both directions.
+
+        With `changed` (dataset keys) only the structures built from those
+        datasets are rebuilt and the rest are kept (see `with_datasets`).
+        """
+        def stale(*keys):
+            return changed is None or not changed.isdisjoint(keys)
+
+        started = time.perf_counter()
+        if stale('persons'):
+            # person_id -> first row position (matches the .iloc[0] lookups elsewhere)
+            person_ids = self.persons_df['person_id'].to_numpy()
+            first_rows = np.flatnonzero(~self.persons_df['person_id'].duplicated().to_numpy())
+            self._person_positions = dict(zip(person_ids[first_rows], first_rows))
+            self._position_of = pd.Series(first_rows, index=person_ids[first_rows])
+            # Duplicate person rows score like the first row with their id
+            self._canonical_rows = self._positions_of(person_ids)
+            self._salaries = self.persons_df['monthly_salary_inr'].to_numpy()
+            self._tax_statuses = self.persons_df['tax_filing_status'].to_numpy()
+
+        if stale('persons', 'accounts'):
+            self._account_person_pairs = self.person_accounts_df[['account_number', 'person_id']].drop_duplicates()
+            # Dense account codes: position of each account number in a sorted unique array
+            all_accounts = pd.concat([self.person_accounts_df, self.company_accounts_df])
+            self._account_keys, first_idx = np.unique(all_accounts['account_number'].to_numpy(), return_index=True)
+            self._account_owners = all_accounts['person_id'].to_numpy()[first_idx]
+            self._account_owner_positions = self._positions_of(self._account_owners)
+            self._person_account_numbers = self._account_person_pairs['account_number'].to_numpy()
+        if stale('persons', 'properties'):
+            self._property_owner_positions = self._positions_of(self.properties_df['person_id'])
+            self._property_values = self.properties_df['purchase_value_inr'].to_numpy()
+        if stale('persons', 'accounts', 'properties'):
+            self._build_person_groups()
+        started = self._record_phase(profile, 'index_persons_accounts', started, len(self.persons_df) + len(self.accounts_df))
+
+        if stale('accounts', 'transactions'):
+            # Sender history for the anomaly model's account features, kept current by incremental updates
+            self._account_activity = None
+            if self.anomaly_model is not None and self.anomaly_model.needs_activity:
+                self._account_activity = AccountActivity.from_frame(self.transactions_df)
+            # Transaction columns as arrays plus account codes (-1 for unknown accounts)
+            for name, values in self._transaction_arrays(self.transactions_df).items():
+                setattr(self, f'_tx_{name}', values)
+            self._out_offsets, self._out_rows = self._csr_index(self._tx_from_codes, len(self._account_keys))
+            self._in_offsets, self._in_rows = self._csr_index(self._tx_to_codes, len(self._account_keys))
+        if stale('transactions'):
+            # Built on the first append (see transaction_id_index)
+            self._transaction_ids = None
+        self._shell_mask_cache = (None, None)
+        started = self._record_phase(profile, 'index_transactions', started, len(self.transactions_df))
+        if stale('persons'):
+            self.search_index = PersonSearchIndex(self.persons_df)
+        self._record_phase(profile, 'search_index', started, len(self.persons_df))
+
+    def transaction_id_index(self):
+        """TransactionIdIndex over transactions_df, built on first use and extended by incremental updates."""
+        if self._transaction_ids is None:
+            self._transaction_ids = TransactionIdIndex.build(self.transactions_df['transaction_id'])
+        return self._transaction_ids
+
+    def _positions_of(self, ids):
+        """First person row of each id, -1 for ids not in persons_df."""
+        # Plain values in: id columns may be categoricals, whose .map() stays categorical
+        return self._position_of.reindex(np.asarray(ids, dtype=object)).fillna(-1).to_numpy(dtype=np.int64)
+
+    def _build_person_groups(self):
+        # person_id -> row positions of their accounts and properties
+        self._person_account_rows = self._account_person_pairs.groupby('person_id', sort=False, observed=True).indices
+        self._person_property_rows = self.properties_df.groupby('person_id', sort=False, observed=True).indices
+
+    @staticmethod
+    def _record_phase(profile, name, started, rows):
+        """Records [started, now) as phase `name` when profiling; returns now as the next start."""
+        now = time.perf_counter()
+        if profile is not None:
+            profile.record(name, now - started, rows)
+        return now
+
+    def _transaction_arrays(self, transactions, times=True, activity=None):
+        """
+        The per-row transaction arrays rules read, for a frame or a streamed chunk.
+        `times=False` skips timestamp parsing (streaming parses only the rows it keeps).
+        'anomalous' holds the anomaly model's batch predictions for the rows, with
+        account features read from `activity` (default: the loaded history).
+        """
+        arrays = {
+            'amounts': transactions['amount_inr'].to_numpy(),
+            'modes': transactions['payment_mode'].to_numpy(),
+            'from_codes': self._account_codes(transactions['from_account'].to_numpy()),
+            'to_codes': self._account_codes(transactions['to_account'].to_numpy()),
+        }
+        if times:
+            arrays['times'] = epoch_seconds(transactions['timestamp'])
+        if self.anomaly_model is not None:
+            started = time.perf_counter()
+            arrays['anomalous'] = self.anomaly_model.flag(
+                transactions, times=arrays.get('times'), activity=activity or self._account_activity
+            )
+            self.metrics.observe('anomaly_inference', time.perf_counter() - started)
+        else:
+            arrays['anomalous'] = np.zeros(len(transactions), dtype=bool)
+        return arrays
+
+    def _account_codes(self, account_numbers):
+        """Maps account numbers to dense codes; accounts not in the accounts table get -1."""
+        account_numbers = np.asarray(account_numbers)
+        if len(self._account_keys) == 0:
+            return np.full(len(account_numbers), -1, dtype=np.int64)
+        pos = np.searchsorted(self._account_keys, account_numbers)
+        pos = np.minimum(pos, len(self._account_keys) - 1)
+        return np.where(self._account_keys[pos] == account_numbers, pos, -1)
+
+    @staticmethod
+    def _csr_index(codes, n_accounts):
+        """Returns (offsets, rows) so rows[offsets[c]:offsets[c+1]] are the transaction rows of account c."""
+        known = np.flatnonzero(codes >= 0)
+        order = np.argsort(codes[known], kind='stable')
+        rows = known[order].astype(np.int32 if len(codes) < 2**31 else np.int64)
+        offsets = np.zeros(n_accounts + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes[known], minlength=n_accounts), out=offsets[1:])
+        return offsets, rows
+
+    @staticmethod
+    def _append_csr(offsets, rows, new_codes, first_row):
+        """Splices rows first_row.. into a CSR index, keeping each account's rows ascending."""
+        known = np.flatnonzero(new_codes >= 0)
+        if len(known) == 0:
+            return offsets, rows
+        order = np.argsort(new_codes[known], kind='stable')
+        codes = new_codes[known][order]
+        new_rows = (known[order] + first_row).astype(rows.dtype)
+        # Inserting at each account's end offset appends after its existing rows
+        rows = np.insert(rows, offsets[codes + 1], new_rows)
+        offsets = offsets.copy()
+        offsets[1:] += np.cumsum(np.bincount(codes, minlength=len(offsets) - 1))
+        return offsets, rows
+
+    def _property_rows_for(self, positions):
+        person_ids = self.persons_df['person_id'].to_numpy()[positions]
+        parts = [self._person_property_rows[p] for p in person_ids if p in self._person_property_rows]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def _person_account_codes(self, person_id):
+        rows = self._person_account_rows.get(person_id)
+        if rows is None:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(self._account_codes(self._person_account_numbers[rows]))
+
+    def person_accounts(self, person_id):
+        """Account numbers owned by `person_id`."""
+        rows = self._person_account_rows.get(person_id)
+        return self._person_account_numbers[rows] if rows is not None else self._person_account_numbers[:0]
+
+    def person_transactions(self, person_id, limit=None):
+        """The transactions on `person_id`'s accounts (either side) in row order, via the account indexes."""
+        codes = self._person_account_codes(person_id)
+        rows = np.union1d(
+            self._gather_rows(self._out_offsets, self._out_rows, codes),
+            self._gather_rows(self._in_offsets, self._in_rows, codes),
+        )
+        return self.transactions_df.iloc[rows[:limit] if limit is not None else rows]
+
+    def account_owners(self, account_numbers):
+        """Owner id (person or company) per account number; None for accounts not in the accounts table."""
+        codes = self._account_codes(np.asarray(account_numbers))
+        return [self._account_owners[c] if c >= 0 else None for c in codes]
+
+    @staticmethod
+    def _gather_rows(offsets, rows, codes):
+        if len(codes) == 0:
+            return rows[:0]
+        return np.concatenate([rows[offsets[c]:offsets[c + 1]] for c in codes])
+
+    def _shell_account_mask(self):
+        """Boolean mask over account codes for accounts owned by potential shell companies."""
+        today = datetime.now().date()
+        cached_day, mask = self._shell_mask_cache
+        if cached_day != today:
+            shell_accounts = self.company_accounts_df.loc[
+                self.company_accounts_df['person_id'].isin(self._potential_shell_cins()), 'account_number'
+            ].to_numpy()
+            mask = np.zeros(len(self._account_keys), dtype=bool)
+            codes = self._account_codes(shell_accounts)
+            mask[codes[codes >= 0]] = True
+            self._shell_mask_cache = (today, mask)
+        return mask
+
+    def run_full_analysis(self, workers=None, transactions_path=None, chunksize=None):
+        """
+        Execute all risk scoring rules for all persons and persist alert list.
+
+        `workers` (default: RISK_ANALYSIS_WORKERS, else 1) > 1 scores person shards
+        in a process pool; the resulting alerts are identical to a serial run.
+
+        With `transactions_path` or a positive `chunksize` (default:
+        RISK_ANALYSIS_CHUNKSIZE, else 0) transactions are streamed from disk in
+        chunks instead of read from `transactions_df`; see
+        `_score_population_streaming`.
+
+        Wall time and rows scanned per phase (each aggregate and rule, summaries,
+        persistence) are recorded as a 'full_analysis' profile in `self.metrics`.
+        """
+        with self.metrics.run('full_analysis') as profile:
+            return self._run_full_analysis(profile, workers, transactions_path, chunksize)
+
+    def _run_full_analysis(self, profile, workers, transactions_path, chunksize):
+        threshold = self._alert_threshold()
+        if workers is None:
+            workers = int(os.environ.get('RISK_ANALYSIS_WORKERS', '1'))
+        if chunksize is None:
+            chunksize = int(os.environ.get('RISK_ANALYSIS_CHUNKSIZE', '0'))
+
+        # Score the whole population at once; rows stay aligned with persons_df
+        if transactions_path or chunksize > 0:
+            profile.counters['mode'] = 'streaming'
+            scores_df = self._score_population_streaming(
+                transactions_path or DEFAULT_TRANSACTIONS_PATH, chunksize if chunksize > 0 else 1_000_000, profile=profile
+            )
+        elif workers > 1:
+            # Rules run in the pool's children; only the pool as a whole is timed
+            profile.counters['mode'] = f'sharded:{workers}'
+            with profile_phase(profile, 'score_population_sharded', rows=len(self.persons_df)):
+                scores_df = self._score_population_sharded(workers)
+        else:
+            profile.counters['mode'] = 'in_memory'
+            scores_df = self._score_population(profile=profile)
+        with profile_phase(profile, 'weighted_total', rows=len(scores_df)):
+            final_scores = self.rules.weighted_total(scores_df)
+
+        flagged = np.flatnonzero(final_scores > threshold)
+        if len(flagged):
+            self.risk_scores_df = (
+                self._build_alert_rows(flagged, scores_df.iloc[flagged], final_scores[flagged], first_alert_number=1, profile=profile)
+                .sort_values(by='final_risk_score', ascending=False)
+                .reset_index(drop=True)
+            )
+        else:
+            self.risk_scores_df = pd.DataFrame(columns=ALERT_COLUMNS)
+
+        self.details_cache.clear()
+        with profile_phase(profile, 'persist_alerts', rows=len(self.risk_scores_df)):
+            self._persist_alerts()
+        with profile_phase(profile, 'person_features', rows=len(self.persons_df)):
+            self.person_features()
+        profile.counters.update(persons=len(self.persons_df), alerts=len(self.risk_scores_df))
+        profile.counters.setdefault('transactions', len(self.transactions_df))
+        return self.risk_scores_df.to_dict(orient='records')
+
+    def apply_new_transactions(self, new_transactions_df, dataset_version=None):
+        """
+        Appends a batch of transactions and rescores only the persons it touches.
+
+        Affected persons are the owners of the batch's from/to accounts, plus the
+        owners of both sides of older rows whose anomaly flag changed because the
+        batch moved their sender's activity features. Their alert
+        rows in `risk_scores_df` are inserted, updated or dropped in place and the
+        alert file is rewritten; everyone else keeps their existing score. The
+        feature table is patched the same way, for the owners of the batch's
+        accounts, and stored under `dataset_version` (the version of the files
+        that now hold the batch; default: unchanged). Returns counters describing what changed; the run is profiled as
+        'incremental' in `self.metrics`.
+        """
+        with self.metrics.run('incremental') as profile:
+            stats = self._apply_new_transactions(new_transactions_df, profile, dataset_version)
+            profile.counters.update(stats)
+            return stats
+
+    def fork(self):
+        """
+        A copy that shares this scorer's frames and arrays but owns everything
+        an analysis or update changes in place (details cache, account history),
+        so it can be rescored while requests keep reading this one.
+        """
+        scorer = copy.copy(self)
+        scorer.details_cache = LRUCache(maxsize=self.details_cache.maxsize)
+        scorer._features_lock = threading.Lock()
+        scorer._account_activity = copy.deepcopy(self._account_activity)
+        return scorer
+
+    def with_version(self, dataset_version):
+        """
+        A fork labelled `dataset_version`, for files rewritten without changing
+        their data (delta compaction). The feature table carries over under
+        the new stamp instead of being rebuilt.
+        """
+        features = self._current_features()
+        scorer = self.fork()
+        scorer.dataset_version = dataset_version
+        if features is not None:
+            scorer._person_features = PersonFeatures(features.frame, scorer.feature_store.stamp_for(scorer))
+            scorer.feature_store.write(scorer._person_features)
+        return scorer
+
+    def with_datasets(self, all_datasets, changed, dataset_version=None):
+        """
+        A scorer over reloaded `all_datasets` that keeps this scorer's lookup
+        structures for datasets not in `changed` (keys whose files changed) and
+        rebuilds the rest. Alerts carry over when no scored dataset changed;
+        otherwise risk_scores_df is None until run_full_analysis. This scorer is
+        left unchanged.
+        """
+        scorer = copy.copy(self)
+        scorer._init_services(all_datasets, dataset_version, self.metrics)
+        changed = set(changed)
+        if scorer.anomaly_model is not self.anomaly_model:
+            # Model predictions are part of the transaction arrays
+            changed.add('transactions')
+        if changed.isdisjoint(self.REQUIRED_DATASETS):
+            scorer.alert_index = self.alert_index
+        else:
+            scorer.risk_scores_df = None
+        scorer._assign_frames(all_datasets)
+        with scorer.metrics.run('preprocess') as profile:
+            scorer._preprocess_data(profile, changed=changed)
+            profile.counters.update(persons=len(scorer.persons_df), transactions=len(scorer.transactions_df),
+                                    changed=','.join(sorted(changed)) or 'none')
+        return scorer
+
+    def with_new_transactions(self, new_transactions_df, dataset_version=None):
+        """Copy-on-write `apply_new_transactions`: returns (scorer, stats) and leaves this scorer unchanged."""
+        scorer = self.fork()
+        return scorer, scorer.apply_new_transactions(new_transactions_df, dataset_version)
+
+    def _apply_new_transactions(self, new_transactions_df, profile, dataset_version=None):
+        missing = [c for c in TRANSACTION_COLUMNS if c not in new_transactions_df.columns]
+        if missing:
+            raise ValueError(f"transactions missing columns: {', '.join(missing)}")
+        if self.risk_scores_df is None:
+            raise RuntimeError("run_full_analysis must complete before incremental updates")
+
+        # The table to patch, if it describes the data before the batch
+        features = self._current_features()
+        if dataset_version is not None:
+            self.dataset_version = dataset_version
+
+        started = time.perf_counter()
+        batch = new_transactions_df.reset_index(drop=True).copy()
+        batch['timestamp'] = pd.to_datetime(batch['timestamp'], format='mixed')
+        first_new_row = len(self.transactions_df)
+
+        frame, typed = self._conform_batch(self.transactions_df, batch)
+        self.transactions_df = pd.concat([frame, typed], ignore_index=True)
+        if self._transaction_ids is not None:
+            self._transaction_ids = self._transaction_ids.extended(batch['transaction_id'], first_new_row)
+        if self._account_activity is not None:
+            self._account_activity.update(batch)
+
+        # Extend the row arrays and splice the new rows into the CSR indexes
+        arrays = self._transaction_arrays(batch)
+        for name, values in arrays.items():
+            setattr(self, f'_tx_{name}', np.concatenate([getattr(self, f'_tx_{name}'), values]))
+        from_codes, to_codes = arrays['from_codes'], arrays['to_codes']
+        self._out_offsets, self._out_rows = self._append_csr(self._out_offsets, self._out_rows, from_codes, first_new_row)
+        self._in_offsets, self._in_rows = self._append_csr(self._in_offsets, self._in_rows, to_codes, first_new_row)
+        self.details_cache.clear()
+        self._record_phase(profile, 'append_transactions', started, len(batch))
+
+        touched_codes = np.concatenate([from_codes, to_codes])
+        owners = self._account_owner_positions[touched_codes[touched_codes >= 0]]
+        with profile_phase(profile, 'person_features', rows=len(owners)):
+            self._person_features = self.feature_store.update(self, features, np.unique(owners[owners >= 0]))
+
+        reflagged = self._reflag_senders(batch, first_new_row, profile)
+        if len(reflagged):
+            touched_codes = np.concatenate([touched_codes, self._tx_from_codes[reflagged], self._tx_to_codes[reflagged]])
+        owners = self._account_owner_positions[touched_codes[touched_codes >= 0]]
+        positions = np.unique(owners[owners >= 0])
+
+        stats = {
+            'transactions_added': len(batch),
+            'transactions_reflagged': len(reflagged),
+            'persons_rescored': len(positions),
+            'alerts_added': 0,
+            'alerts_updated': 0,
+            'alerts_removed': 0,
+        }
+        if len(positions) == 0:
+            return stats
+
+        scores_df = self._score_population(positions, profile=profile)
+        final_scores = self.rules.weighted_total(scores_df)
+        flagged = final_scores > self._alert_threshold()
+
+        alerts = self.risk_scores_df
+        existing = alerts['person_id'].isin(self.persons_df['person_id'].iloc[positions])
+        existing_ids = set(alerts.loc[existing, 'person_id'])
+        flagged_ids = set(self.persons_df['person_id'].iloc[positions[flagged]])
+
+        # Persons that stay flagged keep their alert id; new alerts are numbered after the max
+        kept_alert_ids = alerts.loc[existing].set_index('person_id')['alert_id']
+        numbers = alerts['alert_id'].astype(str).str.extract(r'(\d+)$')[0].dropna().astype(int)
+        next_number = (numbers.max() if len(numbers) else 0) + 1
+        flagged_rows = np.flatnonzero(flagged)
+        new_rows = self._build_alert_rows(positions[flagged_rows], scores_df.iloc[flagged_rows], final_scores[flagged_rows], first_alert_number=next_number, profile=profile)
+        is_new = ~new_rows['person_id'].isin(existing_ids)
+        new_rows.loc[is_new, 'alert_id'] = [f"ALT-{i:03d}" for i in range(next_number, next_number + int(is_new.sum()))]
+        new_rows.loc[~is_new, 'alert_id'] = new_rows.loc[~is_new, 'person_id'].map(kept_alert_ids)
+
+        stats['alerts_added'] = len(flagged_ids - existing_ids)
+        stats['alerts_updated'] = len(flagged_ids & existing_ids)
+        stats['alerts_removed'] = len(existing_ids - flagged_ids)
 
         self.risk_scores_df = (
-            pd.DataFrame(all_scores)
-            .sort_values(by='final_risk_score', ascending=False)
+            pd.concat([alerts.loc[~existing], new_rows], ignore_index=True)
+            .sort_values(by='final_risk_score', ascending=False, kind='stable')
             .reset_index(drop=True)
-        ) if all_scores else pd.DataFrame(columns=[
-            'alert_id','person_id','full_name','final_risk_score','risk_score','timestamp','summary','status','scoring_version'
-        ])
+        )
+        with profile_phase(profile, 'persist_alerts', rows=len(self.risk_scores_df)):
+            self._persist_alerts()
+        return stats
 
-        output_path = os.path.join(os.path.dirname(__file__), '..', 'generated-data', 'AlertScores.csv')
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        self.risk_scores_df.to_csv(output_path, index=False)
-        print(f"Saved {len(self.risk_scores_df)} alerts to {output_path}")
+    @staticmethod
+    def _conform_batch(frame, batch):
+        """
+        Returns (frame, batch) with the batch's columns cast to the frame's
+        compact dtypes, so concatenating them keeps those dtypes. Categories the
+        batch adds are appended to a copy of the frame's column (existing codes
+        are unchanged); a column that can't be cast keeps the batch's dtype.
+        """
+        frame = frame.copy(deep=False)
+        batch = batch[frame.columns].copy()
+        for col, dtype in frame.dtypes.items():
+            try:
+                if isinstance(dtype, pd.CategoricalDtype):
+                    values = batch[col].dropna().unique()
+                    missing = [v for v in values if v not in dtype.categories]
+                    if missing:
+                        frame[col] = frame[col].cat.add_categories(missing)
+                    batch[col] = pd.Categorical(batch[col], dtype=frame[col].dtype)
+                elif batch[col].dtype != dtype:
+                    batch[col] = batch[col].astype(dtype)
+            except (ValueError, TypeError) as e:
+                print(f"WARN: transactions.{col}: appending as {batch[col].dtype} ({e})")
+        return frame, batch
 
-        return self.risk_scores_df.to_dict(orient='records')
+    def _reflag_senders(self, batch, first_new_row, profile=None):
+        """
+        Re-runs the anomaly model over the existing rows of the batch's senders,
+        whose velocity and degree features the batch just changed. Returns the
+        rows whose flag flipped, so their owners and counterparties are rescored.
+        """
+        if self.anomaly_model is None or not self.anomaly_model.needs_activity or self._account_activity is None:
+            return np.empty(0, dtype=np.int64)
+        started = time.perf_counter()
+        batch_codes = self._tx_from_codes[first_new_row:]
+        rows = self._gather_rows(self._out_offsets, self._out_rows, np.unique(batch_codes[batch_codes >= 0]))
+        if (batch_codes < 0).any():
+            # Senders outside the accounts table are not in the CSR index
+            unknown = batch.loc[batch_codes < 0, 'from_account'].unique()
+            scan = self.transactions_df['from_account'].iloc[:first_new_row].isin(unknown).to_numpy()
+            rows = np.concatenate([rows, np.flatnonzero(scan)])
+        rows = np.unique(rows[rows < first_new_row]).astype(np.int64)
+        if len(rows) == 0:
+            return rows
+        flags = self.anomaly_model.flag(
+            self.transactions_df.iloc[rows], times=self._tx_times[rows], activity=self._account_activity
+        )
+        # _tx_anomalous was just rebuilt by the append, so this fork owns it
+        flipped = rows[flags != self._tx_anomalous[rows]]
+        self._tx_anomalous[rows] = flags
+        self._record_phase(profile, 'reflag_senders', started, len(rows))
+        return flipped
+
+    @staticmethod
+    def _alert_threshold():
+        return int(os.environ.get('RISK_ALERT_THRESHOLD', '10'))
+
+    def _build_alert_rows(self, positions, scores_df, final_scores, first_alert_number, profile=None):
+        """Alert rows for the persons at `positions`, numbered in person order."""
+        persons = self.persons_df.iloc[positions]
+        totals = final_scores.astype(np.int64)
+        with profile_phase(profile, 'generate_summaries', rows=len(scores_df)):
+            summaries = self._generate_summaries(scores_df)
+        return pd.DataFrame({
+            'alert_id': [f"ALT-{i:03d}" for i in range(first_alert_number, first_alert_number + len(positions))],
+            'person_id': persons['person_id'].to_numpy(),
+            'full_name': persons['full_name'].to_numpy(),
+            'final_risk_score': totals,
+            'risk_score': totals,  # compatibility
+            'timestamp': pd.Timestamp.now().isoformat(),
+            'summary': summaries,
+            'status': 'active',
+            'scoring_version': SCORING_VERSION,
+        })
+
+    def _persist_alerts(self):
+        self.alert_store.write(self.risk_scores_df)
+        self.alert_index = AlertIndex(self.risk_scores_df, source_mtime=self.alert_store.mtime())
+        # CSV export for tooling that still reads AlertScores.csv; renamed into place like the store
+        tmp_path = self.alerts_csv_path + '.tmp'
+        self.risk_scores_df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.alerts_csv_path)
+        print(f"Saved {len(self.risk_scores_df)} alerts to {self.alert_store.path}")
+
+    def _current_features(self):
+        """The held feature table if it still matches the data, else None."""
+        features = self._person_features
+        if features is None or features.stamp != self.feature_store.stamp_for(self):
+            return None
+        return features
+
+    def person_features(self):
+        """
+        The per-person feature table (services.feature_store) for the current
+        data: loaded from the store when it matches, else built and stored once.
+        Incremental updates patch it; a new day (shell judgement) rebuilds it.
+        """
+        features = self._current_features()
+        if features is None:
+            # One build per scorer; concurrent requests wait for it instead of repeating it
+            with self._features_lock:
+                features = self._current_features()
+                if features is None:
+                    with self.metrics.run('person_features') as profile:
+                        features = self.feature_store.materialize(self, profile=profile)
+                        profile.counters['persons'] = len(features)
+                    self._person_features = features
+        return features
 
     def get_person_risk_details(self, person_id):
         """
         Retrieves detailed risk breakdown for a single person. Used for the Triage page.
+
+        Results are served from an LRU cache keyed by (person_id, dataset version,
+        SCORING_VERSION); callers get a copy they are free to modify.
         """
-        person_details = self.persons_df[self.persons_df['person_id'] == person_id]
-        if person_details.empty:
+        cache_key = (person_id, self.dataset_version, SCORING_VERSION)
+        cached = self.details_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        started = time.perf_counter()
+        details = self._compute_person_risk_details(person_id)
+        self.metrics.observe('person_risk_details', time.perf_counter() - started)
+        if details is not None:
+            self.details_cache.put(cache_key, details)
+            return copy.deepcopy(details)
+        return None
+
+    def _compute_person_risk_details(self, person_id):
+        position = self._person_positions.get(person_id)
+        if position is None:
             return None
         
         # Recalculate individual scores for the breakdown
-        scores = {
-            'income_discrepancy': self._calculate_income_discrepancy_score(person_id),
-            'structuring': self._calculate_structuring_score(person_id),
-            'shell_company_interaction': self._calculate_shell_company_score(person_id),
-            'property_discrepancy': self._calculate_property_discrepancy_score(person_id),
-            'tax_status': self._calculate_tax_status_score(person_id),
-        }
-        
-        weights = {
-            'income_discrepancy': 0.30, 'structuring': 0.25,
-            'shell_company_interaction': 0.25, 'property_discrepancy': 0.15,
-            'tax_status': 0.05,
-        }
-        
-        recalculated_score = sum(scores[key] * weights[key] for key in scores)
+        scores = self._score_person(person_id)
+        recalculated_score = sum(scores[key] * self.rules.weights[key] for key in scores)
 
-        # Load current alert score (canonical) if exists; update version mismatch
+        # Load current alert score (canonical) if exists
         canonical_alert_score = None
-        alerts_path = os.path.join(os.path.dirname(__file__), '..', 'generated-data', 'AlertScores.csv')
         try:
             if (self.risk_scores_df is not None) and not self.risk_scores_df.empty:
                 row = self.risk_scores_df[self.risk_scores_df['person_id'] == person_id]
                 if not row.empty:
                     canonical_alert_score = int(row.iloc[0]['final_risk_score'])
-            elif os.path.exists(alerts_path):
-                cached_df = pd.read_csv(alerts_path)
-                row = cached_df[cached_df['person_id'] == person_id]
-                if not row.empty:
-                    canonical_alert_score = int(row.iloc[0]['final_risk_score'])
+            else:
+                view = self.alert_store.view()
+                stored = view.get(person_id) if view is not None else None
+                if stored is not None:
+                    canonical_alert_score = int(stored['final_risk_score'])
         except Exception as e:
             print(f"WARN: Could not retrieve canonical alert score for {person_id}: {e}")
 
         # Decide final score: prefer canonical alert score if present to match UI lists
         final_score = int(canonical_alert_score) if canonical_alert_score is not None else int(recalculated_score)
 
-        # If we have a canonical alert but scoring version bumped and difference large (>10), refresh the alert entry in memory
+        # A canonical score far (>10) from the recalculation, e.g. one stored by an older
+        # SCORING_VERSION, is corrected in these details only; the published alerts belong to
+        # the snapshot and are rewritten by the next analysis, never from a details lookup
         if canonical_alert_score is not None and abs(canonical_alert_score - recalculated_score) > 10:
-            try:
-                # Update in dataframe and persist
-                if (self.risk_scores_df is not None) and not self.risk_scores_df.empty:
-                    idx = self.risk_scores_df[self.risk_scores_df['person_id'] == person_id].index
-                    if len(idx) == 1:
-                        self.risk_scores_df.loc[idx, 'final_risk_score'] = int(recalculated_score)
-                        self.risk_scores_df.loc[idx, 'risk_score'] = int(recalculated_score)
-                        self.risk_scores_df.loc[idx, 'scoring_version'] = SCORING_VERSION
-                        self.risk_scores_df.to_csv(alerts_path, index=False)
-                        final_score = int(recalculated_score)
-            except Exception as e:
-                print(f"WARN: Failed to harmonize alert score for {person_id}: {e}")
+            final_score = int(recalculated_score)
 
         return {
             "person_id": person_id,
@@ -185,126 +736,194 @@ class HybridRiskScorer:
             "recalculated_risk_score": int(recalculated_score),
             "canonical_alert_score": canonical_alert_score,
             "scoring_version": SCORING_VERSION,
-            "person_details": person_details.iloc[0].to_dict(),
+            "person_details": self.persons_df.iloc[position].to_dict(),
             "breakdown": {
-                'income': {'label': 'Income vs. Transactions', 'score': scores['income_discrepancy']},
-                'structuring': {'label': 'Transaction Structuring', 'score': scores['structuring']},
-                'shell': {'label': 'Shell Company Links', 'score': scores['shell_company_interaction']},
-                'property': {'label': 'High-Value Property', 'score': scores['property_discrepancy']},
-                'tax': {'label': 'Tax Status Irregularities', 'score': scores['tax_status']},
-            }
+                rule.breakdown_key: {'label': rule.label, 'score': scores[rule.name]}
+                for rule in self.rules.rules
+            },
+            "structuring_window": self._structuring_window(position),
+            "features": self.person_features().get(person_id),
+        }
+
+    def _structuring_window(self, position):
+        """Peak near-threshold cash-deposit window for one person (bounds as ISO timestamps)."""
+        windows = self._person_context(position).structuring_windows
+        to_iso = lambda t: None if t == NO_TIME else pd.Timestamp(int(t), unit='s').isoformat()
+        return {
+            "window_hours": structuring_window_seconds() / 3600,
+            "peak_count": int(windows['peak_count'][0]),
+            "window_start": to_iso(windows['window_start'][0]),
+            "window_end": to_iso(windows['window_end'][0]),
         }
     
-    def search_persons(self, query):
+    def search_persons(self, query, limit=20):
         """
-        Searches for persons by name or person_id.
+        Searches for persons by name or person_id. Id and name prefix matches
+        rank ahead of other substring matches.
         """
         if not query: return []
-        query = query.lower()
-        results_df = self.persons_df[
-            self.persons_df['full_name'].str.lower().str.contains(query) |
-            self.persons_df['person_id'].str.lower().str.contains(query)
-        ]
-        return results_df.head(20).to_dict(orient='records')
-
-    # --- Scoring Helper Methods ---
-
-    def _generate_summary(self, scores):
-        triggered = [key for key, value in scores.items() if value > 0]
-        if not triggered: return "Low Risk Profile"
-        
-        summary_map = {
-            'income_discrepancy': "high-value credits inconsistent with salary",
-            'structuring': "structuring patterns (multiple cash deposits)",
-            'shell_company_interaction': "transactions with suspected shell companies",
-            'property_discrepancy': "high-value property ownership",
-            'tax_status': "tax filing irregularities"
-        }
-        
-        top_reason = max(triggered, key=lambda reason: scores[reason])
-        summary_text = f"Risk flagged due to {summary_map[top_reason]}"
-        if len(triggered) > 1:
-            summary_text += f" and {len(triggered)-1} other factors."
-        return summary_text
-
-    def _calculate_income_discrepancy_score(self, person_id):
-        person_salary = self.persons_df.loc[self.persons_df['person_id'] == person_id, 'monthly_salary_inr'].iloc[0]
-        if person_salary <= 0:
-            return 0
-        person_transactions = self.tx_details_df[self.tx_details_df['to_person_id'] == person_id]
-        # Credits exceeding 2x salary considered anomalous; scale by count
-        high_value_credits = person_transactions[person_transactions['amount_inr'] > (person_salary * 2)]
-        count = len(high_value_credits)
-        if count == 0:
-            return 0
-        # Each anomalous credit adds 20 points up to 100
-        return min(100, count * 20)
-
-    def _calculate_structuring_score(self, person_id):
-        person_accounts = self.person_accounts_df[self.person_accounts_df['person_id'] == person_id]['account_number'].tolist()
-        if not person_accounts: return 0
-        cash_deposits = self.transactions_df[
-            (self.transactions_df['to_account'].isin(person_accounts)) &
-            (self.transactions_df['payment_mode'] == 'Cash') &
-            (self.transactions_df['amount_inr'].between(40000, 49999))
-        ]
-        n = len(cash_deposits)
-        if n == 0:
-            return 0
-        if n >= 8:
-            return 100
-        if n >= 5:
-            return 70
-        if n >= 3:
-            return 40
-        return 15  # at least some low-level structuring pattern
-
-    def _calculate_shell_company_score(self, person_id):
-        person_accounts = self.person_accounts_df[self.person_accounts_df['person_id'] == person_id]['account_number'].tolist()
-        if not person_accounts: return 0
-        
-        potential_shells = self.companies_df[
+        started = time.perf_counter()
+        positions = self.search_index.search(query, limit=limit)
+        results = self.persons_df.iloc[positions].to_dict(orient='records')
+        self.metrics.observe('search_persons', time.perf_counter() - started)
+        return results
+
+    # --- Population Scoring (vectorized) ---
+
+    def _score_person(self, person_id):
+        """Factor scores for one person, via the same rule plan as batch scoring."""
+        scores_df = self._score_population([self._person_positions[person_id]])
+        return {name: int(scores_df[name].iloc[0]) for name in self.rules.names}
+
+    def _score_population(self, positions=None, profile=None):
+        """
+        Evaluates every registered rule for many persons in one pass.
+
+        Each aggregate the rules read is computed once with array operations over
+        the transactions, so a rule costs a column rather than a scan per person.
+        With `positions` (row positions into `persons_df`) only those persons are
+        scored and only the transactions on their accounts are read. Returns one
+        int column per rule, aligned with the selected persons. A `profile`
+        receives per-aggregate and per-rule timings.
+        """
+        rows = np.arange(len(self.persons_df)) if positions is None else np.asarray(positions, dtype=np.int64)
+        canonical, inverse = np.unique(self._canonical_rows[rows], return_inverse=True)
+        if positions is None:
+            ctx = ScoringContext(self, canonical)
+        else:
+            ctx = self._subset_context(canonical)
+        if positions is None and len(canonical) != len(self.persons_df):
+            # Duplicate ids: score first rows over the full transaction set, then expand
+            ctx = ScoringContext(self, canonical, tx_rows=np.arange(len(self.transactions_df)))
+        scores = self.rules.evaluate(ctx, profile=profile)
+        return pd.DataFrame(
+            {name: scores[name][inverse] for name in self.rules.names},
+            index=self.persons_df.index[rows],
+        )
+
+    def _subset_context(self, canonical):
+        """Scoring context over unique person rows, reading only the transactions on their accounts."""
+        person_ids = self.persons_df['person_id'].to_numpy()[canonical]
+        codes = np.unique(np.concatenate([self._person_account_codes(p) for p in person_ids])) if len(person_ids) else np.empty(0, dtype=np.int64)
+        tx_rows = np.union1d(
+            self._gather_rows(self._out_offsets, self._out_rows, codes),
+            self._gather_rows(self._in_offsets, self._in_rows, codes),
+        )
+        return ScoringContext(self, canonical, tx_rows=tx_rows)
+
+    def _person_context(self, position):
+        return self._subset_context(self._canonical_rows[[position]])
+
+    def _score_population_streaming(self, transactions_path, chunksize, profile=None):
+        """
+        Scores every person while reading transactions from disk `chunksize` rows
+        at a time.
+
+        Person-level aggregates are computed once; each chunk folds into running
+        per-person totals of the additive transaction aggregates and keeps only the
+        rows row-scoped aggregates (structuring windows) depend on, which are
+        evaluated once at the end. Memory stays bounded by the person/account
+        tables, one chunk and the kept candidate rows, regardless of history length.
+        """
+        canonical, inverse = np.unique(self._canonical_rows, return_inverse=True)
+        empty = pd.DataFrame({c: pd.Series(dtype=object) for c in STREAM_COLUMNS})
+        values = self.rules.compute_aggregates(
+            ScoringContext(self, canonical, transactions=self._transaction_arrays(empty)), names=self.rules.person_level, profile=profile
+        )
+        values.update({name: np.zeros(len(canonical), dtype=np.int64) for name in self.rules.additive})
+        kept = [self._transaction_arrays(empty)]
+        activity = None
+        if self.anomaly_model is not None and self.anomaly_model.needs_activity:
+            # Account features need the whole history, so summarize it in a first pass
+            activity = AccountActivity()
+            with profile_phase(profile, 'account_activity') as scan:
+                for chunk in self._read_transaction_chunks(transactions_path, ['from_account', 'to_account', 'timestamp'], chunksize):
+                    activity.update(chunk)
+                    scan['rows'] = (scan['rows'] or 0) + len(chunk)
+        rows = 0
+        chunks = self._read_transaction_chunks(transactions_path, STREAM_COLUMNS, chunksize)
+        while True:
+            with profile_phase(profile, 'read_chunk') as scan:
+                chunk = next(chunks, None)
+                scan['rows'] = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                break
+            with profile_phase(profile, 'transaction_arrays', rows=len(chunk)):
+                arrays = self._transaction_arrays(chunk, times=False, activity=activity)
+            ctx = ScoringContext(self, canonical, transactions=arrays)
+            for name, partial in self.rules.compute_aggregates(ctx, names=self.rules.additive, profile=profile).items():
+                values[name] = values[name] + partial
+            if self.rules.row_scoped:
+                with profile_phase(profile, 'keep_scoped_rows', rows=len(chunk)):
+                    keep = self.rules.scoped_rows(ctx)
+                    part = {key: array[keep] for key, array in arrays.items()}
+                    part['times'] = epoch_seconds(chunk['timestamp'].to_numpy()[keep])
+                kept.append(part)
+            rows += len(chunk)
+        if self.rules.row_scoped:
+            candidates = {key: np.concatenate([part[key] for part in kept]) for key in kept[0]}
+            ctx = ScoringContext(self, canonical, transactions=candidates)
+            values.update(self.rules.compute_aggregates(ctx, names=self.rules.row_scoped, profile=profile))
+        print(f"Streamed {rows} transactions from {transactions_path}")
+        if profile is not None:
+            profile.counters['transactions'] = rows
+        scores = self.rules.score(values, profile=profile)
+        return pd.DataFrame(
+            {name: scores[name][inverse] for name in self.rules.names},
+            index=self.persons_df.index,
+        )
+
+    @staticmethod
+    def _read_transaction_chunks(transactions_path, usecols, chunksize):
+        """Chunks of the transactions file followed by those of its delta segments (see DataLoader.append_transactions)."""
+        for path in [transactions_path] + delta_segment_paths(transactions_path):
+            with pd.read_csv(path, usecols=usecols, chunksize=chunksize) as reader:
+                yield from reader
+
+    def _score_population_sharded(self, workers):
+        """Scores persons in shards across a fork-based process pool."""
+        global _SHARD_SCORER
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            print("WARN: fork start method unavailable; scoring serially")
+            return self._score_population()
+        # Oversplit so uneven shards (heavy accounts) still balance across workers
+        shards = [s for s in np.array_split(np.arange(len(self.persons_df)), workers * 4) if len(s)]
+        if len(shards) <= 1:
+            return self._score_population()
+        # Warm lazily built state before forking so every child inherits it
+        self._shell_account_mask()
+        _SHARD_SCORER = self
+        try:
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                parts = pool.map(_score_shard, shards, chunksize=1)
+        finally:
+            _SHARD_SCORER = None
+        return pd.concat(parts)
+
+    def _generate_summaries(self, scores_df):
+        """
+        One alert summary per row of factor scores, from the rule registry's
+        summaries: the highest-scoring rule (first in registry order on ties)
+        plus how many other rules fired, or "Low Risk Profile" if none did.
+        """
+        keys = self.rules.names
+        matrix = scores_df[keys].to_numpy()
+        triggered = (matrix > 0).sum(axis=1)
+        # argmax picks the first maximum, i.e. the earliest registered rule
+        top = matrix.argmax(axis=1)
+        summaries = []
+        for n, idx in zip(triggered, top):
+            if n == 0:
+                summaries.append("Low Risk Profile")
+                continue
+            text = f"Risk flagged due to {self.rules.summaries[keys[idx]]}"
+            if n > 1:
+                text += f" and {n-1} other factors."
+            summaries.append(text)
+        return summaries
+
+    def _potential_shell_cins(self):
+        return self.companies_df[
             (self.companies_df['incorporation_date'] > datetime.now() - timedelta(days=365)) &
             (self.companies_df['paid_up_capital_inr'] < 500000)
         ]['cin'].tolist()
-        if not potential_shells: return 0
-        
-        shell_accounts = self.company_accounts_df[self.company_accounts_df['person_id'].isin(potential_shells)]['account_number'].tolist()
-        risky_tx = self.transactions_df[
-            (self.transactions_df['from_account'].isin(person_accounts) & self.transactions_df['to_account'].isin(shell_accounts)) |
-            (self.transactions_df['to_account'].isin(person_accounts) & self.transactions_df['from_account'].isin(shell_accounts))
-        ]
-        n = len(risky_tx)
-        if n == 0:
-            return 0
-        if n >= 10:
-            return 100
-        if n >= 5:
-            return 70
-        if n >= 2:
-            return 40
-        return 20
-
-    def _calculate_property_discrepancy_score(self, person_id):
-        person_salary = self.persons_df.loc[self.persons_df['person_id'] == person_id, 'monthly_salary_inr'].iloc[0]
-        # Use the now-standardized 'person_id' column
-        person_properties = self.properties_df[self.properties_df['person_id'] == person_id]
-        if person_properties.empty: return 0
-        
-        total_property_value = person_properties['purchase_value_inr'].sum()
-        if person_salary <= 0:
-            return 0
-        # Ratio of total property value to 12 * salary (annual) baseline *10 (approx wealth multiple)
-        ratio = total_property_value / (person_salary * 12) if person_salary > 0 else 0
-        if ratio <= 5:
-            return 0
-        if ratio >= 50:
-            return 100
-        # Scale between 5x and 50x linearly
-        scaled = int(((ratio - 5) / (50 - 5)) * 100)
-        return max(10, min(100, scaled))
-
-    def _calculate_tax_status_score(self, person_id):
-        tax_status = self.persons_df.loc[self.persons_df['person_id'] == person_id, 'tax_filing_status'].iloc[0]
-        return 80 if tax_status == 'Not Filed' else 0
-
@@ -0,0 +1,198 @@
+import numpy as np
+
+_MAX_CHAR = '\U0010ffff'
+# Separators between a person's name and id, and after the id; queries never contain them,
+# so no trigram spanning two fields can match, yet every 2-char substring starts a trigram.
+_FIELD_SEP = '\x01'
+_END = '\x00'
+
+
+def _code_points(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+
+
+class PersonSearchIndex:
+    """
+    Load-time index for type-ahead person search by name or person_id.
+
+    Holds a trigram inverted index over "name + id" (CSR layout: sorted packed
+    trigram keys, offsets, ascending person positions) plus sorted prefix arrays
+    for ids, full names and name tokens. `search` returns row positions ranked as
+    id prefix, name prefix, name-token prefix, then any other substring match;
+    ties keep dataset order.
+    """
+    def __init__(self, persons_df):
+        self._names = self._lowered(persons_df['full_name'])
+        self._ids = self._lowered(persons_df['person_id'])
+        self._build_prefix_indexes()
+        self._build_trigram_index()
+
+    @staticmethod
+    def _lowered(column):
+        # Object first: categorical id columns can't take a fill value outside their categories
+        return column.astype(object).fillna('').astype(str).str.lower().to_numpy(dtype=object)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _build_prefix_indexes(self):
+        ids = self._ids.astype(str)
+        self._id_order = np.argsort(ids, kind='stable')
+        self._sorted_ids = ids[self._id_order]
+
+        names = self._names.astype(str)
+        self._name_order = np.argsort(names, kind='stable')
+        self._sorted_names = names[self._name_order]
+
+        token_values, token_owners = [], []
+        for pos, name in enumerate(self._names):
+            for token in name.split():
+                token_values.append(token)
+                token_owners.append(pos)
+        token_values = np.array(token_values, dtype=str)
+        order = np.argsort(token_values, kind='stable')
+        self._sorted_tokens = token_values[order]
+        self._token_owners = np.asarray(token_owners, dtype=np.int64)[order]
+
+    def _build_trigram_index(self):
+        texts = [f"{n}{_FIELD_SEP}{i}{_END}" for n, i in zip(self._names, self._ids)]
+        n = len(texts)
+        lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=n)
+        cp = _code_points(''.join(texts))
+        # Dense character ranks keep packed trigram codes small: code = r1*A*A + r2*A + r3
+        self._alphabet = np.flatnonzero(np.bincount(cp)) if len(cp) else np.empty(0, dtype=np.int64)
+        self._radix = max(len(self._alphabet), 1)
+        ranks = np.searchsorted(self._alphabet, cp)
+        owners = np.repeat(np.arange(n, dtype=np.int64), lengths)
+        grams = self._pack(ranks)
+        # Keep trigrams that lie inside one person's text
+        inside = owners[:-2] == owners[2:]
+        grams, owners = grams[inside], owners[:-2][inside]
+        if self._radix ** 3 * max(n, 1) < 2 ** 62:
+            # A single sort of (trigram, owner) pairs packed into one int64
+            pairs = np.sort(grams * n + owners)
+            grams, owners = pairs // n, pairs % n
+        else:
+            order = np.lexsort((owners, grams))
+            grams, owners = grams[order], owners[order]
+        # Drop repeated trigrams within one person, then cut the runs of equal trigrams
+        keep = np.ones(len(grams), dtype=bool)
+        keep[1:] = (grams[1:] != grams[:-1]) | (owners[1:] != owners[:-1])
+        grams, owners = grams[keep], owners[keep]
+        starts = np.flatnonzero(np.r_[True, grams[1:] != grams[:-1]]) if len(grams) else np.empty(0, dtype=np.int64)
+        self._keys = grams[starts]
+        self._offsets = np.append(starts, len(grams)).astype(np.int64)
+        self._postings = owners.astype(np.int32)
+
+    def _pack(self, ranks):
+        return (ranks[:-2] * self._radix + ranks[1:-1]) * self._radix + ranks[2:]
+
+    def _ranks(self, text):
+        """Character ranks of `text`, or None if it uses a character no person has."""
+        cp = _code_points(text)
+        ranks = np.searchsorted(self._alphabet, cp)
+        if (ranks >= len(self._alphabet)).any() or (self._alphabet[np.minimum(ranks, len(self._alphabet) - 1)] != cp).any():
+            return None
+        return ranks
+
+    def _posting(self, key_index):
+        return self._postings[self._offsets[key_index]:self._offsets[key_index + 1]]
+
+    @staticmethod
+    def _prefix_range(sorted_values, prefix):
+        # Needles must fit the array's itemsize, or numpy recasts the whole array per call
+        width = sorted_values.dtype.itemsize // 4
+        if len(prefix) > width:
+            return 0, 0
+        lo = np.searchsorted(sorted_values, np.asarray(prefix, dtype=sorted_values.dtype), side='left')
+        if len(prefix) == width:
+            return lo, np.searchsorted(sorted_values, np.asarray(prefix, dtype=sorted_values.dtype), side='right')
+        hi = np.searchsorted(sorted_values, np.asarray(prefix + _MAX_CHAR, dtype=sorted_values.dtype), side='left')
+        return lo, hi
+
+    @staticmethod
+    def _smallest(positions, k):
+        """The `k` smallest distinct positions in ascending order, without sorting them all."""
+        m = 2 * k
+        while len(positions) > m:
+            head = np.unique(np.partition(positions, m)[:m])
+            if len(head) >= k:
+                return head[:k]
+            m *= 4
+        return np.unique(positions)[:k]
+
+    def _substring_candidates(self, query, need, block=256):
+        """
+        Yields ascending positions whose name or id may contain `query` (exact for
+        1- and 2-char queries). The rarest trigram's posting is filtered block by block so
+        a common query stops as soon as enough candidates are confirmed.
+        """
+        ranks = self._ranks(query)
+        if ranks is None or len(self._keys) == 0:
+            return
+        if len(ranks) == 1:
+            # A character heads a trigram unless it ends the text, where it sits before the end marker
+            r, end = ranks[0], self._ranks(_END)[0]
+            lo, hi = np.searchsorted(self._keys, [r * self._radix ** 2, (r + 1) * self._radix ** 2])
+            keys = list(range(lo, hi))
+            tails = (np.arange(self._radix) * self._radix + r) * self._radix + end
+            idx = np.minimum(np.searchsorted(self._keys, tails), len(self._keys) - 1)
+            keys.extend(idx[self._keys[idx] == tails])
+            parts = [self._posting(k)[:need] for k in keys]
+            if parts:
+                yield from np.unique(np.concatenate(parts))
+            return
+        if len(ranks) == 2:
+            # Every 2-char substring is the head of some trigram thanks to the separators
+            base = (ranks[0] * self._radix + ranks[1]) * self._radix
+            lo, hi = np.searchsorted(self._keys, [base, base + self._radix])
+            # The first `need` of each posting already contain the overall first `need`
+            parts = [self._posting(k)[:need] for k in range(lo, hi)]
+            if parts:
+                yield from np.unique(np.concatenate(parts))
+            return
+        grams = np.unique(self._pack(ranks))
+        idx = np.minimum(np.searchsorted(self._keys, grams), len(self._keys) - 1)
+        if (self._keys[idx] != grams).any():
+            return
+        head, *rest = sorted((self._posting(k) for k in idx), key=len)
+        for start in range(0, len(head), block):
+            candidates = head[start:start + block]
+            for posting in rest:
+                hit = np.minimum(np.searchsorted(posting, candidates), len(posting) - 1)
+                candidates = candidates[posting[hit] == candidates]
+                if len(candidates) == 0:
+                    break
+            yield from candidates
+
+    def search(self, query, limit=20):
+        """Returns up to `limit` person row positions matching `query`, best matches first."""
+        query = (query or '').strip().lower()
+        if not query or limit <= 0:
+            return []
+        results = []
+        seen = set()
+
+        def take(positions):
+            for pos in positions:
+                pos = int(pos)
+                if pos not in seen:
+                    seen.add(pos)
+                    results.append(pos)
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        for sorted_values, owners in ((self._sorted_ids, self._id_order),
+                                      (self._sorted_names, self._name_order),
+                                      (self._sorted_tokens, self._token_owners)):
+            lo, hi = self._prefix_range(sorted_values, query)
+            if take(self._smallest(owners[lo:hi], limit + len(results))):
+                return results
+
+        for pos in self._substring_candidates(query, limit + len(results)):
+            # Trigram hits are candidates; confirm the literal substring
+            if query in self._names[pos] or query in self._ids[pos]:
+                if take([pos]):
+                    break
+        return results
@@ -0,0 +1,223 @@
+import os
+import json
+import tempfile
+import threading
+import dataclasses
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from services.anomaly_scoring import MODEL_PATH
+from services.report_generator import ReportGenerator
+from services.risk_scoring import SCORING_VERSION, HybridRiskScorer
+
+# --- Optional dependencies (graceful fallback: every worker builds its own snapshot) ---
+JOBLIB_AVAILABLE = True
+try:
+    import joblib  # type: ignore
+except Exception as imp_err:
+    JOBLIB_AVAILABLE = False
+    print(f"WARN: joblib not available ({imp_err}). Shared snapshots disabled.")
+
+try:
+    import fcntl  # type: ignore
+except ImportError:
+    # No advisory file locks (Windows): workers starting together may each build and export
+    fcntl = None
+
+# Bump when the exported layout or the scorer's shared state changes
+SHARED_SNAPSHOT_FORMAT = 2
+
+SHARED_SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), '..', 'generated-data', '.cache')
+
+
+@dataclass(frozen=True)
+class ServiceSnapshot:
+    """
+    One loaded dataset version plus the services built from it.
+
+    Snapshots are never modified after publication: a reload or rescore builds
+    a new one (sharing whatever did not change) and publishes it whole, so a
+    request that started on a snapshot finishes on it.
+    """
+    datasets: dict
+    risk_scorer: object
+    report_generator: object
+    dataset_version: str | None
+    created_at: str
+
+    @classmethod
+    def create(cls, datasets, risk_scorer, metadata=None):
+        if metadata is not None:
+            # Attach metadata to datasets dict for downstream consumers (e.g., reports)
+            datasets['metadata'] = metadata
+        return cls(
+            datasets=datasets,
+            risk_scorer=risk_scorer,
+            report_generator=ReportGenerator(datasets),
+            dataset_version=risk_scorer.dataset_version,
+            created_at=datetime.now(timezone.utc).isoformat(),
+        )
+
+    def with_scorer(self, risk_scorer, datasets=None):
+        """A snapshot sharing this one's datasets (unless given) with `risk_scorer` swapped in."""
+        if datasets is None:
+            return dataclasses.replace(self, risk_scorer=risk_scorer, dataset_version=risk_scorer.dataset_version)
+        return ServiceSnapshot.create(datasets, risk_scorer)
+
+
+class SnapshotHolder:
+    """
+    The published ServiceSnapshot. Readers take `current` (a single reference
+    read) without locking; builders are serialized so reloads never interleave
+    their file writes or build on a snapshot that is about to be replaced.
+    """
+    def __init__(self, snapshot=None):
+        self._current = snapshot
+        self._build_lock = threading.Lock()
+
+    @property
+    def current(self):
+        return self._current
+
+    def publish(self, snapshot):
+        self._current = snapshot
+        return snapshot
+
+    def rebuild(self, build):
+        """
+        Runs build(current) -> (snapshot, result) while holding the build lock,
+        publishes the snapshot unless it is None and returns `result`. Requests
+        keep being served from the current snapshot until the swap.
+        """
+        with self._build_lock:
+            snapshot, result = build(self._current)
+            if snapshot is not None:
+                self.publish(snapshot)
+            return result
+
+
+class SharedSnapshotStore:
+    """
+    A built snapshot's frames, lookup indexes and alerts exported to one file
+    for other server worker processes to attach to instead of parsing the CSVs
+    and rerunning the analysis.
+
+    The file is a joblib pickle whose arrays (every numeric column, CSR index
+    and row array) are stored raw and memory-mapped read-only on load, so all
+    workers share one copy through the page cache; only object columns are
+    materialized per worker. A JSON stamp next to it records what the export
+    was built from (dataset version, scoring version, anomaly model, alert
+    threshold, day), and the file is only attached while the stamp matches.
+    """
+    def __init__(self, data_loader, directory=SHARED_SNAPSHOT_DIR, enabled=None):
+        self.data_loader = data_loader
+        self.directory = directory
+        self.path = os.path.join(directory, 'ServiceSnapshot.joblib')
+        self.meta_path = os.path.join(directory, 'ServiceSnapshot.json')
+        self.lock_path = os.path.join(directory, 'ServiceSnapshot.lock')
+        if enabled is None:
+            enabled = os.getenv('SHARED_SNAPSHOT', '1').lower() not in ('0', 'false', 'no')
+        self.enabled = bool(enabled) and JOBLIB_AVAILABLE
+
+    @staticmethod
+    def stamp_for(dataset_version):
+        return {
+            'format': SHARED_SNAPSHOT_FORMAT,
+            'dataset_version': dataset_version,
+            'scoring_version': SCORING_VERSION,
+            'anomaly_model': os.path.getmtime(MODEL_PATH) if os.path.exists(MODEL_PATH) else None,
+            'alert_threshold': HybridRiskScorer._alert_threshold(),
+            'as_of': datetime.now().date().isoformat(),
+        }
+
+    @contextmanager
+    def _locked(self):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def load(self, dataset_version, build):
+        """
+        The snapshot of `dataset_version`: attached from the export when it
+        matches, else build() and exported. Checking and building under one
+        file lock makes the first of several starting workers build while the
+        others wait and then attach.
+        """
+        if not self.enabled or not dataset_version:
+            return build()
+        with self._locked():
+            snapshot = self.attach(dataset_version)
+            if snapshot is None:
+                snapshot = build()
+                self.export(snapshot)
+                # Serve from the export too, so the building worker's private copy can be freed
+                snapshot = self.attach(dataset_version) or snapshot
+        return snapshot
+
+    def attach(self, dataset_version):
+        """The exported snapshot if it was built under the current stamp, else None."""
+        stamp = self.stamp_for(dataset_version)
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                if json.load(f) != stamp:
+                    return None
+            state = joblib.load(self.path, mmap_mode='r')
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"WARN: Ignoring unreadable shared snapshot: {e}")
+            return None
+        frames = dict(state['datasets'])
+        if state['transactions_from_scorer']:
+            frames['transactions'] = state['scorer']['transactions_df']
+        datasets = self.data_loader.attach(frames, dataset_version, id_dtype=state['id_dtype'])
+        scorer = HybridRiskScorer.from_shared_state(state['scorer'], datasets, dataset_version=dataset_version)
+        return ServiceSnapshot.create(datasets, scorer, metadata=self.data_loader.get_metadata(datasets))
+
+    def export(self, snapshot):
+        """Writes `snapshot` for other workers once analysed; failures only cost them a rebuild."""
+        scorer = snapshot.risk_scorer
+        if not self.enabled or not snapshot.dataset_version or scorer.risk_scores_df is None:
+            return
+        datasets = snapshot.datasets
+        # The scorer's transactions frame (dates parsed) stands in for the loaded one, as after incremental updates
+        transactions_from_scorer = datasets.loaded('transactions') is not None
+        state = {
+            'datasets': {
+                key: df for key, df in datasets.items()
+                if isinstance(df, pd.DataFrame) and not (key == 'transactions' and transactions_from_scorer)
+            },
+            'transactions_from_scorer': transactions_from_scorer,
+            'id_dtype': datasets.id_dtype,
+            'scorer': scorer.shared_state(),
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Drop the stamp first so a crash mid-write never labels the new file with the old stamp
+            if os.path.exists(self.meta_path):
+                os.remove(self.meta_path)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.snapshot-', suffix='.tmp')
+            os.close(fd)
+            try:
+                joblib.dump(state, tmp_path)
+                # Workers still mapping the previous file keep reading it until they reload
+                os.replace(tmp_path, self.path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            meta_tmp = self.meta_path + '.tmp'
+            with open(meta_tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.stamp_for(snapshot.dataset_version), f)
+            os.replace(meta_tmp, self.meta_path)
+        except Exception as e:
+            print(f"WARN: Could not export shared snapshot: {e}")
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the app's packages (services, utils) the way app.py does, from the backend directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.alert_store import AlertStore  # noqa: E402
+from services.feature_store import FeatureStore  # noqa: E402
+from services.risk_scoring import HybridRiskScorer  # noqa: E402
+from utils.data_loader import DataLoader  # noqa: E402
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'generated-data')
+DATASETS = ('persons', 'accounts', 'transactions', 'companies', 'properties', 'directorships')
+
+
+@pytest.fixture(scope='session')
+def datasets():
+    """The generated datasets, parsed from CSV without touching the Parquet cache."""
+    if not os.path.exists(os.path.join(DATA_DIR, 'Transactions.csv')):
+        pytest.skip("generated-data is missing; run data-generation first")
+    loaded = DataLoader(data_path=DATA_DIR, use_cache=False).load_all_data()
+    return {key: loaded[key] for key in DATASETS}
+
+
+@pytest.fixture
+def analysed_scorer(datasets, tmp_path):
+    """Builds a scorer over `datasets` (optionally other transactions) and runs a full analysis, writing under tmp_path."""
+    def build(transactions=None, name='scorer'):
+        out_dir = tmp_path / name
+        out_dir.mkdir()
+        frames = dict(datasets) if transactions is None else dict(datasets, transactions=transactions)
+        scorer = HybridRiskScorer(frames)
+        scorer.alert_store = AlertStore(str(out_dir / 'AlertScores.npy'))
+        scorer.alerts_csv_path = str(out_dir / 'AlertScores.csv')
+        scorer.feature_store = FeatureStore(str(out_dir))
+        scorer.run_full_analysis(workers=1, chunksize=0)
+        return scorer
+    return build
@@ -0,0 +1,29 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from utils.data_loader import PARQUET_AVAILABLE, DataLoader
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'generated-data')
+
+
+@pytest.mark.skipif(not PARQUET_AVAILABLE, reason="the columnar cache needs pyarrow")
+def test_concurrent_cache_writes_leave_one_complete_cache(tmp_path, caplog):
+    shutil.copy(os.path.join(DATA_DIR, 'Persons.csv'), tmp_path / 'Persons.csv')
+    loader = DataLoader(data_path=str(tmp_path), use_cache=True)
+    csv_path = str(tmp_path / 'Persons.csv')
+    df = loader._apply_dtypes('persons', pd.read_csv(csv_path))
+
+    # Cold loads in several workers cache the same file at once
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: loader._write_cache('persons', csv_path, df), range(16)))
+
+    # Each writer has its own temp file, so none finds it renamed away or half-written
+    assert 'Could not write columnar cache' not in caplog.text
+    cached = loader._read_cache('persons', csv_path)
+    assert cached is not None
+    pd.testing.assert_frame_equal(cached.reset_index(drop=True), df.reset_index(drop=True), check_categorical=False)
+    assert not [name for name in os.listdir(loader.cache_dir) if name.endswith('.tmp')]
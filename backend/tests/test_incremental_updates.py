@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import risk_scoring
+
+BATCH_ROWS = 500
+
+
+@pytest.fixture(scope='module')
+def anomaly_model(datasets):
+    pytest.importorskip('sklearn')
+    from sklearn.ensemble import IsolationForest
+    from services.anomaly_scoring import DEFAULT_FEATURES, AnomalyModel, build_features
+
+    features = build_features(datasets['transactions'], DEFAULT_FEATURES).dropna()
+    return AnomalyModel(IsolationForest(n_estimators=25, contamination=0.05, random_state=0).fit(features))
+
+
+def test_incremental_update_matches_full_run_with_model(datasets, anomaly_model, analysed_scorer, monkeypatch):
+    monkeypatch.setattr(risk_scoring, 'load_anomaly_model', lambda: anomaly_model)
+    transactions = datasets['transactions'].reset_index(drop=True)
+    base, batch = transactions.iloc[:-BATCH_ROWS], transactions.iloc[-BATCH_ROWS:]
+
+    incremental, stats = analysed_scorer(base.reset_index(drop=True), 'inc').with_new_transactions(batch)
+    full = analysed_scorer(transactions, 'full')
+
+    # The batch moves its senders' velocity/degree, so some older rows must change flag
+    assert stats['transactions_reflagged'] > 0
+    np.testing.assert_array_equal(incremental._tx_anomalous, full._tx_anomalous)
+    pd.testing.assert_frame_equal(incremental._score_population(), full._score_population())
+
+    # The feature table is patched by the update itself, not rebuilt by the next request
+    patched = incremental._current_features()
+    assert patched is not None
+    pd.testing.assert_frame_equal(patched.frame, full.person_features().frame)
+
+    def scores(scorer):
+        return dict(zip(scorer.risk_scores_df['person_id'], scorer.risk_scores_df['final_risk_score']))
+    assert scores(incremental) == scores(full)
+
+
+def test_incremental_update_keeps_compact_transaction_dtypes(datasets, analysed_scorer):
+    transactions = datasets['transactions'].reset_index(drop=True)
+    base = transactions.iloc[:-BATCH_ROWS].reset_index(drop=True)
+    # A batch as the append endpoint reads it: plain CSV types, plus a payment mode never seen before
+    batch = transactions.iloc[-BATCH_ROWS:].astype(object).astype({'amount_inr': 'int64'})
+    batch['timestamp'] = batch['timestamp'].astype(str)
+    batch.iloc[0, batch.columns.get_loc('payment_mode')] = 'Crypto'
+
+    scorer = analysed_scorer(base)
+    updated, _ = scorer.with_new_transactions(batch)
+
+    # Same dtypes (categoricals compared by kind: the batch adds a category)
+    assert updated.transactions_df.dtypes.astype(str).to_dict() == scorer.transactions_df.dtypes.astype(str).to_dict()
+    assert updated.transactions_df.memory_usage(deep=True).sum() < 1.2 * scorer.transactions_df.memory_usage(deep=True).sum()
+    assert updated.transactions_df['payment_mode'].iloc[len(base)] == 'Crypto'
+    assert 'Crypto' not in scorer.transactions_df['payment_mode'].cat.categories
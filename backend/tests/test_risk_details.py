@@ -0,0 +1,27 @@
+import os
+
+import pandas as pd
+
+
+def test_details_correct_a_stale_score_without_writing_the_alerts(analysed_scorer):
+    scorer = analysed_scorer()
+    # Publish alerts whose top score is far from what the rules give today
+    alerts = scorer.risk_scores_df.copy()
+    alerts.loc[0, ['final_risk_score', 'risk_score']] = alerts.loc[0, 'final_risk_score'] + 50
+    scorer.risk_scores_df = alerts
+    scorer._persist_alerts()
+    person_id = alerts.loc[0, 'person_id']
+    published = alerts.copy()
+    index = scorer.alert_index
+    stat = os.stat(scorer.alert_store.path)
+    csv_stat = os.stat(scorer.alerts_csv_path)
+
+    details = scorer.get_person_risk_details(person_id)
+
+    assert details['canonical_alert_score'] == published.loc[0, 'final_risk_score']
+    assert details['final_risk_score'] == details['recalculated_risk_score']
+    pd.testing.assert_frame_equal(scorer.risk_scores_df, published)
+    assert scorer.alert_index is index
+    assert scorer.alert_store.view().get(person_id)['final_risk_score'] == published.loc[0, 'final_risk_score']
+    assert os.stat(scorer.alert_store.path).st_mtime_ns == stat.st_mtime_ns
+    assert os.stat(scorer.alerts_csv_path).st_mtime_ns == csv_stat.st_mtime_ns
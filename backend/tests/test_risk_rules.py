@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from services.risk_rules import compile_rules
+
+# Weights of the five data rules, unchanged since before the anomaly rule was added
+BASELINE_WEIGHTS = {
+    'income_discrepancy': 0.30,
+    'structuring': 0.25,
+    'shell_company_interaction': 0.25,
+    'property_discrepancy': 0.15,
+    'tax_status': 0.05,
+}
+
+
+def test_without_model_weights_match_baseline():
+    rules = compile_rules()
+    assert rules.weights == dict(BASELINE_WEIGHTS, transaction_anomaly=0.0)
+    scores = {name: np.array([100, 40]) for name in rules.names}
+    np.testing.assert_allclose(rules.weighted_total(scores), [100.0, 40.0])
+
+
+def test_with_model_weights_renormalize_to_one():
+    rules = compile_rules(available=('anomaly_model',))
+    assert sum(rules.weights.values()) == pytest.approx(1.0)
+    assert rules.weights['transaction_anomaly'] == pytest.approx(0.10 / 1.10)
+    for name, weight in BASELINE_WEIGHTS.items():
+        assert rules.weights[name] == pytest.approx(weight / 1.10)
+    scores = {name: np.array([100, 0]) for name in rules.names}
+    np.testing.assert_allclose(rules.weighted_total(scores), [100.0, 0.0])
+
+
+def test_scorer_weights_follow_loaded_model(analysed_scorer):
+    scorer = analysed_scorer()
+    expected = 0.0 if scorer.anomaly_model is None else pytest.approx(0.10 / 1.10)
+    assert scorer.rules.weights['transaction_anomaly'] == expected
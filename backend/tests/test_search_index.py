@@ -0,0 +1,24 @@
+import pandas as pd
+
+from services.search_index import PersonSearchIndex
+
+
+def _persons():
+    return pd.DataFrame({
+        'person_id': ['PER-001', 'PER-013', 'PER-200', 'PER-333'],
+        'full_name': ['Anita Rao', 'Zoya Khan', 'Vikram Mehta', 'Liza Shah'],
+    })
+
+
+def test_single_character_query_finds_substring_matches():
+    index = PersonSearchIndex(_persons())
+    # '3' is never a prefix, only a substring of ids (including as their last character)
+    assert index.search('3') == [1, 3]
+    # Name prefix 'zoya' first, then the substring match in 'liza'
+    assert index.search('z') == [1, 3]
+    assert index.search('x') == []
+
+
+def test_single_character_query_respects_limit():
+    index = PersonSearchIndex(_persons())
+    assert index.search('a', limit=2) == [0, 1]
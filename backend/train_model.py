@@ -1,8 +1,18 @@
 import os
+import json
+import time
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
 import pandas as pd
+import sklearn
 from sklearn.ensemble import IsolationForest
 import joblib
 
+from services.anomaly_scoring import DEFAULT_FEATURES, AccountActivity, build_features
+from services.risk_rules import epoch_seconds
+
 # --- Configuration ---
 # Define the relative paths to the data and model directories.
 # This makes the script runnable from the `backend` directory.
@@ -10,64 +20,167 @@ DATA_DIR = os.path.join(os.path.dirname(__file__), 'generated-data')
 TRANSACTIONS_FILE = os.path.join(DATA_DIR, 'Transactions.csv')
 MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
 MODEL_PATH = os.path.join(MODEL_DIR, 'isolation_forest.pkl')
+# Features, sample size and timings of the saved model, written next to it
+METADATA_PATH = os.path.join(MODEL_DIR, 'isolation_forest.json')
+
+# Rows read per chunk, and rows kept (uniformly at random) to fit on
+CHUNK_SIZE = int(os.environ.get('TRAIN_CHUNK_SIZE', '500000'))
+SAMPLE_SIZE = int(os.environ.get('TRAIN_SAMPLE_SIZE', '256000'))
+N_ESTIMATORS = int(os.environ.get('TRAIN_N_ESTIMATORS', '100'))
+# Rows each tree sees: 'auto' (min(256, sample size)), a row count or a fraction
+MAX_SAMPLES = os.environ.get('TRAIN_MAX_SAMPLES', 'auto')
+
+TRAIN_COLUMNS = ['from_account', 'to_account', 'amount_inr', 'timestamp']
+
+
+class ReservoirSample:
+    """
+    Uniform random sample of at most `size` rows from a stream of chunks
+    (Algorithm R, vectorized per chunk), so training never holds more than one
+    chunk plus the sample regardless of history length.
+    """
+    def __init__(self, size, seed=42):
+        self.size = max(1, size)
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+        self._columns = None
+
+    def __len__(self):
+        return 0 if self._columns is None else len(next(iter(self._columns.values())))
+
+    @property
+    def frame(self):
+        return pd.DataFrame(self._columns)
+
+    def add(self, chunk):
+        arrays = {col: chunk[col].to_numpy() for col in chunk.columns}
+        fill = min(self.size - len(self), len(chunk))
+        if self._columns is None:
+            self._columns = {col: values[:fill].copy() for col, values in arrays.items()}
+        elif fill:
+            self._columns = {col: np.concatenate([self._columns[col], arrays[col][:fill]]) for col in arrays}
+        rest = len(chunk) - fill
+        if rest > 0:
+            # Stream row i (0-based) replaces a random slot with probability size / (i + 1)
+            stream_pos = self.seen + fill + np.arange(rest)
+            slots = (self.rng.random(rest) * (stream_pos + 1)).astype(np.int64)
+            hit = np.flatnonzero(slots < self.size)
+            # Later rows overwrite earlier ones that drew the same slot, as a sequential pass would
+            slots, last = np.unique(slots[hit][::-1], return_index=True)
+            rows = hit[::-1][last] + fill
+            for col, values in arrays.items():
+                self._columns[col][slots] = values[rows]
+        self.seen += len(chunk)
+
+
+def _max_samples(value):
+    if value == 'auto':
+        return value
+    return float(value) if '.' in value else int(value)
+
+
+def _atomic_write(path, write):
+    """Writes through a temp file in the same directory, then renames it over `path`."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.model-', suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        # mkstemp creates the file 0600; give it the mode open() would (0666 less the umask)
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 
 def train_model():
     """
-    Loads transaction data, trains an Isolation Forest model for anomaly detection,
-    and saves the trained model to a file.
+    Streams the transaction history in chunks, building per-account activity
+    and a reservoir sample, trains an Isolation Forest on the sample's features
+    and saves the model with its metadata.
     """
     print("--- Starting Model Training ---")
+    timings = {}
 
-    # 1. Load the dataset
+    # 1. Stream the dataset: account history over every row, a bounded sample to fit on
+    started = time.perf_counter()
+    activity = AccountActivity()
+    sample = ReservoirSample(SAMPLE_SIZE)
+    chunks = 0
     try:
-        print(f"Loading data from {TRANSACTIONS_FILE}...")
-        df = pd.read_csv(TRANSACTIONS_FILE)
-        print("Data loaded successfully.")
+        print(f"Streaming data from {TRANSACTIONS_FILE} ({CHUNK_SIZE} rows per chunk)...")
+        for chunk in pd.read_csv(TRANSACTIONS_FILE, usecols=TRAIN_COLUMNS, chunksize=CHUNK_SIZE):
+            activity.update(chunk)
+            sample.add(chunk)
+            chunks += 1
     except FileNotFoundError:
         print(f"ERROR: Transactions.csv not found at {TRANSACTIONS_FILE}")
         print("Please run the data generation script first.")
         return
-
-
+    if not sample.seen:
+        print("ERROR: Transactions.csv has no rows to train on.")
+        return
+    timings['stream_seconds'] = time.perf_counter() - started
+    print(f"Read {sample.seen} transactions from {len(activity)} accounts in {chunks} chunks; sampled {len(sample)}.")
 
     # 2. Feature Engineering
+    # Velocity and counterparty degree come from the full history, not just the sample
     print("Performing feature engineering...")
-    # Convert timestamp to a numerical feature (epoch time) for the model
-    # FIX IS HERE: Added the format parameter to handle microseconds
-    df['timestamp'] = pd.to_datetime(df['timestamp'], format='mixed')
-    df['timestamp_epoch'] = df['timestamp'].astype('int64') // 10**9
-
-
-    # Select features for the model
-    # We choose features that are likely to indicate anomalous behavior
-    features = [
-        'amount_inr',
-        'timestamp_epoch'
-    ]
-    X = df[features]
-
-    print(f"Training on {len(X)} transactions with features: {features}")
+    started = time.perf_counter()
+    sampled = sample.frame
+    X = build_features(sampled, DEFAULT_FEATURES, times=epoch_seconds(sampled['timestamp']), activity=activity)
+    X = X[X.notna().all(axis=1)]
+    timings['features_seconds'] = time.perf_counter() - started
+    print(f"Training on {len(X)} transactions with features: {DEFAULT_FEATURES}")
 
     # 3. Train the Isolation Forest Model
     # The 'contamination' parameter is the expected proportion of outliers in the data.
     # We'll assume around 1% of transactions are anomalous for this model.
     print("Training Isolation Forest model...")
+    started = time.perf_counter()
     model = IsolationForest(
-        n_estimators=100,
+        n_estimators=N_ESTIMATORS,
         contamination=0.01,
-        max_samples='auto',
-        random_state=42
+        max_samples=_max_samples(MAX_SAMPLES),
+        random_state=42,
+        n_jobs=-1
     )
     model.fit(X)
+    timings['fit_seconds'] = time.perf_counter() - started
     print("Model training complete.")
 
     # 4. Save the Model
-    # Ensure the 'models' directory exists
+    # Ensure the 'models' directory exists; the running backend reloads the file when it changes
     os.makedirs(MODEL_DIR, exist_ok=True)
-    
     print(f"Saving model to {MODEL_PATH}...")
-    joblib.dump(model, MODEL_PATH)
+    started = time.perf_counter()
+    _atomic_write(MODEL_PATH, lambda path: joblib.dump(model, path))
+    timings['save_seconds'] = time.perf_counter() - started
+    metadata = {
+        'features': list(DEFAULT_FEATURES),
+        'rows_seen': int(sample.seen),
+        'accounts_seen': len(activity),
+        'chunks': chunks,
+        'chunk_size': CHUNK_SIZE,
+        'sample_size': len(X),
+        'n_estimators': N_ESTIMATORS,
+        'max_samples': MAX_SAMPLES,
+        'contamination': 0.01,
+        'timings': {name: round(seconds, 3) for name, seconds in timings.items()},
+        'sklearn_version': sklearn.__version__,
+        'trained_at': datetime.now(timezone.utc).isoformat(),
+    }
+
+    def write_metadata(path):
+        with open(path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+    _atomic_write(METADATA_PATH, write_metadata)
     print("--- Model saved successfully! ---")
+    print(f"Timings (s): {metadata['timings']}")
     print(f"The backend is now ready. You can run 'flask run' to start the server.")
 
 if __name__ == "__main__":
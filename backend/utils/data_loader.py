@@ -1,6 +1,161 @@
 import pandas as pd
+import numpy as np
 import os
+import json
+import time
+import shutil
+import hashlib
 import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.upload_ingest import UploadValidationError
+
+# --- Optional columnar cache (graceful fallback to CSV-only) ---
+PARQUET_AVAILABLE = True
+try:
+    import pyarrow  # type: ignore  # noqa: F401
+    import pyarrow.csv  # type: ignore  # noqa: F401
+    import pyarrow.parquet  # type: ignore  # noqa: F401
+except Exception as imp_err:
+    PARQUET_AVAILABLE = False
+    logging.getLogger(__name__).warning(f"pyarrow not available ({imp_err}). Datasets will be read from CSV only.")
+
+try:
+    import fcntl  # type: ignore
+except ImportError:
+    # No advisory file locks (Windows): appends and compaction are only serialized within a process
+    fcntl = None
+
+# Bump when the cached representation changes (parsing rules, dtypes) to invalidate old caches
+CACHE_FORMAT_VERSION = 2
+
+# Rows appended to a dataset file are kept as immutable segments in '<stem>.delta/' next to it
+DELTA_DIR_SUFFIX = '.delta'
+
+
+def delta_segment_paths(full_path):
+    """Delta segments appended to the dataset file at `full_path`, oldest first."""
+    directory = os.path.splitext(full_path)[0] + DELTA_DIR_SUFFIX
+    try:
+        names = sorted(n for n in os.listdir(directory) if n.endswith('.csv') and not n.startswith('.'))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, n) for n in names]
+
+
+class TransactionIdIndex:
+    """
+    Transaction ids as sorted 64-bit hashes plus the row each came from, for
+    duplicate checks on appended batches without a hash table of Python
+    strings (16 bytes per row). Hash hits are confirmed against the stored
+    ids. Immutable: `extended` returns a new index.
+    """
+    def __init__(self, hashes, rows):
+        self.hashes = hashes
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @staticmethod
+    def hash_ids(ids):
+        values = pd.Series(np.asarray(ids, dtype=object)).astype(str).to_numpy(dtype=object)
+        return pd.util.hash_array(values, categorize=False)
+
+    @classmethod
+    def build(cls, ids):
+        hashes = cls.hash_ids(ids)
+        order = np.argsort(hashes, kind='stable')
+        return cls(hashes[order], order.astype(np.int64))
+
+    def lookup(self, ids, stored):
+        """Row of each of `ids` in `stored` (the indexed id Series), -1 where it is not there."""
+        hashes = self.hash_ids(ids)
+        at = np.minimum(np.searchsorted(self.hashes, hashes), max(len(self.hashes) - 1, 0))
+        rows = np.full(len(hashes), -1, dtype=np.int64)
+        if not len(self.hashes):
+            return rows
+        hit = np.flatnonzero(self.hashes[at] == hashes)
+        if len(hit):
+            candidates = self.rows[at[hit]]
+            same = stored.iloc[candidates].astype(str).to_numpy() == pd.Series(np.asarray(ids, dtype=object)[hit]).astype(str).to_numpy()
+            rows[hit[same]] = candidates[same]
+        return rows
+
+    def extended(self, ids, first_row):
+        """A new index that also holds `ids`, stored from row `first_row` on."""
+        hashes = self.hash_ids(ids)
+        order = np.argsort(hashes, kind='stable')
+        at = np.searchsorted(self.hashes, hashes[order], side='right')
+        return TransactionIdIndex(
+            np.insert(self.hashes, at, hashes[order]),
+            np.insert(self.rows, at, first_row + order.astype(np.int64)),
+        )
+
+class LazyDatasets(dict):
+    """Loaded datasets by key, plus keys deferred until first use.
+
+    Looking up a deferred key (``[key]``, ``.get(key)``) parses it through the
+    loader and keeps the result; iteration, ``items()`` and ``len()`` only see
+    what has been loaded, so metadata and memory reports never force a load.
+    Each load returns a new mapping stamped with its dataset version, metadata,
+    id dictionary and per-file content fingerprints, so holders of an older
+    mapping keep a consistent view and reloads can tell what changed.
+    """
+
+    def __init__(self, loader, pending=(), version=None, metadata=None, id_dtype=None, fingerprints=None):
+        super().__init__()
+        self._loader = loader
+        self.pending = set(pending)
+        self.version = version
+        self.metadata = metadata
+        self.id_dtype = id_dtype
+        self.fingerprints = dict(fingerprints or {})
+
+    def __missing__(self, key):
+        if key in self.pending:
+            return self._loader._load_pending(key, self)
+        raise KeyError(key)
+
+    def replace(self, version=None, **frames):
+        """
+        A copy with `frames` swapped in (and a new version); this mapping is left
+        as is. Swapped-in frames are taken to match their files as the loader
+        last fingerprinted them.
+        """
+        fingerprints = dict(self.fingerprints)
+        fingerprints.update({key: self._loader.fingerprints.get(key) for key in frames})
+        copy = LazyDatasets(self._loader, self.pending - set(frames), version or self.version,
+                            self.metadata, self.id_dtype, fingerprints)
+        dict.update(copy, self)
+        dict.update(copy, frames)
+        return copy
+
+    def changed_since(self, other):
+        """Keys whose file content differs from when `other` was loaded."""
+        return {key for key in self._loader.file_names if self.fingerprints.get(key) != other.fingerprints.get(key)}
+
+    def load_pending(self, keys=None):
+        """Loads deferred datasets (all, or those in `keys`) now, e.g. before their source files are replaced."""
+        for key in sorted(self.pending if keys is None else self.pending.intersection(keys)):
+            self.get(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self.pending
+
+    def loaded(self, key):
+        """The dataset if it has been loaded, without triggering a load."""
+        return dict.get(self, key)
+
 
 class DataLoader:
     """Load CSV datasets and optional metadata.json with light schema validation.
@@ -12,10 +167,24 @@ class DataLoader:
         schemas: Minimal required columns per dataset for fail-fast validation.
         metadata_file: Path to metadata.json (if present).
         metadata: Parsed metadata contents.
+        dataset_version: Hash of the source files' content as of the last load or
+            `refresh_version`; the key downstream caches (risk details, features, shared snapshot) use.
+        fingerprints: Content hash (sha1) per dataset file as of the last `refresh_version`; None if missing.
+        parse_dates: Columns parsed to datetimes at load time, per dataset.
+        dtypes: Compact in-memory dtype per column ('id', 'category', 'int64', 'string').
+        id_dtype: Shared CategoricalDtype for every 'id' column (persons, companies, account owners).
+        cache_dir: Directory holding the typed Parquet copy of each CSV (``.cache`` under data_path).
+        use_cache: Read/write the Parquet cache (DATASET_CACHE env, default on; needs pyarrow).
+        csv_engine: 'pyarrow' (multithreaded parser, default when installed) or 'c' (DATASET_CSV_ENGINE env).
+        workers: Files read concurrently by load_all_data (DATASET_LOAD_WORKERS env, default one per file).
+        load_timings: Seconds spent reading, validating and typing each dataset in the last load.
+        required: Datasets services declared they need (see `require`); the rest load on first
+            access when lazy loading is on (DATASET_LAZY env, default on). None loads everything.
+        appendable: Datasets read as their file plus delta segments (see `append_transactions`).
     """
-    def __init__(self, data_path='./generated-data/'):
+    def __init__(self, data_path='./generated-data/', use_cache=None):
         self.data_path = data_path
-        self.datasets = {}
+        self.datasets = LazyDatasets(self)
         self.file_names = {
             "persons": "Persons.csv",
             "accounts": "BankAccounts.csv",
@@ -37,10 +206,59 @@ class DataLoader:
             "cases": ["case_id","person_id","case_details","case_date","status"],
             "alerts": ["alert_id","person_id","risk_score","timestamp","summary","status"],
         }
+        # Parsed once here (and stored parsed in the cache) so consumers don't re-parse per load
+        self.parse_dates = {
+            "transactions": ["timestamp"],
+            "companies": ["incorporation_date"],
+        }
+        # Compact representation: 'id' columns become categoricals over one shared dictionary of
+        # entity ids (codes compare across datasets), 'category' for low-cardinality enums,
+        # 'int64' for account numbers and amounts, 'string' (Arrow-backed) for unique text keys.
+        self.dtypes = {
+            "persons": {"person_id": "id", "monthly_salary_inr": "int64", "tax_filing_status": "category"},
+            "accounts": {"account_number": "int64", "owner_id": "id", "bank_name": "category",
+                         "account_type": "category", "balance_inr": "int64"},
+            "transactions": {"transaction_id": "string", "from_account": "int64", "to_account": "int64",
+                             "amount_inr": "int64", "payment_mode": "category", "remarks": "category"},
+            "companies": {"cin": "id", "company_status": "category", "paid_up_capital_inr": "int64"},
+            "directorships": {"person_id": "id", "cin": "id"},
+            "properties": {"owner_person_id": "id", "purchase_value_inr": "int64"},
+            "cases": {"person_id": "id", "status": "category"},
+        }
+        # Columns that must parse as numbers; checked against the dtype the parser produced
+        self.numeric_columns = {
+            "persons": ["monthly_salary_inr"],
+            "accounts": ["balance_inr"],
+            "companies": ["paid_up_capital_inr"],
+            "transactions": ["amount_inr"],
+            "properties": ["purchase_value_inr"],
+            "alerts": ["risk_score"],
+        }
+        self.id_dtype = None
+        # Derived output rewritten by every analysis run; never cached
+        self.uncached = {"alerts"}
+        if use_cache is None:
+            use_cache = os.getenv('DATASET_CACHE', '1').lower() not in ('0', 'false', 'no')
+        self.use_cache = bool(use_cache) and PARQUET_AVAILABLE
+        self.cache_dir = os.path.join(self.data_path, '.cache')
+        self.appendable = {"transactions"}
+        self._delta_lock_path = os.path.join(self.cache_dir, 'delta.lock')
+        self._delta_lock_held = False
+        engine = os.getenv('DATASET_CSV_ENGINE', 'pyarrow').lower()
+        self.csv_engine = 'pyarrow' if engine == 'pyarrow' and PARQUET_AVAILABLE else 'c'
+        self.workers = max(1, int(os.getenv('DATASET_LOAD_WORKERS', '0')) or len(self.file_names))
+        self.load_timings = {}
+        self.required = None
+        self.lazy = os.getenv('DATASET_LAZY', '1').lower() not in ('0', 'false', 'no')
+        self._lazy_lock = threading.Lock()
         self.logger = logging.getLogger(__name__)
         # Metadata path and in-memory cache
         self.metadata_file = os.path.join(self.data_path, 'metadata.json')
         self.metadata = None
+        self.dataset_version = None
+        self.fingerprints = {}
+        # path -> (size, mtime_ns, sha1): files are only rehashed when their size or mtime moves
+        self._hashes = {}
 
     def _validate_schema(self, key: str, df: pd.DataFrame):
         required = self.schemas.get(key)
@@ -49,35 +267,92 @@ class DataLoader:
         missing = [c for c in required if c not in df.columns]
         if missing:
             raise ValueError(f"{key} missing columns: {', '.join(missing)}")
-        # Light type checks for numeric-ish fields
-        numeric_hints = [
-            ("persons", ["monthly_salary_inr"]),
-            ("accounts", ["balance_inr"]),
-            ("companies", ["paid_up_capital_inr"]),
-            ("transactions", ["amount_inr"]),
-            ("properties", ["purchase_value_inr"]),
-            ("alerts", ["risk_score"]),
-        ]
-        for dataset, cols in numeric_hints:
-            if dataset != key:
-                continue
-            for col in cols:
-                if col in df.columns:
-                    try:
-                        pd.to_numeric(df[col])
-                    except Exception:
-                        raise ValueError(f"{key}.{col} contains non-numeric values")
-
-    def load_all_data(self):
+        # Light type checks for numeric-ish fields: a column the parser typed numeric already
+        # passed; only text-typed columns are scanned
+        for col in self.numeric_columns.get(key, []):
+            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col].dtype):
+                try:
+                    pd.to_numeric(df[col])
+                except Exception:
+                    raise ValueError(f"{key}.{col} contains non-numeric values")
+
+    def _load_dataset(self, key: str, file_name: str):
+        """Reads, validates and types one dataset (with its delta segments); returns (DataFrame, source, seconds)."""
+        started = time.perf_counter()
+        full_path = os.path.join(self.data_path, file_name)
+        if key not in self.appendable:
+            df, source = self._load_file(key, full_path)
+            return df, source, time.perf_counter() - started
+        # File and segments are read under one lock so a concurrent compaction can't drop or repeat rows
+        with self.delta_lock(shared=True):
+            df, source = self._load_file(key, full_path)
+            segments = delta_segment_paths(full_path)
+            if segments:
+                df = pd.concat([df] + [self._read_csv(key, path) for path in segments], ignore_index=True)
+                self._validate_schema(key, df)
+                df = self._apply_dtypes(key, df)
+                source = f"{source} + {len(segments)} delta segments"
+        return df, source, time.perf_counter() - started
+
+    def _load_file(self, key: str, full_path: str):
+        df, source = self._read_dataset(key, full_path)
+        # Validate schema and types
+        self._validate_schema(key, df)
+        df = self._apply_dtypes(key, df)
+        if source == 'csv':
+            self._write_cache(key, full_path, df)
+        return df, source
+
+    def require(self, *datasets):
+        """Marks datasets (keys, or services' REQUIRED_DATASETS tuples) as loaded up front."""
+        self.required = set(self.required or ())
+        for group in datasets:
+            self.required.update([group] if isinstance(group, str) else group)
+
+    def load_all_data(self, previous=None):
+        """
+        Loads the required datasets (all of them without `require` or with lazy
+        loading off) and returns a LazyDatasets mapping that reads the others
+        on first access.
+
+        With `previous` (an earlier mapping), datasets whose file content is
+        unchanged are taken over from it as they are, loaded or still deferred,
+        so a reload only parses the files that changed.
+        """
         self.logger.info("--- Starting Data Loading Process ---")
-        for key, file_name in self.file_names.items():
+        started = time.perf_counter()
+        self.refresh_version()
+        reused = {}
+        if previous is not None:
+            for key in self.file_names:
+                if self.fingerprints[key] is None or previous.fingerprints.get(key) != self.fingerprints[key]:
+                    continue
+                if previous.loaded(key) is not None:
+                    reused[key] = previous.loaded(key)
+                elif key in previous.pending:
+                    reused[key] = None
+        eager = {
+            key: name for key, name in self.file_names.items()
+            if key not in reused and (not self.lazy or self.required is None or key in self.required)
+        }
+        self.datasets = LazyDatasets(
+            self, pending=[key for key in self.file_names if key not in eager and reused.get(key) is None],
+            fingerprints=self.fingerprints,
+        )
+        dict.update(self.datasets, {key: df for key, df in reused.items() if df is not None})
+        if reused:
+            self.logger.info(f"[RELOAD] Unchanged, not parsed again: {', '.join(sorted(reused))}")
+        # Files load concurrently: Parquet and Arrow CSV parsing run outside the GIL
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(eager)))) as pool:
+            futures = {key: pool.submit(self._load_dataset, key, name) for key, name in eager.items()}
+        self.load_timings = {}
+        for key, file_name in eager.items():
             full_path = os.path.join(self.data_path, file_name)
             try:
-                df = pd.read_csv(full_path)
-                # Validate schema and types
-                self._validate_schema(key, df)
+                df, source, seconds = futures[key].result()
                 self.datasets[key] = df
-                self.logger.info(f"[SUCCESS] Loaded '{file_name}' into memory.")
+                self.load_timings[key] = round(seconds, 3)
+                self.logger.info(f"[SUCCESS] Loaded '{file_name}' into memory (from {source}, {seconds:.2f}s).")
             except FileNotFoundError:
                 self.logger.error(f"File not found: '{full_path}'. Cannot load '{key}' dataset.")
                 self.datasets[key] = None
@@ -90,11 +365,46 @@ class DataLoader:
             except Exception as e:
                 self.logger.error(f"Failed reading '{file_name}': {e}")
                 self.datasets[key] = None
-        self.logger.info("--- Data Loading Process Finished ---")
+        self.logger.info(f"[TIMING] Read {len(eager)} datasets in {time.perf_counter() - started:.2f}s "
+                         f"({self.csv_engine} CSV engine, {max(1, min(self.workers, len(eager)))} workers)")
+        if self.datasets.pending:
+            self.logger.info(f"[LAZY] Deferred until first use: {', '.join(sorted(self.datasets.pending))}")
+        self._share_id_dictionary(reused)
+        usage = self.memory_usage()
+        self.logger.info("[MEMORY] " + ", ".join(f"{k}={v / 1e6:.1f}MB" for k, v in usage.items())
+                         + f" (total {sum(usage.values()) / 1e6:.1f}MB)")
+        self.logger.info(f"--- Data Loading Process Finished (version {self.dataset_version}) ---")
+        self._read_metadata()
+        self.datasets.version = self.dataset_version
+        self.datasets.metadata = self.metadata
+        self.datasets.id_dtype = self.id_dtype
+        return self.datasets
+
+    def attach(self, frames, version, id_dtype=None):
+        """
+        A LazyDatasets over already loaded and typed `frames` (e.g. a shared
+        snapshot another process exported); datasets not among them load on
+        first use as usual.
+        """
+        self.refresh_version()
+        self.datasets = LazyDatasets(self, pending=[key for key in self.file_names if key not in frames],
+                                     fingerprints=self.fingerprints)
+        dict.update(self.datasets, frames)
+        self.id_dtype = id_dtype
+        self.dataset_version = version
+        self.load_timings = {}
+        self._read_metadata()
+        self.datasets.version = version
+        self.datasets.metadata = self.metadata
+        self.datasets.id_dtype = id_dtype
+        self.logger.info(f"[SHARED] Attached {len(frames)} datasets (version {version}); nothing parsed.")
+        return self.datasets
+
+    def _read_metadata(self):
         # Load metadata if present
+        self.metadata = None
         try:
             if os.path.exists(self.metadata_file):
-                import json
                 with open(self.metadata_file, 'r', encoding='utf-8') as f:
                     self.metadata = json.load(f)
                 # Light schema validation (non-fatal)
@@ -104,22 +414,418 @@ class DataLoader:
                 self.logger.info("[INFO] Loaded metadata.json")
         except Exception as me:
             self.logger.warning(f"Failed to read metadata.json: {me}")
-        return self.datasets
+        return self.metadata
 
-    def get_metadata(self):
-        # Derive counts if metadata missing
-        meta = self.metadata or {}
-        counts = meta.get('counts') or {}
-        for k, df in self.datasets.items():
+    def _load_pending(self, key: str, datasets=None):
+        """Loads a deferred dataset of `datasets` (default: the latest load) once; concurrent first lookups share it."""
+        datasets = self.datasets if datasets is None else datasets
+        with self._lazy_lock:
+            if dict.__contains__(datasets, key):
+                return datasets.loaded(key)
+            file_name = self.file_names[key]
+            try:
+                df, source, seconds = self._load_dataset(key, file_name)
+            except FileNotFoundError:
+                self.logger.error(f"File not found: '{os.path.join(self.data_path, file_name)}'. Cannot load '{key}' dataset.")
+                df, source, seconds = None, None, 0.0
+            except ValueError as ve:
+                # Not cached: the next lookup retries once the file is fixed
+                self.logger.error(f"[SCHEMA ERROR] {ve}. File: '{file_name}'")
+                raise
+            except Exception as e:
+                self.logger.error(f"Failed reading '{file_name}': {e}")
+                df, source, seconds = None, None, 0.0
             if df is not None:
+                self._adopt_id_dictionary(key, df, datasets.id_dtype)
+                self.load_timings[key] = round(seconds, 3)
+                self.logger.info(f"[LAZY] Loaded '{file_name}' on first use (from {source}, {seconds:.2f}s).")
+            dict.__setitem__(datasets, key, df)
+            datasets.pending.discard(key)
+            return df
+
+    def get_metadata(self, datasets=None):
+        """Metadata of `datasets` (default: the latest load) with counts derived from the loaded frames."""
+        datasets = self.datasets if datasets is None else datasets
+        # Derive counts if metadata missing
+        meta = dict(datasets.metadata or {})
+        counts = dict(meta.get('counts') or {})
+        for k, df in datasets.items():
+            # app.py attaches the metadata dict itself to this mapping; count frames only
+            if isinstance(df, pd.DataFrame):
                 counts[k] = int(df.shape[0])
         if counts:
             meta['counts'] = counts
+        if datasets.version:
+            meta['dataset_version'] = datasets.version
+        meta['memory_bytes'] = self.memory_usage(datasets)
+        if datasets.pending:
+            meta['deferred'] = sorted(datasets.pending)
         return meta or {"counts": counts}
 
     def get_data(self, key):
         return self.datasets.get(key)
 
+    def memory_usage(self, datasets=None):
+        """Deep in-memory size in bytes per loaded dataset (the shared id dictionary counts once per column)."""
+        datasets = self.datasets if datasets is None else datasets
+        return {
+            k: int(df.memory_usage(deep=True).sum())
+            for k, df in datasets.items() if isinstance(df, pd.DataFrame)
+        }
+
+    # --- dtype schema ---
+    def _apply_dtypes(self, key: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Casts columns to their compact dtypes; a column that can't be cast keeps its dtype."""
+        for col, kind in self.dtypes.get(key, {}).items():
+            if col not in df.columns:
+                continue
+            try:
+                if kind in ('id', 'category'):
+                    df[col] = df[col].astype('category')
+                elif kind == 'int64':
+                    values = pd.to_numeric(df[col])
+                    # Columns with gaps stay float64 rather than failing the load
+                    df[col] = values if values.isna().any() else values.astype('int64')
+                elif kind == 'string' and PARQUET_AVAILABLE:
+                    df[col] = df[col].astype('string[pyarrow]')
+            except (ValueError, TypeError) as e:
+                self.logger.warning(f"{key}.{col}: keeping {df[col].dtype} ({e})")
+        return df
+
+    def _share_id_dictionary(self, reused=()):
+        """
+        Recodes every 'id' column onto one CategoricalDtype spanning all loaded ids.
+        Frames in `reused` belong to an earlier mapping too; they are copied
+        (shallowly) before recoding, and left alone when the dictionary is unchanged.
+        """
+        columns = [
+            (key, col) for key, spec in self.dtypes.items() for col, kind in spec.items()
+            if kind == 'id' and isinstance(self.datasets.loaded(key), pd.DataFrame) and col in self.datasets[key].columns
+        ]
+        ids = set()
+        for key, col in columns:
+            series = self.datasets[key][col]
+            ids.update(series.cat.categories if isinstance(series.dtype, pd.CategoricalDtype) else series.dropna().unique())
+        id_dtype = pd.CategoricalDtype(sorted(ids, key=str))
+        if self.id_dtype is None or list(id_dtype.categories) != list(self.id_dtype.categories):
+            self.id_dtype = id_dtype
+        for key, col in columns:
+            df = self.datasets[key]
+            if df[col].dtype == self.id_dtype and list(df[col].cat.categories) == list(self.id_dtype.categories):
+                continue
+            if key in reused:
+                df = df.copy(deep=False)
+                dict.__setitem__(self.datasets, key, df)
+            df[col] = df[col].astype(self.id_dtype)
+
+    def _adopt_id_dictionary(self, key: str, df: pd.DataFrame, id_dtype):
+        """Recodes a late-loaded dataset's 'id' columns onto the shared dictionary when it covers them."""
+        if id_dtype is None:
+            return
+        known = id_dtype.categories
+        for col, kind in self.dtypes.get(key, {}).items():
+            if kind != 'id' or col not in df.columns:
+                continue
+            values = df[col].cat.categories if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].dropna().unique()
+            if pd.Index(values).isin(known).all():
+                df[col] = df[col].astype(id_dtype)
+            else:
+                self.logger.warning(f"{key}.{col} has ids outside the loaded datasets; keeping its own categories.")
+
+    def refresh_version(self):
+        """
+        Fingerprints every source file by content and recomputes the dataset
+        version from them: the same data gives the same version across reloads,
+        re-uploads and processes. Only files whose size or mtime moved are read.
+        """
+        self.fingerprints = {key: self._fingerprint(key, file_name) for key, file_name in self.file_names.items()}
+        digest = hashlib.sha1()
+        for key, file_name in sorted(self.file_names.items()):
+            if key == 'alerts':
+                continue  # derived output rewritten by every analysis run
+            digest.update(f"{file_name}:{self.fingerprints[key] or 'missing'};".encode())
+        self.dataset_version = digest.hexdigest()[:16]
+        return self.dataset_version
+
+    def _fingerprint(self, key: str, file_name: str):
+        """Content hash of a dataset file, or with delta segments a hash over the file's and each segment's."""
+        full_path = os.path.join(self.data_path, file_name)
+        digest = self._content_hash(full_path)
+        segments = delta_segment_paths(full_path) if key in self.appendable else []
+        if digest is None or not segments:
+            return digest
+        combined = hashlib.sha1(digest.encode())
+        for path in segments:
+            combined.update(f"{os.path.basename(path)}:{self._content_hash(path)};".encode())
+        return combined.hexdigest()
+
+    # --- delta segments ---
+    @contextmanager
+    def delta_lock(self, shared=False):
+        """
+        Serializes appends and compactions (exclusive) with reads of appendable
+        datasets (shared) across worker processes. Loads this process runs
+        while holding the exclusive lock (a reload before an append) skip it;
+        within a process those callers are serialized by the snapshot build lock.
+        """
+        if fcntl is None or self._delta_lock_held:
+            yield
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._delta_lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            self._delta_lock_held = not shared
+            try:
+                yield
+            finally:
+                self._delta_lock_held = False
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def delta_segments(self, key: str = 'transactions'):
+        """Paths of the delta segments appended to `key`, oldest first."""
+        return delta_segment_paths(os.path.join(self.data_path, self.file_names[key]))
+
+    def append_transactions(self, batch: pd.DataFrame, id_index, stored_ids, first_row=2, max_errors=100):
+        """
+        Writes `batch` (transaction rows) as a new immutable delta segment of
+        Transactions.csv and returns its path; later loads read the file plus
+        its segments.
+
+        Rows must carry the schema's columns and new ids: not repeated within
+        the batch, and not in `stored_ids` (the loaded transaction_id Series)
+        as looked up through `id_index`, a TransactionIdIndex over it. Otherwise
+        UploadValidationError lists the offending rows (numbered from
+        `first_row`) and nothing is written. Call under `delta_lock()`.
+        """
+        key = 'transactions'
+        file_name = self.file_names[key]
+        full_path = os.path.join(self.data_path, file_name)
+        self._validate_schema(key, batch)
+        ids = batch['transaction_id']
+        existing = id_index.lookup(ids, stored_ids) >= 0
+        repeated = ids.astype(str).duplicated().to_numpy()
+        bad = np.flatnonzero(existing | repeated)
+        if len(bad):
+            errors = [{
+                "row": int(i) + first_row,
+                "column": "transaction_id",
+                "value": str(ids.iat[i]),
+                "message": "transaction_id already loaded" if existing[i] else "transaction_id repeated in batch",
+            } for i in bad[:max_errors]]
+            raise UploadValidationError(file_name, f"{len(bad)} duplicate transaction ids",
+                                        errors=errors, error_count=len(bad), rows_checked=len(batch))
+        # Segments keep the file's column order so compaction can concatenate them as they are
+        try:
+            header = list(pd.read_csv(full_path, nrows=0).columns)
+        except FileNotFoundError:
+            header = list(batch.columns)
+        segments = delta_segment_paths(full_path)
+        directory = os.path.splitext(full_path)[0] + DELTA_DIR_SUFFIX
+        os.makedirs(directory, exist_ok=True)
+        sequence = int(os.path.splitext(os.path.basename(segments[-1]))[0]) + 1 if segments else 1
+        path = os.path.join(directory, f"{sequence:08d}.csv")
+        tmp_path = os.path.join(directory, f".{sequence:08d}.csv.tmp")
+        batch.reindex(columns=header).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        self.logger.info(f"[DELTA] Appended {len(batch)} rows to '{file_name}' as segment {sequence} "
+                         f"({len(segments) + 1} pending compaction).")
+        return path
+
+    def compact_segments(self, key: str = 'transactions'):
+        """
+        Folds the delta segments of `key` into its file (temp file + rename) and
+        deletes them; returns how many were merged. Rows and their order are
+        unchanged. Call under `delta_lock()`.
+        """
+        full_path = os.path.join(self.data_path, self.file_names[key])
+        segments = delta_segment_paths(full_path)
+        if not segments or not os.path.exists(full_path):
+            return 0
+        started = time.perf_counter()
+        with open(full_path, 'rb') as base:
+            header = base.readline().strip()
+        columns = list(pd.read_csv(full_path, nrows=0).columns)
+        tmp_path = full_path + '.compact.tmp'
+        try:
+            with open(tmp_path, 'w+b') as out:
+                for path in [full_path] + segments:
+                    if out.tell():
+                        # Each part must end its last row before the next one starts
+                        out.seek(-1, os.SEEK_END)
+                        if out.read(1) != b'\n':
+                            out.write(b'\n')
+                    with open(path, 'rb') as f:
+                        if path != full_path and f.readline().strip() != header:
+                            # Written against an older column order: rewrite its rows in the file's
+                            f.seek(0)
+                            out.write(pd.read_csv(f)[columns].to_csv(index=False, header=False).encode())
+                        else:
+                            shutil.copyfileobj(f, out, 1 << 20)
+            os.replace(tmp_path, full_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        for path in segments:
+            os.remove(path)
+        self.logger.info(f"[DELTA] Compacted {len(segments)} segments into '{self.file_names[key]}' "
+                         f"in {time.perf_counter() - started:.2f}s.")
+        return len(segments)
+
+    def discard_segments(self, key: str = 'transactions'):
+        """Deletes the delta segments of `key`, e.g. once a full replacement of its file is in place."""
+        segments = self.delta_segments(key)
+        for path in segments:
+            os.remove(path)
+        if segments:
+            self.logger.info(f"[DELTA] Discarded {len(segments)} segments of '{self.file_names[key]}'.")
+        return len(segments)
+
+    def _content_hash(self, full_path: str):
+        """sha1 of the file, rehashed only when its size or mtime moved; None if it is missing."""
+        try:
+            st = os.stat(full_path)
+        except FileNotFoundError:
+            return None
+        known = self._hashes.get(full_path)
+        if known is None:
+            # A Parquet cache stamp for the same size and mtime already names the content
+            try:
+                with open(self._cache_paths(full_path)[1], 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                known = (meta.get('size'), meta.get('mtime_ns'), meta.get('sha1'))
+            except Exception:
+                pass
+        if known is not None and known[0] == st.st_size and known[1] == st.st_mtime_ns and known[2]:
+            digest = known[2]
+        else:
+            digest = self._file_sha1(full_path)
+        self._hashes[full_path] = (st.st_size, st.st_mtime_ns, digest)
+        return digest
+
+    # --- columnar cache ---
+    def _read_dataset(self, key: str, full_path: str):
+        """Returns (DataFrame, 'cache'|'csv'), preferring a still-valid Parquet cache."""
+        if self.use_cache and key not in self.uncached:
+            cached = self._read_cache(key, full_path)
+            if cached is not None:
+                return cached, 'cache'
+        return self._read_csv(key, full_path), 'csv'
+
+    def _read_csv(self, key: str, full_path: str) -> pd.DataFrame:
+        df = None
+        if self.csv_engine == 'pyarrow':
+            try:
+                df = self._read_csv_arrow(full_path)
+            except FileNotFoundError:
+                raise
+            except Exception as e:
+                # Anything Arrow rejects (ragged rows, odd quoting) gets the more lenient C parser
+                self.logger.warning(f"Arrow CSV parser failed for '{key}' ({e}); retrying with pandas.")
+        if df is None:
+            df = pd.read_csv(full_path)
+        for col in self.parse_dates.get(key, []):
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], format='mixed')
+        return df
+
+    @staticmethod
+    def _read_csv_arrow(full_path: str) -> pd.DataFrame:
+        """
+        Parses with pyarrow's multithreaded reader into the frame pandas' C parser
+        would produce: columns Arrow would infer as dates or times (judged on the
+        first block) stay text, and text nulls become NaN.
+        """
+        csv = pyarrow.csv
+        if not os.path.exists(full_path):
+            raise FileNotFoundError(full_path)
+        with csv.open_csv(full_path) as reader:
+            schema = reader.schema
+        column_types = {f.name: pyarrow.string() for f in schema if pyarrow.types.is_temporal(f.type)}
+        table = csv.read_csv(full_path, convert_options=csv.ConvertOptions(
+            column_types=column_types, strings_can_be_null=True,
+        ))
+        df = table.to_pandas()
+        for name in table.column_names:
+            if table.column(name).null_count and pyarrow.types.is_string(table.column(name).type):
+                df[name] = df[name].where(df[name].notna(), np.nan)
+        return df
+
+    def _cache_paths(self, full_path: str):
+        base = os.path.join(self.cache_dir, os.path.splitext(os.path.basename(full_path))[0])
+        return base + '.parquet', base + '.json'
+
+    @staticmethod
+    def _file_sha1(path: str) -> str:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _read_cache(self, key: str, full_path: str):
+        """
+        Returns the cached frame if it still matches the CSV, else None.
+
+        Size + mtime is the fast check; when only the mtime moved (copy, touch,
+        identical re-upload) the content hash decides and the stamp is refreshed.
+        """
+        parquet_path, meta_path = self._cache_paths(full_path)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            st = os.stat(full_path)
+            if meta.get('format') != CACHE_FORMAT_VERSION or meta.get('size') != st.st_size:
+                return None
+            if meta.get('mtime_ns') != st.st_mtime_ns:
+                if meta.get('sha1') != self._content_hash(full_path):
+                    return None
+                meta['mtime_ns'] = st.st_mtime_ns
+                self._write_json_atomic(meta_path, meta)
+            return pd.read_parquet(parquet_path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable cache for '{key}': {e}")
+            return None
+
+    def _write_cache(self, key: str, full_path: str, df: pd.DataFrame):
+        """Writes `df` and its source fingerprint to the cache; failures only cost the speedup."""
+        if not self.use_cache or key in self.uncached:
+            return
+        parquet_path, meta_path = self._cache_paths(full_path)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            st = os.stat(full_path)
+            # Unique temp name: workers (or a worker and background compaction) may cache the same file at once
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.' + os.path.basename(parquet_path), suffix='.tmp')
+            os.close(fd)
+            try:
+                df.to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, parquet_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self._write_json_atomic(meta_path, {
+                'format': CACHE_FORMAT_VERSION,
+                'source': os.path.basename(full_path),
+                'size': st.st_size,
+                'mtime_ns': st.st_mtime_ns,
+                'sha1': self._content_hash(full_path),
+            })
+        except Exception as e:
+            self.logger.warning(f"Could not write columnar cache for '{key}': {e}")
+
+    @staticmethod
+    def _write_json_atomic(path: str, payload: dict):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.' + os.path.basename(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
     # --- helpers ---
     def _validate_metadata(self, meta: dict):
         """Return (is_valid, warning_message). Non-fatal; get_metadata() can derive counts.
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import Optional
+
+# Upper bounds (ms) of the latency buckets; slower observations land in "+Inf"
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000)
+
+
+class LatencyHistogram:
+    """Thread-safe fixed-bucket latency histogram; observe seconds, report milliseconds."""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.bounds = tuple(buckets_ms)
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        bucket = bisect_left(self.bounds, ms)
+        with self._lock:
+            self._counts[bucket] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def _quantile(self, counts, q: float):
+        # Upper bound of the bucket holding the q-th observation (max for the overflow bucket)
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return round(self.max_ms, 3)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            if not self.count:
+                return {"count": 0}
+            labels = [f"le_{b}ms" for b in self.bounds] + ["+Inf"]
+            return {
+                "count": self.count,
+                "mean_ms": round(self.total_ms / self.count, 3),
+                "max_ms": round(self.max_ms, 3),
+                "p50_ms": self._quantile(counts, 0.5),
+                "p95_ms": self._quantile(counts, 0.95),
+                "p99_ms": self._quantile(counts, 0.99),
+                "buckets": dict(zip(labels, counts)),
+            }
+
+
+class RunProfile:
+    """Wall time, calls and rows scanned per phase of one analysis run.
+
+    Phases recorded under the same name accumulate, e.g. one aggregate evaluated
+    once per streamed chunk.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.completed_at: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.counters: dict = {}
+        self._phases: OrderedDict[str, dict] = OrderedDict()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str, rows: Optional[int] = None):
+        """Times the block as phase `name`; set `rows` on the yielded dict if only known inside."""
+        scan = {"rows": rows}
+        started = time.perf_counter()
+        try:
+            yield scan
+        finally:
+            self.record(name, time.perf_counter() - started, scan["rows"])
+
+    def record(self, name: str, seconds: float, rows: Optional[int] = None) -> None:
+        with self._lock:
+            entry = self._phases.setdefault(name, {"seconds": 0.0, "calls": 0, "rows": 0})
+            entry["seconds"] += seconds
+            entry["calls"] += 1
+            if rows is not None:
+                entry["rows"] += int(rows)
+
+    def finish(self, error: Optional[str] = None) -> None:
+        self.seconds = time.perf_counter() - self._started
+        self.completed_at = datetime.now(timezone.utc).isoformat()
+        self.error = error
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            phases = {
+                name: {"seconds": round(e["seconds"], 6), "calls": e["calls"], "rows": e["rows"]}
+                for name, e in self._phases.items()
+            }
+        out = {
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+            "seconds": round(self.seconds, 6) if self.seconds is not None else None,
+            "counters": dict(self.counters),
+            "phases": phases,
+        }
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+def profile_phase(profile: Optional[RunProfile], name: str, rows: Optional[int] = None):
+    """`profile.phase(name, rows)`, or a no-op context when profiling is off."""
+    return profile.phase(name, rows) if profile is not None else nullcontext({"rows": rows})
+
+
+class AnalysisMetrics:
+    """Profiles of recent analysis runs plus process-lifetime counters and latency histograms.
+
+    Shared by every HybridRiskScorer in the process (see `analysis_metrics`), so
+    history survives the scorer being rebuilt after a dataset upload.
+    """
+
+    def __init__(self, history: int = 10):
+        self._runs: deque[RunProfile] = deque(maxlen=max(1, int(history)))
+        self._counters: dict = {}
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def run(self, kind: str):
+        """Profiles one run of `kind`; the profile is kept even if the run raises."""
+        profile = RunProfile(kind)
+        try:
+            yield profile
+        except Exception as e:
+            profile.finish(error=str(e))
+            raise
+        else:
+            profile.finish()
+        finally:
+            with self._lock:
+                self._runs.append(profile)
+                self._counters[f"runs.{kind}"] = self._counters.get(f"runs.{kind}", 0) + 1
+
+    def increment(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def last_run(self, kind: Optional[str] = None) -> Optional[dict]:
+        with self._lock:
+            runs = list(self._runs)
+        for profile in reversed(runs):
+            if kind is None or profile.kind == kind:
+                return profile.to_dict()
+        return None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            runs = list(self._runs)
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+        return {
+            "runs": [profile.to_dict() for profile in reversed(runs)],
+            "counters": counters,
+            "latency": {name: h.snapshot() for name, h in histograms.items()},
+        }
+
+
+# Process-wide default used by HybridRiskScorer
+analysis_metrics = AnalysisMetrics()
@@ -0,0 +1,213 @@
+import os
+import shutil
+import logging
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+
+class UploadValidationError(ValueError):
+    """An uploaded file failed validation; `errors` lists the offending rows (first `max_errors` of `error_count`)."""
+    def __init__(self, file_name, message, errors=(), error_count=0, rows_checked=0):
+        super().__init__(f"{file_name}: {message}")
+        self.file_name = file_name
+        self.errors = list(errors)
+        self.error_count = error_count
+        self.rows_checked = rows_checked
+
+    def to_dict(self):
+        return {
+            "file": self.file_name,
+            "rows_checked": self.rows_checked,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+@dataclass
+class StagedDataset:
+    """An uploaded dataset file that passed validation, waiting next to its target for `commit`."""
+    key: str
+    file_name: str
+    path: str
+    rows: int
+    bytes: int
+
+    def summary(self):
+        return {"file": self.file_name, "rows": self.rows, "bytes": self.bytes}
+
+
+@dataclass
+class UploadBatch:
+    """The datasets staged from one upload, in a private directory removed by `cleanup`."""
+    directory: str
+    staged: dict = field(default_factory=dict)
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class UploadIngestor:
+    """
+    Stages uploaded dataset CSVs without holding them in memory.
+
+    Uploads are spooled to a staging directory inside the data directory (so
+    the final rename is atomic), ZIP members are streamed out one at a time,
+    and each file is validated in chunks of `chunk_rows` rows against the
+    loader's schema: the header must carry the required columns, the record
+    key (first schema column) must be present, and numeric and date columns
+    must parse. Validated files are moved into place byte for byte, so an
+    identical re-upload keeps the dataset version; the typed Parquet cache is
+    written by the reload that parses them.
+
+    Attributes:
+        data_loader: DataLoader whose schemas and column types are checked.
+        datasets: Uploadable dataset keys mapped to their file names.
+        staging_dir: Parent of the per-upload staging directories (``.cache/uploads`` under data_path).
+        chunk_rows: Rows validated per chunk (UPLOAD_CHUNK_ROWS env).
+        max_errors: Row errors reported per file before the rest are only counted (UPLOAD_MAX_ROW_ERRORS env).
+    """
+    COPY_BUFFER = 1 << 20
+
+    def __init__(self, data_loader, datasets, chunk_rows=None, max_errors=None):
+        self.data_loader = data_loader
+        self.datasets = dict(datasets)
+        self.staging_dir = os.path.join(data_loader.data_path, '.cache', 'uploads')
+        self.chunk_rows = max(1, int(chunk_rows or os.getenv('UPLOAD_CHUNK_ROWS', '100000')))
+        self.max_errors = max(1, int(max_errors or os.getenv('UPLOAD_MAX_ROW_ERRORS', '100')))
+        self.logger = logging.getLogger(__name__)
+
+    def ingest(self, upload, filename, dataset_key=None):
+        """
+        Spools `upload` (a werkzeug FileStorage) and stages the datasets in it:
+        every recognized member of a ZIP, or the CSV as `dataset_key`. Raises
+        UploadValidationError (a ValueError) on the first file that fails, and
+        zipfile.BadZipFile for a corrupt archive; nothing is staged then.
+        """
+        os.makedirs(self.staging_dir, exist_ok=True)
+        batch = UploadBatch(tempfile.mkdtemp(dir=self.staging_dir, prefix='upload-'))
+        try:
+            spooled = os.path.join(batch.directory, 'upload')
+            upload.save(spooled, buffer_size=self.COPY_BUFFER)
+            if filename.lower().endswith('.zip'):
+                with zipfile.ZipFile(spooled) as zf:
+                    names = zf.namelist()
+                    for key, target in self.datasets.items():
+                        # Find case-insensitive match
+                        match = next((n for n in names if n.lower().endswith(target.lower())), None)
+                        if not match:
+                            continue
+                        with zf.open(match) as member:
+                            batch.staged[key] = self.stage(key, member, batch.directory)
+            else:
+                with open(spooled, 'rb') as source:
+                    batch.staged[dataset_key] = self.stage(dataset_key, source, batch.directory)
+            os.remove(spooled)
+        except BaseException:
+            batch.cleanup()
+            raise
+        return batch
+
+    def ingest_records(self, key, records):
+        """
+        Stages a list of row dicts (e.g. a JSON request body) as the CSV of
+        `key`. Rows in validation errors are numbered by list index.
+        """
+        os.makedirs(self.staging_dir, exist_ok=True)
+        batch = UploadBatch(tempfile.mkdtemp(dir=self.staging_dir, prefix='records-'))
+        try:
+            file_name = self.datasets[key]
+            path = os.path.join(batch.directory, file_name)
+            pd.DataFrame.from_records(records).to_csv(path, index=False)
+            rows = self.validate(key, path, first_row=0)
+            batch.staged[key] = StagedDataset(key, file_name, path, rows, os.path.getsize(path))
+        except BaseException:
+            batch.cleanup()
+            raise
+        return batch
+
+    def stage(self, key, source, directory):
+        """Copies the binary stream `source` to `directory` and validates it; returns a StagedDataset."""
+        file_name = self.datasets[key]
+        path = os.path.join(directory, file_name)
+        with open(path, 'wb') as out:
+            shutil.copyfileobj(source, out, self.COPY_BUFFER)
+        rows = self.validate(key, path)
+        return StagedDataset(key, file_name, path, rows, os.path.getsize(path))
+
+    def validate(self, key, path, first_row=2):
+        """
+        Checks the CSV at `path` chunk by chunk and returns its row count.
+        Rows are numbered from `first_row`; the default matches a spreadsheet,
+        where the header is row 1.
+        """
+        loader = self.data_loader
+        file_name = self.datasets[key]
+        required = loader.schemas.get(key) or []
+        try:
+            header = list(pd.read_csv(path, nrows=0).columns)
+        except pd.errors.EmptyDataError:
+            raise UploadValidationError(file_name, "file is empty")
+        except (pd.errors.ParserError, UnicodeDecodeError) as e:
+            raise UploadValidationError(file_name, f"unreadable header ({e})")
+        missing = [c for c in required if c not in header]
+        if missing:
+            raise UploadValidationError(file_name, f"{key} missing columns: {', '.join(missing)}")
+
+        record_key = required[0] if required else None
+        numeric = [
+            c for c in dict.fromkeys(loader.numeric_columns.get(key, []) + [
+                col for col, kind in loader.dtypes.get(key, {}).items() if kind == 'int64'
+            ]) if c in header
+        ]
+        dates = [c for c in loader.parse_dates.get(key, []) if c in header]
+
+        errors, error_count, rows = [], 0, 0
+
+        def report(chunk, mask, column, message):
+            nonlocal error_count
+            hits = chunk.index[mask.to_numpy()]
+            error_count += len(hits)
+            for idx in hits[:max(0, self.max_errors - len(errors))]:
+                value = chunk.at[idx, column]
+                errors.append({
+                    "row": int(idx) + first_row,
+                    "column": column,
+                    "value": None if pd.isna(value) else str(value),
+                    "message": message,
+                })
+
+        try:
+            # Every column as text, so values are judged (and reported) as written and ragged rows are caught
+            with pd.read_csv(path, dtype=str, chunksize=self.chunk_rows) as reader:
+                for chunk in reader:
+                    rows += len(chunk)
+                    if record_key:
+                        report(chunk, chunk[record_key].isna(), record_key, f"{record_key} is empty")
+                    for col in numeric:
+                        values = chunk[col]
+                        report(chunk, values.notna() & pd.to_numeric(values, errors='coerce').isna(), col, "not a number")
+                    for col in dates:
+                        values = chunk[col]
+                        parsed = pd.to_datetime(values, errors='coerce', format='mixed')
+                        report(chunk, values.notna() & parsed.isna(), col, "not a date")
+        except (pd.errors.ParserError, UnicodeDecodeError) as e:
+            # Ragged rows or bad bytes stop the scan; the parser's message names the line
+            error_count += 1
+            if len(errors) < self.max_errors:
+                errors.append({"row": None, "column": None, "value": None, "message": str(e)})
+
+        if error_count:
+            errors.sort(key=lambda e: (e["row"] is None, e["row"] or 0))
+            raise UploadValidationError(
+                file_name, f"{error_count} invalid rows", errors=errors, error_count=error_count, rows_checked=rows,
+            )
+        self.logger.info(f"[UPLOAD] Validated '{file_name}': {rows} rows.")
+        return rows
+
+    def commit(self, batch):
+        """Moves every staged file of `batch` over its dataset file (one atomic rename each)."""
+        for staged in batch.staged.values():
+            os.replace(staged.path, os.path.join(self.data_loader.data_path, staged.file_name))
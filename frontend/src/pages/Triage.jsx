@@ -20,13 +20,14 @@ import ErrorBanner from "../components/common/ErrorBanner.jsx";
 const RiskFactorSummary = ({ riskProfile, aiSummary }) => {
   if (!riskProfile) return null;
 
-  const ORDER = ["income", "structuring", "shell", "property", "tax"];
+  const ORDER = ["income", "structuring", "shell", "property", "tax", "anomaly"];
   const LABELS = {
     income: "Income vs. Transactions",
     structuring: "Transaction Structuring",
     shell: "Shell Company Links",
     property: "High-Value Property",
     tax: "Tax Status Irregularities",
+    anomaly: "Anomalous Transactions",
   };
 
   const breakdown = riskProfile.breakdown || {};